@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 01:55:41 2026
+
+@author: jvz16
+"""
+
+# gunicorn.conf.py
+# gunicorn lo lee solo al arrancar desde la raíz del repo (Render, loadtest,
+# bench_*). Los flags de la línea de comando siguen mandando.
+#
+# Con GUNICORN_PRELOAD (activo por defecto) el master carga Django una vez,
+# precarga URLs/templates (marketplace/arranque.py) y congela el heap con
+# gc.freeze() antes de forkear. Los workers arrancan sin volver a importar
+# nada y comparten esas páginas de memoria: el recolector no las recorre, así
+# que no las ensucia (copy-on-write). Ver manage.py bench_arranque.
+#
+# Con preload un HUP no recarga el código: para un deploy hay que reiniciar
+# el proceso (Render lo hace solo).
+
+import gc
+import os
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True").strip().lower() in ("1", "true", "yes", "on")
+
+if preload_app:
+    # Sin recolecciones mientras se importa la app: todo lo que se crea ahora
+    # vive lo que vive el proceso, y así no queda medio recorrido antes del freeze
+    gc.disable()
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from django.db import connections
+
+    from marketplace.arranque import precargar
+
+    tiempos = precargar()
+    server.log.info("Precarga: %s", ", ".join(f"{paso} {ms:.0f} ms" for paso, ms in tiempos.items()))
+    # Una conexión abierta en el master la heredarían todos los workers
+    connections.close_all()
+    gc.freeze()
+    gc.enable()
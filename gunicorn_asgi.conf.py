@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:20:14 2026
+
+@author: jvz16
+"""
+
+# gunicorn_asgi.conf.py
+# Arranque ASGI (gunicorn + UvicornWorker). Es lo que necesita el feed en
+# vivo del panel del shopper (dashboard/shopper/novedades/): con los workers
+# sync de gunicorn (WSGI) ese endpoint responde 204 y el panel se queda sin
+# actualizaciones en vivo, como antes.
+#
+# Start command en Render:
+#   gunicorn -c gunicorn_asgi.conf.py personal_shoppers.asgi:application
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+
+# Las conexiones SSE no terminan solas: al reiniciar no se espera a que
+# cierren (el navegador reconecta al worker nuevo)
+graceful_timeout = 10
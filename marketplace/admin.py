@@ -5,7 +5,14 @@ Created on Sun Dec  7 13:27:04 2025
 @author: jvz16
 """
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.functional import cached_property
+
 from .models import (
     CustomerProfile,
     ShopperProfile,
@@ -15,7 +22,65 @@ from .models import (
     Expense,
     CarouselSlide,
     HeroBackground,
+    PedidoArchivado,
 )
+from .reportes import invalidar_pnl
+
+
+# =========================
+# Changelists grandes
+# =========================
+class PaginadorEstimado(Paginator):
+    """
+    En Postgres, si el changelist no tiene filtros usa la estimación de
+    pg_class.reltuples en lugar de un COUNT(*) exacto (que en tablas de
+    millones de filas recorre todo). Con filtros, o en SQLite, cuenta normal.
+    """
+
+    UMBRAL_ESTIMADO = 10000
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        query = getattr(qs, "query", None)
+        if query is not None and not query.where:
+            conn = connections[qs.db]
+            if conn.vendor == "postgresql":
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                        [qs.model._meta.db_table],
+                    )
+                    fila = cursor.fetchone()
+                estimado = fila[0] if fila else None
+                if estimado and estimado > self.UMBRAL_ESTIMADO:
+                    return estimado
+        return super().count
+
+
+class AdminTablaGrande(admin.ModelAdmin):
+    paginator = PaginadorEstimado
+    # Evita el segundo COUNT(*) sobre toda la tabla al filtrar
+    show_full_result_count = False
+    list_per_page = 50
+    # Orden por PK: siempre indexado (y estable para paginar/autocomplete)
+    ordering = ("-id",)
+
+
+def _accion_cambiar_estado(estado, etiqueta):
+    def accion(modeladmin, request, queryset):
+        # Un solo UPDATE; update() no dispara auto_now, por eso se setea actualizado
+        shoppers = set(queryset.values_list("shopper_id", flat=True))
+        ahora = timezone.now()
+        # Lo mismo que la señal de reportes.py: la fecha de entrega no se pisa
+        entregado_en = Coalesce("entregado_en", Value(ahora)) if estado == "ENTREGADO" else None
+        n = queryset.update(estado=estado, actualizado=ahora, entregado_en=entregado_en)
+        invalidar_pnl(*shoppers)
+        modeladmin.message_user(request, f"{n} pedido(s) marcados como {etiqueta}.", messages.SUCCESS)
+
+    accion.__name__ = f"marcar_{estado.lower()}"
+    accion.short_description = f"Marcar como: {etiqueta}"
+    return accion
 
 
 @admin.register(CustomerProfile)
@@ -36,6 +101,8 @@ class CustomerProfileAdmin(admin.ModelAdmin):
         "telefono_nacional",
     )
     list_filter = ("pais", "provincia", "creado")
+    list_select_related = ("user",)
+    ordering = ("-id",)
 
 
 @admin.register(ShopperProfile)
@@ -53,6 +120,8 @@ class ShopperProfileAdmin(admin.ModelAdmin):
     )
     search_fields = ("user__username", "user__first_name", "user__last_name")
     list_filter = ("pais", "actualmente_en_el_extranjero", "verificado")
+    list_select_related = ("user",)
+    ordering = ("-id",)
 
 
 @admin.register(Trip)
@@ -72,10 +141,12 @@ class TripAdmin(admin.ModelAdmin):
         "ciudad_destino",
         "pais_destino",
     )
+    list_select_related = ("shopper__user",)
+    autocomplete_fields = ("shopper",)
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(AdminTablaGrande):
     list_display = (
         "id",
         "titulo",
@@ -92,10 +163,30 @@ class OrderAdmin(admin.ModelAdmin):
         "customer__user__username",
         "shopper__user__username",
     )
+    list_select_related = ("customer__user", "shopper__user")
+    autocomplete_fields = ("customer", "shopper")
+    date_hierarchy = "creado"
+    actions = [_accion_cambiar_estado(estado, etiqueta) for estado, etiqueta in Order.ESTADO_CHOICES]
+
+
+@admin.register(PedidoArchivado)
+class PedidoArchivadoAdmin(AdminTablaGrande):
+    # Solo consulta: se llena con manage.py archivar_pedidos
+    list_display = ("id", "titulo", "customer", "shopper", "estado", "moneda", "creado", "archivado")
+    list_filter = ("estado", "moneda")
+    search_fields = ("titulo", "customer__user__username", "shopper__user__username")
+    list_select_related = ("customer__user", "shopper__user")
+    date_hierarchy = "creado"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(AdminTablaGrande):
     list_display = (
         "pedido",
         "monto",
@@ -107,10 +198,30 @@ class PaymentAdmin(admin.ModelAdmin):
     )
     list_filter = ("tipo_pago", "metodo", "creado_por", "aprobado", "creado")
     search_fields = ("pedido__titulo", "pedido__customer__user__username")
+    list_select_related = ("pedido",)
+    autocomplete_fields = ("pedido",)
+    date_hierarchy = "creado"
+    actions = ["aprobar_pagos", "marcar_pendientes"]
+
+    @admin.action(description="Aprobar pagos seleccionados")
+    def aprobar_pagos(self, request, queryset):
+        queryset = queryset.filter(aprobado=False)
+        shoppers = set(queryset.values_list("pedido__shopper_id", flat=True))
+        n = queryset.update(aprobado=True, actualizado=timezone.now())
+        invalidar_pnl(*shoppers)
+        self.message_user(request, f"{n} pago(s) aprobados.", messages.SUCCESS)
+
+    @admin.action(description="Marcar como pendientes de aprobación")
+    def marcar_pendientes(self, request, queryset):
+        queryset = queryset.filter(aprobado=True)
+        shoppers = set(queryset.values_list("pedido__shopper_id", flat=True))
+        n = queryset.update(aprobado=False, actualizado=timezone.now())
+        invalidar_pnl(*shoppers)
+        self.message_user(request, f"{n} pago(s) marcados como pendientes.", messages.SUCCESS)
 
 
 @admin.register(Expense)
-class ExpenseAdmin(admin.ModelAdmin):
+class ExpenseAdmin(AdminTablaGrande):
     list_display = (
         "pedido",
         "shopper",
@@ -121,6 +232,9 @@ class ExpenseAdmin(admin.ModelAdmin):
     )
     list_filter = ("categoria", "moneda", "creado")
     search_fields = ("pedido__titulo", "shopper__user__username", "descripcion")
+    list_select_related = ("pedido", "shopper__user")
+    autocomplete_fields = ("pedido", "shopper")
+    date_hierarchy = "creado"
 
 
 @admin.register(CarouselSlide)
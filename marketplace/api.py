@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 00:21:36 2026
+
+@author: jvz16
+"""
+
+# marketplace/api.py
+# API JSON de solo lectura (/api/v1/<recurso>/ y /api/v1/<recurso>/<id>/)
+# para la app móvil e integraciones.
+#
+#   ?fields=id,titulo            campos del recurso (sparse fieldsets)
+#   ?fields[articulos]=nombre    campos de un recurso incluido
+#   ?include=articulos,shopper   relaciones embebidas, sin N+1: select_related
+#                                o un prefetch por relación
+#   ?limite=50&cursor=…          paginación keyset sobre `orden` (sin OFFSET
+#                                ni COUNT); la respuesta trae `siguiente`
+#
+# Cada recurso declara `max_consultas`: el peor caso (todas las relaciones
+# incluidas) sin contar sesión/usuario, y no depende de cuántas filas haya.
+# `manage.py verificar_api` lo comprueba contra datos de prueba.
+#
+# Las respuestas llevan ETag (hash del cuerpo): con If-None-Match vigente se
+# responde 304 sin cuerpo. El JSON se serializa con orjson si está instalado.
+
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Q
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+from .models import Expense, Order, OrderItem, Payment, Review, ShopperProfile, Trip
+from .sincronizacion import ROLES, rol_de
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se usa json de la stdlib
+    orjson = None
+
+
+# =========================
+# JSON
+# =========================
+def _json_default(valor):
+    if isinstance(valor, Decimal):
+        return str(valor)  # igual que DjangoJSONEncoder
+    raise TypeError(f"{type(valor).__name__} no es serializable")
+
+
+def a_json(datos):
+    """
+    bytes UTF-8. Fechas en ISO 8601 y Decimal como texto con los dos motores.
+    """
+    if orjson is not None:
+        return orjson.dumps(datos, default=_json_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(datos, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def respuesta(request, datos, status=200, privada=True):
+    cuerpo = a_json(datos)
+    etag = quote_etag(hashlib.sha1(cuerpo).hexdigest()[:20])
+    if status == 200:
+        no_modificado = get_conditional_response(request, etag=etag)
+        if no_modificado is not None:
+            response = no_modificado
+        else:
+            response = HttpResponse(cuerpo, content_type="application/json")
+        response["ETag"] = etag
+    else:
+        response = HttpResponse(cuerpo, status=status, content_type="application/json")
+    if privada:
+        patch_vary_headers(response, ("Cookie",))
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.HTTP_CACHE_MAX_AGE)
+    return response
+
+
+def error(request, mensaje, status):
+    return respuesta(request, {"error": mensaje}, status=status)
+
+
+class ErrorApi(Exception):
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.status = status
+
+
+# =========================
+# Recursos
+# =========================
+def _nombre_usuario(user):
+    return user.get_full_name() or user.username
+
+
+class Recurso:
+    """
+    modelo + campos públicos + orden keyset + relaciones incluibles.
+
+    campos: nombres de campos del modelo (FK como `shopper_id`).
+    calculados: nombre -> (función(obj), campos/relación que necesita).
+    incluir: nombre -> (relación del ORM, nombre del recurso incluido).
+    duenos: rol -> filtro del dueño; sin duenos el recurso es público.
+    filtros: parámetro GET -> (lookup, conversión).
+    """
+
+    def __init__(
+        self,
+        nombre,
+        modelo,
+        campos,
+        orden,
+        max_consultas,
+        calculados=None,
+        select=(),
+        incluir=None,
+        duenos=None,
+        filtros=None,
+    ):
+        self.nombre = nombre
+        self.modelo = modelo
+        self.campos = tuple(campos)
+        self.calculados = calculados or {}
+        self.select = tuple(select)
+        self.orden = tuple(orden)
+        self.max_consultas = max_consultas
+        self.incluir = incluir or {}
+        self.duenos = duenos
+        self.filtros = filtros or {}
+
+    @property
+    def publico(self):
+        return self.duenos is None
+
+    def todos_los_campos(self):
+        return self.campos + tuple(self.calculados)
+
+    def elegir_campos(self, pedidos):
+        if not pedidos:
+            return self.todos_los_campos()
+        elegidos = tuple(c for c in pedidos.split(",") if c)
+        desconocidos = sorted(set(elegidos) - set(self.todos_los_campos()))
+        if desconocidos:
+            raise ErrorApi(f"{self.nombre}: campos desconocidos: {', '.join(desconocidos)}")
+        return elegidos
+
+    def columnas(self, elegidos, extra=()):
+        """
+        Campos para .only(): lo pedido + pk + orden + lo que necesitan los
+        calculados y las relaciones incluidas.
+        """
+        cols = {"id"}
+        for c in elegidos:
+            if c in self.calculados:
+                cols.update(self.calculados[c][1])
+            else:
+                cols.add(c[:-3] if c.endswith("_id") else c)
+        cols.update(o.lstrip("-") for o in self.orden)
+        cols.update(extra)
+        return sorted(cols)
+
+    def serializar(self, obj, elegidos):
+        fila = {}
+        for c in elegidos:
+            if c in self.calculados:
+                fila[c] = self.calculados[c][0](obj)
+            else:
+                fila[c] = getattr(obj, c)
+        return fila
+
+
+CAMPOS_PEDIDO = (
+    "id", "customer_id", "shopper_id", "titulo", "descripcion", "precio", "modo_presupuesto", "moneda",
+    "presupuesto_maximo_por_articulo", "presupuesto_maximo_total", "fecha_limite", "estado",
+    "foto_referencia_url", "creado", "actualizado",
+)  # fmt: skip
+
+RECURSOS = {
+    "shoppers": Recurso(
+        "shoppers",
+        ShopperProfile,
+        campos=(
+            "id", "pais", "provincia", "ciudad_base", "biografia", "especialidades",
+            "actualmente_en_el_extranjero", "ciudad_extranjero", "pais_extranjero", "fecha_regreso",
+            "acepta_pagos_parciales", "acepta_nuevos_pedidos", "monto_minimo_habitual",
+            "monto_maximo_habitual", "esquema_tarifas", "calificacion", "puntaje_ranking", "verificado",
+            "creado", "actualizado",
+        ),  # fmt: skip
+        calculados={
+            "nombre": (lambda s: _nombre_usuario(s.user), ("user",)),
+            "ubicacion": (
+                lambda s: s.ubicacion_actual,
+                ("actualmente_en_el_extranjero", "ciudad_extranjero", "pais_extranjero", "ciudad_base"),
+            ),
+        },
+        select=("user",),
+        orden=("-puntaje_ranking", "-creado", "-id"),
+        incluir={"viajes": ("viajes", "viajes"), "resenas": ("reviews", "resenas")},
+        filtros={"acepta": ("acepta_nuevos_pedidos", lambda v: v in ("1", "true"))},
+        max_consultas=3,
+    ),
+    "pedidos": Recurso(
+        "pedidos",
+        Order,
+        campos=CAMPOS_PEDIDO,
+        orden=("-creado", "-id"),
+        incluir={
+            "articulos": ("articulos", "articulos"),
+            "pagos": ("pagos", "pagos"),
+            "gastos": ("gastos", "gastos"),
+            "shopper": ("shopper", "shoppers"),
+            "resena": ("review", "resenas"),
+        },
+        duenos={"cliente": "customer", "shopper": "shopper"},
+        filtros={"estado": ("estado", str)},
+        max_consultas=6,
+    ),
+    "articulos": Recurso(
+        "articulos",
+        OrderItem,
+        campos=("id", "pedido_id", "nombre", "categoria", "cantidad", "nota", "precio_unitario", "creado", "actualizado"),
+        orden=("-creado", "-id"),
+        incluir={"pedido": ("pedido", "pedidos")},
+        duenos={"cliente": "pedido__customer", "shopper": "pedido__shopper"},
+        filtros={"pedido": ("pedido_id", int)},
+        max_consultas=3,
+    ),
+    "pagos": Recurso(
+        "pagos",
+        Payment,
+        campos=(
+            "id", "pedido_id", "monto", "tipo_pago", "metodo", "nota", "creado_por", "aprobado",
+            "creado", "actualizado",
+        ),  # fmt: skip
+        orden=("-creado", "-id"),
+        incluir={"pedido": ("pedido", "pedidos")},
+        duenos={"cliente": "pedido__customer", "shopper": "pedido__shopper"},
+        filtros={"pedido": ("pedido_id", int), "aprobado": ("aprobado", lambda v: v in ("1", "true"))},
+        max_consultas=3,
+    ),
+    "gastos": Recurso(
+        "gastos",
+        Expense,
+        campos=("id", "pedido_id", "shopper_id", "categoria", "monto", "descripcion", "moneda", "creado", "actualizado"),
+        orden=("-creado", "-id"),
+        incluir={"pedido": ("pedido", "pedidos")},
+        duenos={"cliente": "pedido__customer", "shopper": "shopper"},
+        filtros={"pedido": ("pedido_id", int), "generales": ("pedido__isnull", lambda v: v in ("1", "true"))},
+        max_consultas=3,
+    ),
+    "viajes": Recurso(
+        "viajes",
+        Trip,
+        campos=(
+            "id", "shopper_id", "origen", "ciudad_destino", "pais_destino", "fecha_inicio", "fecha_fin",
+            "notas", "creado", "actualizado",
+        ),  # fmt: skip
+        orden=("-fecha_inicio", "-id"),
+        incluir={"shopper": ("shopper", "shoppers")},
+        filtros={"shopper": ("shopper_id", int), "desde": ("fecha_inicio__gte", str)},
+        max_consultas=1,
+    ),
+    "resenas": Recurso(
+        "resenas",
+        Review,
+        campos=("id", "order_id", "shopper_id", "rating", "comment", "creado"),
+        orden=("-creado", "-id"),
+        incluir={"shopper": ("shopper", "shoppers")},
+        filtros={"shopper": ("shopper_id", int)},
+        max_consultas=1,
+    ),
+}
+
+
+# =========================
+# Consulta
+# =========================
+def _es_select(modelo, relacion):
+    campo = modelo._meta.get_field(relacion)
+    return campo.many_to_one or campo.one_to_one
+
+
+def _campo_inverso(modelo, relacion):
+    return modelo._meta.get_field(relacion).field.name
+
+
+def _parse_incluir(recurso, valor):
+    nombres = [n for n in (valor or "").split(",") if n]
+    desconocidos = sorted(set(nombres) - set(recurso.incluir))
+    if desconocidos:
+        raise ErrorApi(f"{recurso.nombre}: no se puede incluir {', '.join(desconocidos)}")
+    return nombres
+
+
+def _codificar_cursor(recurso, obj):
+    valores = []
+    for o in recurso.orden:
+        v = getattr(obj, o.lstrip("-"))
+        valores.append(v.isoformat() if hasattr(v, "isoformat") else v)
+    return base64.urlsafe_b64encode(a_json(valores)).decode().rstrip("=")
+
+
+def _despues_de(recurso, qs, cursor):
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(valores, list) or len(valores) != len(recurso.orden):
+            raise ValueError
+        campos = [o.lstrip("-") for o in recurso.orden]
+        valores = [recurso.modelo._meta.get_field(c).to_python(v) for c, v in zip(campos, valores)]
+        # Los campos de orden no admiten NULL y las fechas salen con zona: un
+        # cursor con null o con fecha naive no salió de acá
+        if any(v is None or (isinstance(v, datetime) and timezone.is_naive(v)) for v in valores):
+            raise ValueError
+        # (a, b, c) "después" de (va, vb, vc) según la dirección de cada campo
+        condicion = Q()
+        for i, o in enumerate(recurso.orden):
+            iguales = {campos[j]: valores[j] for j in range(i)}
+            op = "lt" if o.startswith("-") else "gt"
+            condicion |= Q(**iguales, **{f"{campos[i]}__{op}": valores[i]})
+        return qs.filter(condicion)
+    except (binascii.Error, TypeError, ValueError, ValidationError):
+        raise ErrorApi("Cursor inválido.")
+
+
+def consultar(recurso, request, perfil=None, rol=None, pk=None):
+    """
+    (filas serializadas, cursor siguiente). Lanza ErrorApi.
+    """
+    get = request.GET
+    elegidos = recurso.elegir_campos(get.get("fields"))
+    incluidos = _parse_incluir(recurso, get.get("include"))
+
+    qs = recurso.modelo.objects.all()
+    if recurso.duenos is not None:
+        qs = qs.filter(**{recurso.duenos[rol]: perfil})
+    if pk is not None:
+        qs = qs.filter(pk=pk)
+    for parametro, (lookup, convertir) in recurso.filtros.items():
+        if parametro in get:
+            try:
+                qs = qs.filter(**{lookup: convertir(get[parametro])})
+            except (ValueError, ValidationError):
+                raise ErrorApi(f"Valor inválido para {parametro}.")
+
+    select = list(recurso.select)
+    prefetch = []
+    extra = []
+    plan = []  # (nombre, relación, recurso incluido, campos, es_select)
+    for nombre in incluidos:
+        relacion, nombre_recurso = recurso.incluir[nombre]
+        sub = RECURSOS[nombre_recurso]
+        sub_campos = sub.elegir_campos(get.get(f"fields[{nombre}]"))
+        if _es_select(recurso.modelo, relacion):
+            select.append(relacion)
+            select.extend(f"{relacion}__{s}" for s in sub.select)
+            extra.append(relacion)
+        else:
+            inverso = _campo_inverso(recurso.modelo, relacion)
+            sub_qs = sub.modelo.objects.select_related(*sub.select).only(
+                *sub.columnas(sub_campos, (inverso,) + sub.select)
+            )
+            prefetch.append(Prefetch(relacion, queryset=sub_qs.order_by(*sub.orden)))
+        plan.append((nombre, relacion, sub, sub_campos))
+
+    if select:
+        qs = qs.select_related(*select)
+    if prefetch:
+        qs = qs.prefetch_related(*prefetch)
+    if get.get("fields"):
+        # Las relaciones en select_related se cargan completas
+        qs = qs.only(*recurso.columnas(elegidos, extra + list(recurso.select)))
+
+    limite = settings.API_LIMITE
+    if pk is None:
+        if get.get("limite", "").isdigit():
+            limite = min(max(int(get["limite"]), 1), settings.API_LIMITE_MAXIMO)
+        if get.get("cursor"):
+            qs = _despues_de(recurso, qs, get["cursor"])
+    objetos = list(qs.order_by(*recurso.orden)[: limite + 1])
+    siguiente = None
+    if len(objetos) > limite:
+        objetos = objetos[:limite]
+        siguiente = _codificar_cursor(recurso, objetos[-1])
+
+    filas = []
+    for obj in objetos:
+        fila = recurso.serializar(obj, elegidos)
+        for nombre, relacion, sub, sub_campos in plan:
+            if _es_select(recurso.modelo, relacion):
+                rel = getattr(obj, relacion, None)
+                fila[nombre] = sub.serializar(rel, sub_campos) if rel is not None else None
+            else:
+                fila[nombre] = [sub.serializar(r, sub_campos) for r in getattr(obj, relacion).all()]
+        filas.append(fila)
+    return filas, siguiente
+
+
+# =========================
+# Vistas
+# =========================
+def _perfil(request, recurso):
+    if recurso.publico:
+        return None, None
+    if not request.user.is_authenticated:
+        raise ErrorApi("No autenticado.", 401)
+    rol = request.GET.get("rol") or None
+    if rol is not None and rol not in ROLES:
+        raise ErrorApi(f"rol debe ser uno de {', '.join(ROLES)}.")
+    rol, perfil = rol_de(request.user, rol)
+    if perfil is None:
+        raise ErrorApi("El usuario no tiene ese perfil.", 403)
+    return rol, perfil
+
+
+def lista(request, recurso):
+    rec = RECURSOS.get(recurso)
+    if rec is None:
+        return error(request, "Recurso desconocido.", 404)
+    if request.method != "GET":
+        return error(request, "Solo GET.", 405)
+    try:
+        rol, perfil = _perfil(request, rec)
+        filas, siguiente = consultar(rec, request, perfil, rol)
+    except ErrorApi as e:
+        return error(request, str(e), e.status)
+    return respuesta(request, {"datos": filas, "siguiente": siguiente}, privada=not rec.publico)
+
+
+def detalle(request, recurso, pk):
+    rec = RECURSOS.get(recurso)
+    if rec is None:
+        return error(request, "Recurso desconocido.", 404)
+    if request.method != "GET":
+        return error(request, "Solo GET.", 405)
+    try:
+        rol, perfil = _perfil(request, rec)
+        filas, _ = consultar(rec, request, perfil, rol, pk=pk)
+    except ErrorApi as e:
+        return error(request, str(e), e.status)
+    if not filas:
+        return error(request, "No encontrado.", 404)
+    return respuesta(request, {"datos": filas[0]}, privada=not rec.publico)
@@ -12,3 +12,15 @@ from django.apps import AppConfig
 class MarketplaceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "marketplace"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import http_cache, ranking, reportes, sincronizacion
+        from .sqlite import aplicar_pragmas
+
+        connection_created.connect(aplicar_pragmas, dispatch_uid="marketplace_sqlite_pragmas")
+        http_cache.conectar_senales()
+        ranking.conectar_senales()
+        reportes.conectar_senales()
+        sincronizacion.conectar_senales()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:26:52 2026
+
+@author: jvz16
+"""
+
+# marketplace/archivo.py
+# Archivo de pedidos cerrados (ENTREGADO / CANCELADO) viejos.
+#
+# Los pedidos y sus hijos (artículos, pagos, gastos) se mueven a tablas
+# *Archivado con los mismos campos y los mismos ids, de a lotes: cada lote es
+# una transacción corta que copia con bulk_create y borra de las tablas vivas
+# con DELETE directo (sin el collector del ORM: no carga objetos ni borra las
+# reseñas, que siguen apuntando al mismo id). Entre lotes se suelta todo, así
+# que no hay bloqueos largos.
+#
+# Lectura: obtener_pedido() busca primero en Order y, si no está, en
+# PedidoArchivado. Los objetos archivados tienen las mismas propiedades
+# (total_pagos, saldo…) y related_names (pagos, gastos, articulos), así que
+# los templates de detalle funcionan igual.
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from .models import (
+    ArticuloArchivado,
+    Expense,
+    GastoArchivado,
+    Order,
+    OrderItem,
+    PagoArchivado,
+    Payment,
+    PedidoArchivado,
+)
+
+ESTADOS_CERRADOS = ("ENTREGADO", "CANCELADO")
+
+# tabla viva -> tabla de archivo
+TABLAS = [
+    (Order, PedidoArchivado),
+    (OrderItem, ArticuloArchivado),
+    (Payment, PagoArchivado),
+    (Expense, GastoArchivado),
+]
+
+
+def _copia(origen, destino, obj, ahora):
+    datos = {f.attname: getattr(obj, f.attname) for f in origen._meta.concrete_fields}
+    if destino is PedidoArchivado:
+        datos["archivado"] = ahora
+    return destino(**datos)
+
+
+def archivables(dias):
+    limite = timezone.now() - timedelta(days=dias)
+    return Order.objects.filter(estado__in=ESTADOS_CERRADOS, actualizado__lt=limite)
+
+
+def archivar_lote(dias, lote):
+    """
+    Archiva hasta `lote` pedidos cerrados hace más de `dias` días, en una
+    transacción. Devuelve cuántos pedidos movió (0 = no queda nada).
+    """
+    with transaction.atomic():
+        qs = archivables(dias).order_by("pk")
+        if connection.features.has_select_for_update_skip_locked:
+            # Lo que alguien esté editando ahora se archiva en otra pasada
+            qs = qs.select_for_update(skip_locked=True)
+        pedidos = list(qs[:lote])
+        if not pedidos:
+            return 0
+        ids = [p.pk for p in pedidos]
+        ahora = timezone.now()
+
+        hijos = {
+            OrderItem: list(OrderItem.objects.filter(pedido_id__in=ids)),
+            Payment: list(Payment.objects.filter(pedido_id__in=ids)),
+            Expense: list(Expense.objects.filter(pedido_id__in=ids)),
+        }
+        for origen, destino in TABLAS:
+            objetos = pedidos if origen is Order else hijos[origen]
+            destino.objects.bulk_create([_copia(origen, destino, o, ahora) for o in objetos])
+
+        # Hijos primero (FK a Order), después los pedidos
+        for origen in (OrderItem, Payment, Expense):
+            origen.objects.filter(pedido_id__in=ids)._raw_delete(origen.objects.db)
+        Order.objects.filter(pk__in=ids)._raw_delete(Order.objects.db)
+    return len(ids)
+
+
+def archivar(dias=None, lote=500, pausa=0.05, al_avanzar=None):
+    """
+    Archiva por lotes hasta que no quede nada. `pausa` (segundos) entre lotes
+    deja pasar a las transacciones de la app. Devuelve el total archivado.
+    """
+    dias = settings.ARCHIVO_PEDIDOS_DIAS if dias is None else dias
+    total = 0
+    while True:
+        n = archivar_lote(dias, lote)
+        if not n:
+            return total
+        total += n
+        if al_avanzar:
+            al_avanzar(total)
+        if pausa:
+            time.sleep(pausa)
+
+
+# =========================
+# Lectura
+# =========================
+def obtener_pedido(pk, **filtro):
+    """
+    (pedido, archivado): el pedido vivo o, si ya se archivó, el de
+    PedidoArchivado. 404 si no está en ninguno (con el filtro de dueño).
+    """
+    pedido = Order.objects.filter(pk=pk, **filtro).first()
+    if pedido is not None:
+        return pedido, False
+    return get_object_or_404(PedidoArchivado, pk=pk, **filtro), True
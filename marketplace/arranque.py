@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 01:48:09 2026
+
+@author: jvz16
+"""
+
+# marketplace/arranque.py
+# Precarga de lo que, si no, paga el primer request de cada worker: la
+# URLconf (que importa todas las vistas, la API y el admin), los templates
+# del proyecto compilados en el cached loader y el catálogo de traducciones.
+#
+# gunicorn.conf.py la llama en el master con preload_app, justo antes de
+# gc.freeze() y de forkear: los workers nacen con todo eso ya en memoria
+# compartida (copy-on-write). No toca la BD.
+
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+
+def _templates_del_proyecto():
+    """
+    Nombres de los templates .html de las carpetas dentro de BASE_DIR (los
+    del admin y otras apps de terceros se compilan cuando se usan).
+    """
+    base = Path(settings.BASE_DIR).resolve()
+    nombres = set()
+    for config in settings.TEMPLATES:
+        carpetas = [Path(d) for d in config.get("DIRS", [])] + [Path(d) for d in get_app_template_dirs("templates")]
+        for carpeta in carpetas:
+            carpeta = carpeta.resolve()
+            if not carpeta.is_dir() or base not in carpeta.parents:
+                continue
+            nombres.update(p.relative_to(carpeta).as_posix() for p in carpeta.rglob("*.html"))
+    return sorted(nombres)
+
+
+def precargar():
+    """
+    Carga URLconf, templates y traducciones. Devuelve {paso: ms}.
+    """
+    tiempos = {}
+
+    inicio = time.perf_counter()
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict  # arma las tablas de reverse() / {% url %}
+    tiempos["urls"] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    motor = engines["django"]
+    for nombre in _templates_del_proyecto():
+        try:
+            motor.get_template(nombre)
+        except TemplateSyntaxError:
+            logger.warning("Precarga: el template %s no compila", nombre, exc_info=True)
+    tiempos["templates"] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext("")
+    tiempos["traducciones"] = (time.perf_counter() - inicio) * 1000
+    return tiempos
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 02:41:30 2026
+
+@author: jvz16
+"""
+
+# marketplace/calentamiento.py
+# Calentamiento de caches después de un deploy (manage.py warm_caches).
+#
+# Dos alcances:
+#
+#   compartido  lo que vive en el cache de Django o en disco y ven todos los
+#               workers: media de la plataforma del ranking, snapshot de
+#               métricas y el HTML compartido de home / buscar_shoppers /
+#               perfiles (cache de página, con los contadores del landing y
+#               las listas de tarjetas adentro). Las páginas se piden por
+#               el handler de Django en este mismo proceso, así que las
+#               claves son las mismas que calcula un worker (VERSION_DEPLOY
+#               es igual en todos los procesos del deploy). Solo sirve con
+#               cache compartido (Redis): si no, cada worker tiene su propio
+#               cache y se omite.
+#
+#   workers     con `url`, las mismas páginas por HTTP contra el servidor
+#               vivo, varias rondas con conexiones nuevas para que pasen por
+#               todos los workers: calienta lo que es por proceso (conexión
+#               a la BD, templates compilados, tarjetas con la URL de la foto).
+#
+# Va después de que el deploy está sirviendo, no en build.sh: el build corre
+# antes de que arranque la versión nueva (y sin los workers que calentar).
+# Todo es lectura + cache.set de contenido que ya corresponde a la versión
+# vigente: se puede correr con tráfico. Las tareas van en un pool acotado
+# (`hilos`), cada una con su conexión a la BD, que se cierra al terminar.
+# Las páginas internas usan RequestFactory + un BaseHandler compartido, como
+# un worker con hilos: django.test.Client conecta y desconecta señales
+# globales en cada request y no se puede usar desde varios hilos.
+
+import http.client
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.handlers.base import BaseHandler
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import reverse
+
+from . import metricas, ranking
+from .loadtest import ClienteHTTP
+from .models import ShopperProfile
+
+
+def cache_compartido():
+    """
+    (se_puede, motivo): si lo que se guarde acá lo van a leer los workers.
+    """
+    # El backend real: `cache` es un proxy y nunca es instancia del backend
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+        return False, "el cache es memoria local del proceso (sin REDIS_URL)"
+    return True, ""
+
+
+def rutas_publicas(n_shoppers):
+    """
+    home, buscar_shoppers y los perfiles de los `n_shoppers` primeros del
+    ranking (los que más aparecen en las tarjetas).
+    """
+    pks = ShopperProfile.objects.order_by("-puntaje_ranking", "-creado").values_list("pk", flat=True)[:n_shoppers]
+    return [reverse("home"), reverse("buscar_shoppers")] + [reverse("shopper_detail", args=[pk]) for pk in pks]
+
+
+def _host():
+    return next((h.lstrip(".") for h in settings.ALLOWED_HOSTS if h != "*"), "localhost")
+
+
+# =========================
+# Tareas
+# =========================
+def _ranking():
+    media = ranking.media_plataforma(refrescar=True)
+    return f"media {media:.2f}"
+
+
+def _snapshot():
+    valores = metricas.snapshot_negocio().get("valores", {})
+    return ", ".join(f"{k.replace('marketplace_', '')}={v}" for k, v in sorted(valores.items()))
+
+
+def _handler():
+    # Middleware cargado una vez, antes del pool; get_response no guarda
+    # estado por request y se comparte entre hilos
+    handler = BaseHandler()
+    handler.load_middleware()
+    return handler
+
+
+def _pagina_interna(handler, ruta):
+    def tarea():
+        request = RequestFactory().get(ruta, secure=True, HTTP_HOST=_host())
+        response = handler.get_response(request)
+        response.close()
+        return str(response.status_code)
+
+    return tarea
+
+
+def _pagina_http(url, ruta, rondas):
+    def tarea():
+        estados = []
+        for _ in range(rondas):
+            # Conexión nueva cada vez: el balanceo de gunicorn reparte entre workers
+            cliente = ClienteHTTP(url, timeout=30)
+            try:
+                status, _, _, _ = cliente.request("GET", ruta)
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+            finally:
+                cliente.cerrar()
+            estados.append(str(status))
+        return " ".join(estados)
+
+    return tarea
+
+
+def tareas(url=None, rondas=4, n_shoppers=20):
+    """
+    [(nombre, callable)] y la lista de avisos (lo que se omitió y por qué).
+    """
+    lista, avisos = [], []
+    compartido, motivo = cache_compartido()
+    rutas = rutas_publicas(n_shoppers)
+
+    if compartido:
+        lista.append(("ranking", _ranking))
+    else:
+        avisos.append(f"ranking y páginas en cache compartido: omitido, {motivo}")
+    if settings.METRICAS_ACTIVAS:
+        lista.append(("snapshot métricas", _snapshot))
+    if compartido:
+        handler = _handler()
+        lista += [(f"página {ruta}", _pagina_interna(handler, ruta)) for ruta in rutas]
+    if url:
+        lista += [(f"workers {ruta}", _pagina_http(url, ruta, rondas)) for ruta in rutas]
+    elif not compartido:
+        avisos.append("sin --url no se calienta nada por worker")
+    return lista, avisos
+
+
+def _correr(nombre, funcion):
+    inicio = time.perf_counter()
+    try:
+        resultado, error = funcion(), None
+    except Exception as e:  # una tarea que falla no frena a las demás
+        resultado, error = None, f"{type(e).__name__}: {e}"
+    finally:
+        connections.close_all()
+    return {"tarea": nombre, "ms": (time.perf_counter() - inicio) * 1000, "resultado": resultado, "error": error}
+
+
+def calentar(lista, hilos=4):
+    """
+    Corre las tareas en un pool de `hilos`. Devuelve (resultados, ms_total).
+    """
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, hilos), thread_name_prefix="calentar") as pool:
+        resultados = list(pool.map(lambda t: _correr(*t), lista))
+    return resultados, (time.perf_counter() - inicio) * 1000
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:25:09 2026
+
+@author: jvz16
+"""
+
+# marketplace/db_router.py
+import contextvars
+
+from django.conf import settings
+
+# True mientras se atiende un request que puede leer de la réplica
+# (lo marca ReplicaMiddleware).
+usar_replica = contextvars.ContextVar("usar_replica", default=False)
+
+ALIAS_REPLICA = "replica"
+
+
+class ReplicaRouter:
+    """
+    Envía a la réplica las lecturas de modelos del marketplace cuando el
+    request actual fue marcado como de solo lectura. Todo lo demás (escrituras,
+    sesiones, auth, migraciones) va a "default".
+
+    Auth y sesiones se quedan en el primario a propósito: leerlas de una
+    réplica con lag puede "desloguear" a alguien justo después del login.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.app_label == "marketplace"
+            and ALIAS_REPLICA in settings.DATABASES
+            and usar_replica.get()
+        ):
+            return ALIAS_REPLICA
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica y primario tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
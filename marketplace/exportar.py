@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:58:23 2026
+
+@author: jvz16
+"""
+
+# marketplace/exportar.py
+# Exportación de los "libros" del shopper (pedidos, pagos, gastos) a CSV y
+# XLSX, en streaming: las filas salen de queryset.iterator(chunk_size=...)
+# con los joins hechos en SQL (select_related / subconsultas), se escriben de
+# a bloques y se entregan al cliente sin armar el archivo en memoria. La
+# memoria usada no depende de la cantidad de filas (ver bench_exportar).
+# Incluye los pedidos archivados.
+#
+# XLSX se arma con zipfile de la stdlib escribiendo a un destino no
+# seekable, con cadenas inline (sin sharedStrings, que obligaría a tener
+# todos los textos en memoria). Las fechas van como texto ISO.
+
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Expense, GastoArchivado, Order, PagoArchivado, Payment, PedidoArchivado
+
+CHUNK_SIZE = 2000
+# Filas por bloque entregado al cliente
+FILAS_POR_BLOQUE = 500
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+# =========================
+# Datos
+# =========================
+def _fecha(dt):
+    return timezone.localtime(dt).strftime("%Y-%m-%d %H:%M") if dt else ""
+
+
+def _nombre(user):
+    return user.get_full_name() or user.username
+
+
+def _suma_por_pedido(modelo, **filtro):
+    sub = (
+        modelo.objects.filter(pedido=OuterRef("pk"), **filtro)
+        .order_by()
+        .values("pedido")
+        .annotate(total=Sum("monto"))
+        .values("total")
+    )
+    return Coalesce(Subquery(sub, output_field=IntegerField()), Value(0))
+
+
+# (pedido, pago, gasto): primero lo archivado (ver archivo.py), después lo vivo
+MODELOS = [
+    (PedidoArchivado, PagoArchivado, GastoArchivado),
+    (Order, Payment, Expense),
+]
+
+
+def _pedidos(shopper, pedido, pago, gasto):
+    return (
+        pedido.objects.filter(shopper=shopper)
+        .select_related("customer__user")
+        .annotate(pagado=_suma_por_pedido(pago, aprobado=True), gastado=_suma_por_pedido(gasto))
+        .order_by("creado", "pk")
+    )
+
+
+def _pagos(shopper, pedido, pago, gasto):
+    return (
+        pago.objects.filter(pedido__shopper=shopper)
+        .select_related("pedido__customer__user")
+        .order_by("creado", "pk")
+    )
+
+
+def _gastos(shopper, pedido, pago, gasto):
+    return gasto.objects.filter(shopper=shopper).select_related("pedido").order_by("creado", "pk")
+
+
+# nombre -> (título de hoja, queryset, [(columna, valor(obj))])
+LIBROS = {
+    "pedidos": (
+        "Pedidos",
+        _pedidos,
+        [
+            ("Pedido", lambda o: o.pk),
+            ("Fecha", lambda o: _fecha(o.creado)),
+            ("Título", lambda o: o.titulo),
+            ("Cliente", lambda o: _nombre(o.customer.user)),
+            ("Estado", lambda o: o.get_estado_display()),
+            ("Moneda", lambda o: o.moneda),
+            ("Precio", lambda o: o.precio),
+            ("Pagado", lambda o: o.pagado),
+            ("Gastos", lambda o: o.gastado),
+            ("Saldo", lambda o: (o.precio or 0) - o.pagado),
+            ("Ganancia", lambda o: o.pagado - o.gastado),
+        ],
+    ),
+    "pagos": (
+        "Pagos",
+        _pagos,
+        [
+            ("Pago", lambda p: p.pk),
+            ("Fecha", lambda p: _fecha(p.creado)),
+            ("Pedido", lambda p: p.pedido_id),
+            ("Título del pedido", lambda p: p.pedido.titulo),
+            ("Cliente", lambda p: _nombre(p.pedido.customer.user)),
+            ("Monto", lambda p: p.monto),
+            ("Moneda", lambda p: p.pedido.moneda),
+            ("Tipo", lambda p: p.get_tipo_pago_display()),
+            ("Método", lambda p: p.get_metodo_display()),
+            ("Reportado por", lambda p: p.get_creado_por_display()),
+            ("Estado", lambda p: "Aprobado" if p.aprobado else "Pendiente"),
+            ("Nota", lambda p: p.nota),
+        ],
+    ),
+    "gastos": (
+        "Gastos",
+        _gastos,
+        [
+            ("Gasto", lambda g: g.pk),
+            ("Fecha", lambda g: _fecha(g.creado)),
+            ("Pedido", lambda g: g.pedido_id or ""),
+            ("Título del pedido", lambda g: g.pedido.titulo if g.pedido_id else "(gasto general)"),
+            ("Categoría", lambda g: g.get_categoria_display()),
+            ("Monto", lambda g: g.monto),
+            ("Moneda", lambda g: g.moneda),
+            ("Descripción", lambda g: g.descripcion),
+        ],
+    ),
+}
+
+
+def _filas(shopper, libro):
+    _, queryset, columnas = LIBROS[libro]
+    for modelos in MODELOS:
+        for obj in queryset(shopper, *modelos).iterator(chunk_size=CHUNK_SIZE):
+            yield [valor(obj) for _, valor in columnas]
+
+
+# =========================
+# CSV
+# =========================
+class _Eco:
+    """
+    Pseudo-archivo para csv.writer: write() devuelve la línea en vez de guardarla.
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def _celda_csv(valor):
+    # Evita que Excel interprete notas de clientes como fórmulas
+    if isinstance(valor, str) and valor[:1] in ("=", "+", "-", "@"):
+        return "'" + valor
+    return valor
+
+
+def generar_csv(shopper, libro):
+    _, _, columnas = LIBROS[libro]
+    escritor = csv.writer(_Eco())
+    # BOM: Excel abre el UTF-8 con tildes bien
+    yield "\ufeff" + escritor.writerow([titulo for titulo, _ in columnas])
+    bloque = []
+    for fila in _filas(shopper, libro):
+        bloque.append(escritor.writerow([_celda_csv(v) for v in fila]))
+        if len(bloque) >= FILAS_POR_BLOQUE:
+            yield "".join(bloque)
+            bloque = []
+    if bloque:
+        yield "".join(bloque)
+
+
+# =========================
+# XLSX
+# =========================
+class _Tubo:
+    """
+    Destino de solo escritura para zipfile: acumula lo escrito hasta que se
+    retira. Sin tell()/seek(), zipfile escribe en modo streaming.
+    """
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+_RE_CONTROL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _col(i):
+    letras = ""
+    i += 1
+    while i:
+        i, resto = divmod(i - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _fila_xml(numero, valores):
+    celdas = []
+    for i, valor in enumerate(valores):
+        ref = f"{_col(i)}{numero}"
+        if valor is None or valor == "":
+            continue
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            celdas.append(f'<c r="{ref}"><v>{valor}</v></c>')
+        else:
+            texto = escape(_RE_CONTROL.sub("", str(valor)))
+            celdas.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>')
+    return f'<row r="{numero}">{"".join(celdas)}</row>'
+
+
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def _estructura(hojas):
+    """
+    Archivos fijos del paquete XLSX para las hojas dadas.
+    """
+    n = len(hojas)
+    tipos = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, n + 1)
+    )
+    hojas_xml = "".join(
+        f'<sheet name="{escape(titulo)}" sheetId="{i}" r:id="rId{i}"/>' for i, titulo in enumerate(hojas, start=1)
+    )
+    rels_hojas = "".join(
+        f'<Relationship Id="rId{i}" Type="{_NS_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, n + 1)
+    )
+    return {
+        "[Content_Types].xml": (
+            f'{_XML}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f"{tipos}</Types>"
+        ),
+        "_rels/.rels": (
+            f'{_XML}<Relationships xmlns="{_NS_PKG}">'
+            f'<Relationship Id="rId1" Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+            "</Relationships>"
+        ),
+        "xl/workbook.xml": (
+            f'{_XML}<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}"><sheets>{hojas_xml}</sheets></workbook>'
+        ),
+        "xl/_rels/workbook.xml.rels": f'{_XML}<Relationships xmlns="{_NS_PKG}">{rels_hojas}</Relationships>',
+    }
+
+
+def generar_xlsx(shopper, libros):
+    """
+    Un XLSX con una hoja por libro. Entrega bytes a medida que se comprimen.
+    """
+    tubo = _Tubo()
+    with zipfile.ZipFile(tubo, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for nombre, contenido in _estructura([LIBROS[libro][0] for libro in libros]).items():
+            zf.writestr(nombre, contenido)
+        yield tubo.retirar()
+
+        for i, libro in enumerate(libros, start=1):
+            _, _, columnas = LIBROS[libro]
+            with zf.open(f"xl/worksheets/sheet{i}.xml", "w", force_zip64=True) as hoja:
+                hoja.write(f'{_XML}<worksheet xmlns="{_NS_MAIN}"><sheetData>'.encode())
+                hoja.write(_fila_xml(1, [titulo for titulo, _ in columnas]).encode())
+                bloque = []
+                for numero, fila in enumerate(_filas(shopper, libro), start=2):
+                    bloque.append(_fila_xml(numero, fila))
+                    if len(bloque) >= FILAS_POR_BLOQUE:
+                        hoja.write("".join(bloque).encode())
+                        bloque = []
+                        datos = tubo.retirar()
+                        if datos:
+                            yield datos
+                hoja.write(("".join(bloque) + "</sheetData></worksheet>").encode())
+            yield tubo.retirar()
+    # Directorio central del zip
+    yield tubo.retirar()
+
+
+# =========================
+# Entrada
+# =========================
+def exportar(shopper, que, formato):
+    """
+    (nombre_archivo, iterador de contenido). `que` es un libro de LIBROS o
+    "todo" (solo XLSX: una hoja por libro). KeyError si no existe.
+    """
+    if formato not in FORMATOS:
+        raise KeyError(formato)
+    libros = list(LIBROS) if que == "todo" and formato == "xlsx" else [que]
+    faltan = [libro for libro in libros if libro not in LIBROS]
+    if faltan:
+        raise KeyError(faltan[0])
+    fecha = timezone.localdate().isoformat()
+    nombre = f"{que}_{fecha}.{formato}"
+    if formato == "csv":
+        return nombre, generar_csv(shopper, libros[0])
+    return nombre, generar_xlsx(shopper, libros)
+
+
+async def como_asincrono(iterador):
+    """
+    Bajo ASGI, Django junta en una lista todo iterador síncrono antes de
+    enviarlo; este lo consume de a un bloque en el hilo de la conexión a BD.
+    """
+    siguiente = sync_to_async(next, thread_sensitive=True)
+    fin = object()
+    while True:
+        parte = await siguiente(iterador, fin)
+        if parte is fin:
+            break
+        yield parte
@@ -301,4 +301,64 @@ class ExpenseGeneralForm(forms.ModelForm):
 
     class Meta:
         model = Expense
-        fields = ["categoria", "monto", "descripcion", "moneda"]
\ No newline at end of file
+        fields = ["categoria", "monto", "descripcion", "moneda"]
+
+class ExpenseGeneralFilaForm(ExpenseGeneralForm):
+    """
+    Una fila editable del historial de gastos generales (formset).
+    """
+
+    class Meta(ExpenseGeneralForm.Meta):
+        widgets = {
+            "categoria": forms.Select(attrs={"class": "form-select form-select-sm"}),
+            "monto": forms.NumberInput(attrs={"class": "form-control form-control-sm", "min": "0"}),
+            "descripcion": forms.TextInput(
+                attrs={"class": "form-control form-control-sm", "placeholder": "Descripción"}
+            ),
+            "moneda": forms.Select(attrs={"class": "form-select form-select-sm"}),
+        }
+
+
+class _PkFilaCargada(forms.ModelChoiceField):
+    """
+    pk de una fila existente del formset. Se resuelve contra las filas que el
+    formset ya cargó (una consulta) en vez de un .get() por fila.
+    """
+
+    def __init__(self, filas, *args, **kwargs):
+        self.filas = filas
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.filas[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise forms.ValidationError(self.error_messages["invalid_choice"], code="invalid_choice")
+
+
+class BaseFilasFormSet(forms.BaseModelFormSet):
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        if not hasattr(self, "_filas"):
+            self._filas = {obj.pk: obj for obj in self.get_queryset()}
+        nombre = self.model._meta.pk.name
+        campo = form.fields[nombre]
+        form.fields[nombre] = _PkFilaCargada(
+            self._filas,
+            campo.queryset,
+            initial=campo.initial,
+            required=False,
+            widget=campo.widget,
+        )
+
+
+ExpenseGeneralFormSet = forms.modelformset_factory(
+    Expense,
+    form=ExpenseGeneralFilaForm,
+    formset=BaseFilasFormSet,
+    extra=0,
+    can_delete=False,
+    edit_only=True,
+)
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:08:27 2026
+
+@author: jvz16
+"""
+
+# marketplace/http_cache.py
+# GET condicional (ETag / Last-Modified -> 304) y políticas de cache HTTP
+# para las páginas públicas.
+#
+# Los validadores salen de UNA consulta con subconsultas escalares sobre
+# `actualizado` (MAX) y COUNT(*) para detectar altas y borrados. Lo que se
+# muestra del shopper sin ser suyo (nombre del usuario, foto) adelanta su
+# `actualizado` al cambiar (ver conectar_senales).
+# Si el cliente ya tiene la versión vigente se responde 304 sin ejecutar la
+# vista ni renderizar el template.
+
+import hashlib
+import os
+from datetime import timezone as dt_timezone
+from functools import wraps
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+
+from . import metricas
+from .huecos import SESSION_YO, rellenar_huecos, usuario_id_sesion
+from .models import CarouselSlide, HeroBackground, Order, Review, ShopperPhoto, ShopperProfile, Trip
+
+
+def _version_codigo():
+    """
+    Hash del código, los templates y los estáticos del proyecto: el mismo en
+    todos los procesos de un deploy, distinto si cambia algo de eso.
+    """
+    base = Path(settings.BASE_DIR)
+    h = hashlib.sha1()
+    for carpeta in ("marketplace", "personal_shoppers", "templates", "static"):
+        for ruta in sorted((base / carpeta).rglob("*")):
+            if ruta.suffix in (".py", ".html", ".css", ".js") and ruta.is_file():
+                h.update(ruta.relative_to(base).as_posix().encode("utf-8"))
+                h.update(ruta.read_bytes())
+    return h.hexdigest()[:12]
+
+
+# Páginas sin datos (como_funciona, faqs) solo cambian con un deploy.
+# Render expone el commit desplegado; si no, el hash del código.
+VERSION_DEPLOY = os.environ.get("RENDER_GIT_COMMIT", "") or _version_codigo()
+
+
+def _tabla(modelo):
+    return connections[router.db_for_read(modelo)].ops.quote_name(modelo._meta.db_table)
+
+
+def _max(modelo, campo="actualizado", where=""):
+    return f"(SELECT MAX({campo}) FROM {_tabla(modelo)}{where})"
+
+
+def _count(modelo, where=""):
+    return f"(SELECT COUNT(*) FROM {_tabla(modelo)}{where})"
+
+
+def _alcance_home(kwargs):
+    partes = [
+        _max(ShopperProfile),
+        _count(ShopperProfile),
+        _max(Trip),
+        _count(Trip),
+        # Las reseñas no se editan: con el último id alcanza para el promedio
+        _max(Review, "id"),
+        _count(Order, " WHERE estado = %s"),
+        _max(CarouselSlide),
+        _count(CarouselSlide),
+        _max(HeroBackground),
+        _count(HeroBackground),
+    ]
+    return partes, ["ENTREGADO"]
+
+
+def _alcance_shoppers(kwargs):
+    return [_max(ShopperProfile), _count(ShopperProfile)], []
+
+
+def _alcance_shopper(kwargs):
+    pk = int(kwargs["pk"])
+    # El perfil muestra los pedidos atendidos
+    return [_max(ShopperProfile, where=" WHERE id = %s"), _count(Order, " WHERE shopper_id = %s")], [pk, pk]
+
+
+ALCANCES = {
+    "home": _alcance_home,
+    "shoppers": _alcance_shoppers,
+    "shopper": _alcance_shopper,
+}
+
+
+# =========================
+# Cambios que no pasan por `actualizado` del shopper
+# =========================
+def _tocar_shopper(**filtro):
+    # update() no dispara auto_now ni señales: solo mueve los validadores
+    ShopperProfile.objects.filter(**filtro).update(actualizado=timezone.now())
+
+
+def _al_guardar_usuario(sender, instance, created, update_fields=None, **kwargs):
+    # El login solo guarda last_login, que no se muestra
+    if created or (update_fields is not None and set(update_fields) <= {"last_login"}):
+        return
+    _tocar_shopper(user_id=instance.pk)
+
+
+def _al_cambiar_foto(sender, instance, **kwargs):
+    _tocar_shopper(pk=instance.shopper_id)
+
+
+def conectar_senales():
+    from django.contrib.auth import get_user_model
+    from django.db.models.signals import post_delete, post_save
+
+    post_save.connect(_al_guardar_usuario, sender=get_user_model(), dispatch_uid="http_cache_usuario")
+    for senal in (post_save, post_delete):
+        senal.connect(_al_cambiar_foto, sender=ShopperPhoto, dispatch_uid=f"http_cache_foto_{senal is post_save}")
+
+
+def _a_datetime(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        valor = parse_datetime(valor)
+    if valor is not None and timezone.is_naive(valor):
+        valor = timezone.make_aware(valor, dt_timezone.utc)
+    return valor
+
+
+def calcular_validadores(alcance, kwargs):
+    """
+    Devuelve (version, ultima_modificacion) del alcance. Una sola consulta.
+    """
+    if alcance == "estatico":
+        return VERSION_DEPLOY, None
+
+    partes, params = ALCANCES[alcance](kwargs)
+    alias = router.db_for_read(ShopperProfile)
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT " + ", ".join(partes), params)
+        fila = cursor.fetchone()
+
+    fechas = [d for d in (_a_datetime(v) for v in fila if not isinstance(v, int)) if d]
+    ultima = max(fechas) if fechas else None
+    version = "|".join("" if v is None else str(v) for v in fila)
+    return version, ultima
+
+
+def _identidad(request):
+    """
+    Quién pide la página, leyendo solo la sesión (sin consultar auth_user).
+    Incluye los datos que muestran los huecos: si cambia el nombre, cambia el ETag.
+    """
+    uid = usuario_id_sesion(request)
+    if uid is None:
+        return None
+    yo = request.session.get(SESSION_YO) or {}
+    return f"u{uid}|{yo.get('nombre', '')}|{yo.get('es_shopper', '')}|{yo.get('es_cliente', '')}"
+
+
+def _etag(alcance, version, quien, extra=""):
+    crudo = f"{alcance}|{VERSION_DEPLOY}|{version}|{quien or 'anon'}|{extra}"
+    return quote_etag(hashlib.sha1(crudo.encode("utf-8")).hexdigest()[:20])
+
+
+def _aplicar_politica(request, response, quien, claves):
+    patch_vary_headers(response, ("Cookie",))
+    mostro_mensajes = getattr(getattr(request, "_messages", None), "used", False)
+    if quien or response.cookies or mostro_mensajes:
+        # HTML con datos del usuario (navbar, mensajes) o cookies nuevas: solo
+        # el navegador puede guardarlo, y siempre revalida con el ETag.
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.HTTP_CACHE_MAX_AGE,
+            s_maxage=settings.HTTP_CACHE_S_MAXAGE,
+            stale_while_revalidate=settings.HTTP_CACHE_STALE_WHILE_REVALIDATE,
+        )
+    if claves:
+        valor = " ".join(claves)
+        for header in settings.HTTP_CACHE_SURROGATE_HEADERS:
+            response[header] = valor
+
+
+# =========================
+# Cache de página completa (HTML compartido + huecos)
+# =========================
+def _clave_pagina(alcance, request, version, extra):
+    crudo = f"{VERSION_DEPLOY}|{version}|{extra}|{request.get_full_path()}"
+    return f"pagina:{alcance}:{hashlib.sha1(crudo.encode('utf-8')).hexdigest()}"
+
+
+def _guardar_compartida(response):
+    """
+    HTML del render compartido, o None si la respuesta no se puede reutilizar.
+    """
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None
+    return response.content.decode(response.charset)
+
+
+def pagina_publica(alcance, surrogate_keys=None, usar_last_modified=True, por_dia=False, cache_pagina=False):
+    """
+    Decorador para vistas públicas (sync o async):
+    - calcula ETag (y Last-Modified) con calcular_validadores()
+    - responde 304 sin ejecutar la vista si el cliente está al día
+    - con `cache_pagina=True` guarda el render compartido en cache (la clave
+      lleva la versión de los validadores, así que nunca sirve HTML viejo) y
+      rellena los huecos del usuario al servirlo (ver huecos.py)
+    - agrega Cache-Control / Vary / Surrogate-Key
+
+    `surrogate_keys(kwargs)` devuelve las claves para purgar en el CDN.
+    `por_dia=True` mete la fecha de hoy en el ETag (páginas cuyo contenido
+    depende del día, p.ej. "viajan pronto"); en ese caso Last-Modified no
+    sirve como validador y se omite.
+    """
+
+    def decorador(vista):
+        def _pre(request, version, ultima):
+            extra = timezone.localdate().isoformat() if por_dia else ""
+            quien = _identidad(request)
+            etag = _etag(alcance, version, quien, extra)
+            lm = None
+            if usar_last_modified and not por_dia and ultima is not None:
+                lm = int(ultima.timestamp())
+            response = get_conditional_response(request, etag=etag, last_modified=lm)
+            metricas.registrar_cache("http_" + alcance, response is not None)
+            return extra, etag, lm, response
+
+        def _post(request, response, etag, lm, kwargs):
+            if response.status_code not in (200, 304):
+                return response
+            response.headers.setdefault("ETag", etag)
+            if lm and not response.has_header("Last-Modified"):
+                response.headers["Last-Modified"] = http_date(lm)
+            claves = surrogate_keys(kwargs) if surrogate_keys else [alcance]
+            _aplicar_politica(request, response, _identidad(request), claves)
+            return response
+
+        def _usar_cache():
+            return cache_pagina and settings.PAGINA_CACHE_ACTIVA
+
+        if iscoroutinefunction(vista):
+
+            async def _render_compartido(request, args, kwargs, clave):
+                html = await cache.aget(clave)
+                metricas.registrar_cache("pagina_" + alcance, html is not None)
+                if html is not None:
+                    return HttpResponse(await sync_to_async(rellenar_huecos)(request, html))
+                request.pagina_compartida = True
+                try:
+                    response = await vista(request, *args, **kwargs)
+                finally:
+                    request.pagina_compartida = False
+                html = _guardar_compartida(response)
+                if html is not None:
+                    await cache.aset(clave, html, settings.PAGINA_CACHE_SEGUNDOS)
+                    response.content = await sync_to_async(rellenar_huecos)(request, html)
+                return response
+
+            @wraps(vista)
+            async def inner(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await vista(request, *args, **kwargs)
+                version, ultima = await sync_to_async(calcular_validadores)(alcance, kwargs)
+                extra, etag, lm, response = await sync_to_async(_pre)(request, version, ultima)
+                if response is None:
+                    if _usar_cache():
+                        clave = _clave_pagina(alcance, request, version, extra)
+                        response = await _render_compartido(request, args, kwargs, clave)
+                    else:
+                        response = await vista(request, *args, **kwargs)
+                return await sync_to_async(_post)(request, response, etag, lm, kwargs)
+
+        else:
+
+            def _render_compartido(request, args, kwargs, clave):
+                html = cache.get(clave)
+                metricas.registrar_cache("pagina_" + alcance, html is not None)
+                if html is not None:
+                    return HttpResponse(rellenar_huecos(request, html))
+                request.pagina_compartida = True
+                try:
+                    response = vista(request, *args, **kwargs)
+                finally:
+                    request.pagina_compartida = False
+                html = _guardar_compartida(response)
+                if html is not None:
+                    cache.set(clave, html, settings.PAGINA_CACHE_SEGUNDOS)
+                    response.content = rellenar_huecos(request, html)
+                return response
+
+            @wraps(vista)
+            def inner(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return vista(request, *args, **kwargs)
+                version, ultima = calcular_validadores(alcance, kwargs)
+                extra, etag, lm, response = _pre(request, version, ultima)
+                if response is None:
+                    if _usar_cache():
+                        clave = _clave_pagina(alcance, request, version, extra)
+                        response = _render_compartido(request, args, kwargs, clave)
+                    else:
+                        response = vista(request, *args, **kwargs)
+                return _post(request, response, etag, lm, kwargs)
+
+        return inner
+
+    return decorador
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:52:40 2026
+
+@author: jvz16
+"""
+
+# marketplace/huecos.py
+# Cache de página completa con "huecos" por usuario (hole-punching).
+#
+# home y buscar_shoppers se renderizan UNA vez en modo compartido (como
+# anónimo) y ese HTML se guarda en cache. Las partes que dependen del
+# usuario (navbar, botones del hero, vitrina, mensajes) van marcadas con
+#   <!--hueco:nombre--> contenido anónimo <!--/hueco:nombre-->
+# y al servir la página se rellenan con marketplace/huecos/<nombre>.html.
+#
+# Los datos del usuario para esos huecos (`yo`) viven en la sesión, así que
+# rellenarlos cuesta una lectura de sesión y nada más: ni auth_user ni
+# perfiles.
+
+import re
+
+from django.contrib.auth import SESSION_KEY
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import CustomerProfile, ShopperProfile
+
+SESSION_YO = "_ps_yo"
+
+_RE_HUECO = re.compile(r"<!--hueco:(?P<nombre>[\w-]+)-->(?P<contenido>.*?)<!--/hueco:(?P=nombre)-->", re.DOTALL)
+
+
+def plantilla_hueco(nombre):
+    return f"marketplace/huecos/{nombre}.html"
+
+
+def marcar_hueco(nombre, contenido):
+    return f"<!--hueco:{nombre}-->{contenido}<!--/hueco:{nombre}-->"
+
+
+# =========================
+# Datos del usuario (en sesión)
+# =========================
+def usuario_id_sesion(request):
+    """
+    id del usuario logueado según la sesión, sin consultar auth_user.
+    """
+    session = getattr(request, "session", None)
+    if session is None:
+        return None
+    return session.get(SESSION_KEY)
+
+
+def datos_usuario(request):
+    """
+    Lo que los huecos necesitan del usuario: nombre, inicial y rol.
+    Se calcula una vez por sesión (o tras olvidar_datos_usuario).
+    """
+    uid = usuario_id_sesion(request)
+    if uid is None:
+        return None
+    yo = request.session.get(SESSION_YO)
+    if yo and yo.get("id") == str(uid):
+        return yo
+
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    nombre = user.get_full_name() or user.username
+    es_shopper = ShopperProfile.objects.filter(user_id=user.pk).exists()
+    yo = {
+        "id": str(user.pk),
+        "nombre": nombre,
+        "inicial": nombre[:1].upper(),
+        "es_shopper": es_shopper,
+        "es_cliente": not es_shopper and CustomerProfile.objects.filter(user_id=user.pk).exists(),
+    }
+    request.session[SESSION_YO] = yo
+    return yo
+
+
+def olvidar_datos_usuario(request):
+    """
+    Llamar cuando cambia algo que muestran los huecos (p.ej. el nombre).
+    """
+    request.session.pop(SESSION_YO, None)
+
+
+def contexto_usuario(request):
+    """
+    Context processor: `yo` para los templates de marketplace/huecos/.
+    """
+    return {"yo": datos_usuario(request)}
+
+
+# =========================
+# Relleno
+# =========================
+def rellenar_huecos(request, html):
+    """
+    Sustituye cada hueco del HTML compartido por su versión para este
+    request. Corre con los context processors normales (csrf, messages).
+    """
+
+    def _rellenar(match):
+        return render_to_string(
+            plantilla_hueco(match.group("nombre")),
+            {"contenido": mark_safe(match.group("contenido"))},
+            request=request,
+        )
+
+    return _RE_HUECO.sub(_rellenar, html)
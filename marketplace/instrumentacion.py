@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:20:33 2026
+
+@author: jvz16
+"""
+
+# marketplace/instrumentacion.py
+# Medición por request: consultas SQL (vía connection.execute_wrapper),
+# tiempo total de BD, consultas más lentas con fingerprint normalizado y
+# tiempo de render de templates. Lo usa InstrumentacionMiddleware.
+
+import contextvars
+import hashlib
+import re
+import time
+
+# Request que se está midiendo en este contexto (hilo o tarea async)
+_medicion_actual = contextvars.ContextVar("medicion_actual", default=None)
+
+_RE_IN_LISTA = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?|'[^']*'|-?\d+(?:\.\d+)?)\s*,?)+\)", re.IGNORECASE)
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b-?\d+(?:\.\d+)?\b")
+_RE_PLACEHOLDER = re.compile(r"%s|\?")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar_sql(sql):
+    """
+    Convierte una sentencia en su "forma" estable: literales y parámetros
+    pasan a '?', las listas IN se colapsan y se comprimen espacios.
+    Dos consultas que solo difieren en valores quedan iguales.
+    """
+    sql = _RE_IN_LISTA.sub("IN (...)", sql)
+    sql = _RE_STRING.sub("?", sql)
+    sql = _RE_NUMERO.sub("?", sql)
+    sql = _RE_PLACEHOLDER.sub("?", sql)
+    return _RE_ESPACIOS.sub(" ", sql).strip()
+
+
+def fingerprint_sql(sql_normalizado):
+    return hashlib.md5(sql_normalizado.encode("utf-8")).hexdigest()[:12]
+
+
+class MedicionRequest:
+    """
+    Acumula lo que pasa durante un request. Solo guarda las `top_n`
+    consultas más lentas para no crecer con páginas que hacen cientos.
+    """
+
+    def __init__(self, top_n=5, umbral_sql_ms=None):
+        self.inicio = time.perf_counter()
+        self.top_n = top_n
+        self.umbral_sql_ms = umbral_sql_ms
+        self.consultas = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.lentas = []  # [(ms, sql)]
+        self.sobre_umbral = []  # [(ms, sql)]
+        self._profundidad_template = 0
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def registrar_sql(self, sql, ms):
+        self.consultas += 1
+        self.db_ms += ms
+        if self.umbral_sql_ms is not None and ms >= self.umbral_sql_ms:
+            self.sobre_umbral.append((ms, sql))
+        if len(self.lentas) < self.top_n:
+            self.lentas.append((ms, sql))
+            self.lentas.sort(key=lambda x: -x[0])
+        elif ms > self.lentas[-1][0]:
+            self.lentas[-1] = (ms, sql)
+            self.lentas.sort(key=lambda x: -x[0])
+
+    def __call__(self, execute, sql, params, many, context):
+        # Firma de connection.execute_wrapper
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.registrar_sql(sql, (time.perf_counter() - inicio) * 1000)
+
+    def consultas_lentas(self):
+        salida = []
+        for ms, sql in self.lentas:
+            norm = normalizar_sql(sql)
+            salida.append({"ms": round(ms, 2), "fingerprint": fingerprint_sql(norm), "sql": norm[:500]})
+        return salida
+
+    def server_timing(self):
+        return ", ".join(
+            [
+                f'db;dur={self.db_ms:.1f};desc="{self.consultas} queries"',
+                f"tpl;dur={self.template_ms:.1f}",
+                f"total;dur={self.total_ms:.1f}",
+            ]
+        )
+
+
+def medicion_actual():
+    return _medicion_actual.get()
+
+
+def activar(medicion):
+    return _medicion_actual.set(medicion)
+
+
+def desactivar(token):
+    _medicion_actual.reset(token)
+
+
+# =========================
+# Tiempo de render de templates
+# =========================
+_template_parcheado = False
+
+
+def instalar_medicion_templates():
+    """
+    Envuelve django.template.base.Template.render una sola vez por proceso.
+    Solo suma tiempo cuando hay una medición activa y únicamente para el
+    template de nivel superior (los {% include %} anidados ya quedan dentro).
+    """
+    global _template_parcheado
+    if _template_parcheado:
+        return
+    from django.template.base import Template
+
+    render_original = Template.render
+
+    def render_medido(self, context):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return render_original(self, context)
+        medicion._profundidad_template += 1
+        inicio = time.perf_counter()
+        try:
+            return render_original(self, context)
+        finally:
+            medicion._profundidad_template -= 1
+            if medicion._profundidad_template == 0:
+                medicion.template_ms += (time.perf_counter() - inicio) * 1000
+
+    Template.render = render_medido
+    _template_parcheado = True
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 00:52:18 2026
+
+@author: jvz16
+"""
+
+# marketplace/limites.py
+# Límites de tasa (balde de fichas) y de concurrencia.
+#
+# Tasa: las vistas caras (login, registro de shopper con foto, crear pedido,
+# reportar pago) se marcan con @limitar("regla"). LimiteTasaMiddleware
+# revisa la marca en process_view, antes que CsrfViewMiddleware (que ya
+# parsearía el upload), y descuenta una ficha del balde de la IP, del usuario
+# y, si la regla lo pide, de la cuenta que se intenta (username del login).
+# Si alguno está vacío responde 429 con Retry-After. Solo cuentan los POST.
+#
+# Concurrencia: LimiteConcurrenciaMiddleware lleva los requests en curso y
+# responde 503 con Retry-After cuando se pasa de CONCURRENCIA_MAXIMA.
+#
+# Si el cache LIMITES_CACHE es Redis, todo el estado es compartido entre
+# workers y cada operación es un script Lua (atómico, con el reloj de
+# Redis). Si no (o si Redis falla):
+# - Los baldes viven en la BD (BaldeLimite) y se descuentan con un solo
+#   UPDATE condicional, atómico en cualquier base. Solo se tocan en los POST
+#   a vistas marcadas, y sin estado compartido un atacante repartiría sus
+#   intentos entre los workers.
+# - Los requests en curso se cuentan en cada proceso (un entero con lock):
+#   es lo que se mira en todos los requests, justo cuando hay sobrecarga, y
+#   no puede costar escrituras en la BD. CONCURRENCIA_MAXIMA vale entonces
+#   por proceso.
+# Si la BD también falla se deja pasar (nunca se corta el sitio por el
+# limitador).
+
+import hashlib
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least
+from django.db.models.lookups import GreaterThanOrEqual
+
+from .models import BaldeLimite
+
+logger = logging.getLogger(__name__)
+
+METODOS_SEGUROS = ("GET", "HEAD", "OPTIONS")
+
+# Un request que lleve más que esto en el conteo de Redis se da por muerto
+# (worker reiniciado a la mitad): se descarta solo, sin fugas
+VIDA_MAXIMA_REQUEST = 120
+
+# Fracción de los baldes nuevos en la BD que además purgan los ya llenos
+PROBABILIDAD_PURGA = 0.01
+
+_LUA_BALDE = """
+local capacidad = tonumber(ARGV[1])
+local tasa = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local ahora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local balde = redis.call('HMGET', KEYS[1], 'fichas', 'ts')
+local fichas = tonumber(balde[1]) or capacidad
+local ts = tonumber(balde[2]) or ahora
+fichas = math.min(capacidad, fichas + math.max(0, ahora - ts) * tasa)
+local permitido = 0
+if fichas >= 1 then
+  fichas = fichas - 1
+  permitido = 1
+end
+redis.call('HSET', KEYS[1], 'fichas', tostring(fichas), 'ts', tostring(ahora))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacidad / tasa) + 1)
+return {permitido, tostring((1 - fichas) / tasa)}
+"""
+
+_LUA_ENTRAR = """
+local t = redis.call('TIME')
+local ahora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ahora - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+  return 0
+end
+redis.call('ZADD', KEYS[1], ahora, ARGV[3])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+return 1
+"""
+
+
+def _cache():
+    return caches[settings.LIMITES_CACHE]
+
+
+def _redis(clave):
+    """
+    (cliente, clave_real) si el cache de límites es Redis; si no (None, None).
+    """
+    cache = _cache()
+    if not isinstance(cache, RedisCache):
+        return None, None
+    clave = cache.make_and_validate_key(clave)
+    return cache._cache.get_client(clave, write=True), clave
+
+
+# =========================
+# Balde de fichas
+# =========================
+def leer_regla(texto):
+    """
+    "capacidad/segundos" -> (capacidad, fichas_por_segundo). La capacidad es
+    la ráfaga permitida y el balde se llena de nuevo en `segundos`.
+    """
+    capacidad, _, segundos = texto.partition("/")
+    capacidad, segundos = int(capacidad), float(segundos)
+    if capacidad < 1 or segundos <= 0:
+        raise ValueError(f"Regla de límite inválida: {texto!r}")
+    return capacidad, capacidad / segundos
+
+
+def _tomar_bd(clave, capacidad, tasa):
+    capacidad = float(capacidad)
+    for _ in range(3):
+        ahora = time.time()
+        disponibles = Least(
+            Value(capacidad), F("fichas") + Greatest(Value(0.0), Value(ahora) - F("ts")) * Value(tasa)
+        )
+        # Recarga y descuento en el mismo UPDATE: dos workers no pueden
+        # gastar la misma ficha
+        if (
+            BaldeLimite.objects.filter(pk=clave)
+            .filter(GreaterThanOrEqual(disponibles, 1))
+            .update(
+                fichas=disponibles - 1,
+                ts=Value(ahora),
+                lleno=Value(ahora) + (Value(capacidad) - disponibles + 1) / Value(tasa),
+            )
+        ):
+            return True, 0.0
+
+        fila = BaldeLimite.objects.using(DEFAULT_DB_ALIAS).filter(pk=clave).values_list("fichas", "ts").first()
+        if fila is None:
+            try:
+                with transaction.atomic():
+                    BaldeLimite.objects.create(clave=clave, fichas=capacidad - 1, ts=ahora, lleno=ahora + 1 / tasa)
+            except IntegrityError:
+                continue  # otro worker lo creó recién: de nuevo con el UPDATE
+            if random.random() < PROBABILIDAD_PURGA:
+                BaldeLimite.objects.filter(lleno__lte=ahora).delete()
+            return True, 0.0
+
+        fichas, ts = fila
+        fichas = min(capacidad, fichas + max(0.0, ahora - ts) * tasa)
+        if fichas < 1:
+            return False, (1 - fichas) / tasa
+        # Se recargó entre el UPDATE y la lectura: otra vuelta
+    return False, 1 / tasa
+
+
+def tomar_ficha(clave, capacidad, tasa):
+    """
+    Descuenta una ficha del balde `clave`. Devuelve (permitido, espera): si
+    no hay ficha, `espera` son los segundos hasta la próxima.
+    """
+    if len(clave) > BaldeLimite._meta.get_field("clave").max_length:
+        # Lo que manda el cliente (username) puede ser largo
+        clave = "limite:h:" + hashlib.sha256(clave.encode()).hexdigest()
+    cliente, clave_real = _redis(clave)
+    if cliente is not None:
+        try:
+            permitido, espera = cliente.eval(_LUA_BALDE, 1, clave_real, capacidad, tasa)
+            return bool(permitido), float(espera)
+        except Exception:
+            logger.warning("Límite de tasa: Redis no responde, se usa la BD", exc_info=True)
+    try:
+        return _tomar_bd(clave, capacidad, tasa)
+    except DatabaseError:
+        logger.warning("Límite de tasa: la BD no responde, se deja pasar", exc_info=True)
+        return True, 0.0
+
+
+def ip_cliente(request):
+    """
+    IP del cliente. Detrás de LIMITES_PROXIES proxies de confianza (Render
+    pone uno) se toma de X-Forwarded-For contando desde la derecha: lo que
+    está más a la izquierda lo escribe el propio cliente.
+    """
+    proxies = settings.LIMITES_PROXIES
+    if proxies:
+        saltos = [ip.strip() for ip in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if ip.strip()]
+        if len(saltos) >= proxies:
+            return saltos[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def limitar(regla, por_cuenta=None):
+    """
+    Marca una vista (función o clase) para LimiteTasaMiddleware. `regla` es
+    una clave de LIMITES_TASA; `por_cuenta` es el campo del POST que
+    identifica la cuenta atacada (p.ej. "username" en el login).
+    """
+
+    def decorador(vista):
+        vista.limite_tasa = (regla, por_cuenta)
+        return vista
+
+    return decorador
+
+
+def revisar(request, regla, por_cuenta=None):
+    """
+    Descuenta de todos los baldes del request. Devuelve None si pasa o
+    (clave, espera) del primero que rechazó.
+    """
+    capacidad, tasa = leer_regla(settings.LIMITES_TASA[regla])
+    claves = [("ip", ip_cliente(request))]
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        claves.append(("usuario", str(user.pk)))
+    if por_cuenta:
+        cuenta = (request.POST.get(por_cuenta) or "").strip().lower()
+        if cuenta:
+            claves.append(("cuenta", cuenta))
+
+    for tipo, valor in claves:
+        permitido, espera = tomar_ficha(f"limite:{regla}:{tipo}:{valor}", capacidad, tasa)
+        if not permitido:
+            return tipo, espera
+    return None
+
+
+# =========================
+# Requests en curso
+# =========================
+class Concurrencia:
+    """
+    Conteo de requests en curso: entre todos los workers con Redis, por
+    proceso si no. entrar() devuelve una ficha (o None si hay que descartar
+    el request) que se devuelve con salir().
+    """
+
+    CLAVE = "limite:en_curso"
+
+    def __init__(self, maxima):
+        self.maxima = maxima
+        self.compartida = isinstance(_cache(), RedisCache)
+        self._lock = threading.Lock()
+        self._en_curso = 0
+
+    def entrar(self):
+        if self.compartida:
+            ficha = uuid.uuid4().hex
+            cliente, clave = _redis(self.CLAVE)
+            # Conjunto ordenado por hora de entrada: lo que quedó de un worker
+            # muerto vence a los VIDA_MAXIMA_REQUEST segundos
+            try:
+                if not cliente.eval(_LUA_ENTRAR, 1, clave, self.maxima, VIDA_MAXIMA_REQUEST, ficha):
+                    return None
+                return ("redis", ficha)
+            except Exception:
+                logger.warning("Límite de concurrencia: Redis no responde, se cuenta en el proceso", exc_info=True)
+        with self._lock:
+            if self._en_curso >= self.maxima:
+                return None
+            self._en_curso += 1
+        return ("local", None)
+
+    def salir(self, ficha):
+        origen, ficha = ficha
+        if origen == "local":
+            with self._lock:
+                self._en_curso -= 1
+            return
+        try:
+            cliente, clave = _redis(self.CLAVE)
+            cliente.zrem(clave, ficha)
+        except Exception:
+            logger.warning("Límite de concurrencia: no se pudo liberar la ficha", exc_info=True)
+
+
+def reintentar_en(espera):
+    return str(max(1, math.ceil(espera)))
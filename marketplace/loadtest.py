@@ -0,0 +1,634 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:40 2026
+
+@author: jvz16
+"""
+
+# marketplace/loadtest.py
+# Motor de carga mínimo (solo stdlib) para medir el sitio contra un servidor
+# local: runserver, gunicorn sync o gunicorn + UvicornWorker.
+
+import http.client
+import random
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import (
+    CustomerProfile,
+    ShopperProfile,
+    Trip,
+    Order,
+    OrderItem,
+    Payment,
+    Expense,
+    Review,
+)
+
+# Clave usada por todos los usuarios sembrados
+PASSWORD_CARGA = "carga-local-123"
+
+# Header con el número de consultas SQL (ver ConteoConsultasMiddleware)
+HEADER_CONSULTAS = "X-DB-Queries"
+
+
+# =========================
+# Datos de prueba
+# =========================
+def sembrar_datos(n_shoppers=50, n_clientes=200, pedidos_por_cliente=5, prefijo="carga"):
+    """
+    Crea (o completa) un dataset determinista para pruebas de carga.
+    Es idempotente: si los usuarios ya existen no los duplica.
+    Devuelve (usernames_shoppers, usernames_clientes).
+    """
+    User = get_user_model()
+    hoy = timezone.now().date()
+
+    shoppers = []
+    for i in range(n_shoppers):
+        username = f"{prefijo}_shopper_{i}"
+        user, creado = User.objects.get_or_create(username=username)
+        if creado:
+            user.set_password(PASSWORD_CARGA)
+            user.save()
+        en_usa = i % 3 == 0
+        shopper, _ = ShopperProfile.objects.get_or_create(
+            user=user,
+            defaults={
+                "telefono_nacional": f"8{i:07d}",
+                "ciudad_base": "San José",
+                "especialidades": "ROPA,TECH",
+                "actualmente_en_el_extranjero": en_usa,
+                "pais_extranjero": "USA" if en_usa else "",
+                "calificacion": round(3 + (i % 20) / 10, 2),
+            },
+        )
+        if i % 4 == 0 and not shopper.viajes.exists():
+            Trip.objects.create(
+                shopper=shopper,
+                ciudad_destino="Miami",
+                pais_destino="USA",
+                fecha_inicio=hoy + timedelta(days=1 + i % 6),
+                fecha_fin=hoy + timedelta(days=10),
+            )
+        shoppers.append(shopper)
+
+    clientes = []
+    for i in range(n_clientes):
+        username = f"{prefijo}_cliente_{i}"
+        user, creado = User.objects.get_or_create(username=username)
+        if creado:
+            user.set_password(PASSWORD_CARGA)
+            user.save()
+        cliente, _ = CustomerProfile.objects.get_or_create(
+            user=user,
+            defaults={"telefono_nacional": f"7{i:07d}"},
+        )
+        clientes.append(cliente)
+
+    for i, cliente in enumerate(clientes):
+        faltan = pedidos_por_cliente - cliente.pedidos.count()
+        for j in range(max(faltan, 0)):
+            shopper = shoppers[(i + j) % len(shoppers)] if shoppers and j % 2 else None
+            estado = "BUSCANDO_SHOPPER"
+            if shopper:
+                estado = "ENTREGADO" if j % 4 == 1 else "EN_SELECCION"
+            pedido = Order.objects.create(
+                customer=cliente,
+                shopper=shopper,
+                titulo=f"Pedido de carga {i}-{j}",
+                estado=estado,
+                precio=10000 + j * 500,
+                presupuesto_maximo_total=50000,
+            )
+            OrderItem.objects.create(pedido=pedido, nombre="Tenis", categoria="CALZADO")
+            if shopper:
+                Payment.objects.create(
+                    pedido=pedido, monto=5000, tipo_pago="ADELANTO", metodo="SINPE"
+                )
+                Expense.objects.create(
+                    pedido=pedido, shopper=shopper, categoria="PRODUCTO", monto=3000
+                )
+                if estado != "ENTREGADO":
+                    # Reporte del cliente pendiente de aprobación
+                    Payment.objects.create(
+                        pedido=pedido,
+                        monto=2000,
+                        tipo_pago="PARCIAL",
+                        metodo="SINPE",
+                        creado_por="CLIENTE",
+                        aprobado=False,
+                    )
+            if estado == "ENTREGADO":
+                Review.objects.create(
+                    order=pedido, shopper=shopper, customer=cliente, rating=4 + j % 2
+                )
+
+    return (
+        [s.user.username for s in shoppers],
+        [c.user.username for c in clientes],
+    )
+
+
+def usuarios_sembrados(n_shoppers=50, n_clientes=200, prefijo="carga"):
+    """
+    Los usuarios que ya sembró sembrar_datos, sin escribir nada.
+    Devuelve (usernames_shoppers, usernames_clientes).
+    """
+    shoppers = ShopperProfile.objects.filter(user__username__startswith=f"{prefijo}_shopper_")
+    clientes = CustomerProfile.objects.filter(user__username__startswith=f"{prefijo}_cliente_")
+    return (
+        list(shoppers.order_by("pk").values_list("user__username", flat=True)[:n_shoppers]),
+        list(clientes.order_by("pk").values_list("user__username", flat=True)[:n_clientes]),
+    )
+
+
+# =========================
+# Métricas
+# =========================
+def percentil(valores, p):
+    """
+    Percentil por rango más cercano (p entre 0 y 100) sobre una lista de floats.
+    """
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[idx]
+
+
+class ResultadoEndpoint:
+    """
+    Acumula latencias (ms), errores y consultas de un endpoint.
+    """
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.latencias = []
+        self.errores = 0
+        self.consultas = []
+
+    @property
+    def total(self):
+        return len(self.latencias)
+
+    def resumen(self, duracion):
+        lat = self.latencias
+        return {
+            "endpoint": self.nombre,
+            "requests": self.total,
+            "rps": self.total / duracion if duracion else 0.0,
+            "p50_ms": percentil(lat, 50),
+            "p95_ms": percentil(lat, 95),
+            "p99_ms": percentil(lat, 99),
+            "error_rate": self.errores / self.total if self.total else 0.0,
+            "consultas_prom": sum(self.consultas) / len(self.consultas) if self.consultas else None,
+        }
+
+
+# =========================
+# Cliente HTTP con keep-alive y cookies
+# =========================
+class ClienteHTTP:
+    """
+    Cliente mínimo por hilo: una conexión keep-alive y un "cookie jar" simple.
+    Se envía X-Forwarded-Proto para que, con DEBUG=False, el
+    SECURE_SSL_REDIRECT de settings no convierta todo en 301.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        partes = urlsplit(base_url)
+        self.host = partes.hostname or "127.0.0.1"
+        self.port = partes.port or 80
+        self.timeout = timeout
+        self.cookies = {}
+        self._conn = None
+
+    def _conexion(self):
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def cerrar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def post(self, ruta, datos):
+        """
+        POST de formulario con el token CSRF tomado de la cookie.
+        """
+        datos = dict(datos)
+        datos["csrfmiddlewaretoken"] = self.cookies.get("csrftoken", "")
+        return self.request(
+            "POST",
+            ruta,
+            body=urlencode(datos),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+
+    def login(self, username, password=PASSWORD_CARGA):
+        """
+        Hace el flujo real de /login/ (GET para la cookie CSRF + POST).
+        Devuelve True si quedó con sesión.
+        """
+        self.request("GET", "/login/")
+        status, _, _, _ = self.post("/login/", {"username": username, "password": password})
+        return status == 302 and "sessionid" in self.cookies
+
+    def request(self, metodo, ruta, body=None, headers=None):
+        """
+        Devuelve (status, headers, cuerpo_bytes, latencia_ms).
+        """
+        h = {
+            "Host": f"{self.host}:{self.port}",
+            "X-Forwarded-Proto": "https",
+            "Referer": f"https://{self.host}:{self.port}{ruta}",
+        }
+        if self.cookies:
+            h["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        if headers:
+            h.update(headers)
+
+        inicio = time.perf_counter()
+        try:
+            conn = self._conexion()
+            conn.request(metodo, ruta, body=body, headers=h)
+            resp = conn.getresponse()
+            cuerpo = resp.read()
+        except (OSError, http.client.HTTPException):
+            self.cerrar()
+            raise
+        latencia = (time.perf_counter() - inicio) * 1000
+
+        for nombre, valor in resp.getheaders():
+            if nombre.lower() == "set-cookie":
+                par = valor.split(";", 1)[0]
+                if "=" in par:
+                    k, v = par.split("=", 1)
+                    self.cookies[k.strip()] = v.strip()
+        if resp.getheader("Connection", "").lower() == "close":
+            self.cerrar()
+        return resp.status, resp.getheaders(), cuerpo, latencia
+
+
+# =========================
+# Corrida de carga
+# =========================
+def correr_carga(base_url, rutas, concurrencia=16, duracion=10.0, calentamiento=1.0):
+    """
+    Golpea `rutas` (lista de paths GET) en round-robin con `concurrencia` hilos
+    durante `duracion` segundos. Devuelve dict con totales y por endpoint.
+    """
+    resultados = {ruta: ResultadoEndpoint(ruta) for ruta in rutas}
+    lock = threading.Lock()
+    t_fin_calentamiento = time.perf_counter() + calentamiento
+    t_fin = t_fin_calentamiento + duracion
+
+    def trabajador(n):
+        cliente = ClienteHTTP(base_url)
+        i = n
+        while True:
+            ahora = time.perf_counter()
+            if ahora >= t_fin:
+                break
+            ruta = rutas[i % len(rutas)]
+            i += 1
+            try:
+                status, _, _, latencia = cliente.request("GET", ruta)
+                error = status >= 400
+            except (OSError, http.client.HTTPException):
+                latencia, error = (time.perf_counter() - ahora) * 1000, True
+            if ahora < t_fin_calentamiento:
+                continue
+            with lock:
+                r = resultados[ruta]
+                r.latencias.append(latencia)
+                if error:
+                    r.errores += 1
+        cliente.cerrar()
+
+    hilos = [threading.Thread(target=trabajador, args=(n,), daemon=True) for n in range(concurrencia)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    todas = []
+    errores = 0
+    for r in resultados.values():
+        todas.extend(r.latencias)
+        errores += r.errores
+
+    return {
+        "requests": len(todas),
+        "rps": len(todas) / duracion if duracion else 0.0,
+        "p50_ms": percentil(todas, 50),
+        "p99_ms": percentil(todas, 99),
+        "error_rate": errores / len(todas) if todas else 0.0,
+        "endpoints": [r.resumen(duracion) for r in resultados.values()],
+    }
+
+
+def correr_rafaga(base_url, ruta, datos=None, concurrencia=16, duracion=10.0):
+    """
+    Ráfaga contra una sola ruta (POST de formulario si hay `datos`, si no
+    GET) para ver cómo responden los límites. Todos los hilos salen de la
+    misma IP. Devuelve, por status, cantidad, p50/p99 y los Retry-After vistos.
+    """
+    por_status = {}
+    lock = threading.Lock()
+    t_fin = time.perf_counter() + duracion
+
+    def trabajador():
+        cliente = ClienteHTTP(base_url)
+        if datos is not None:
+            cliente.request("GET", ruta)  # cookie CSRF
+        while time.perf_counter() < t_fin:
+            try:
+                if datos is None:
+                    status, headers, _, latencia = cliente.request("GET", ruta)
+                else:
+                    status, headers, _, latencia = cliente.post(ruta, datos)
+            except (OSError, http.client.HTTPException):
+                status, headers, latencia = 0, [], None
+            reintentar = dict((k.lower(), v) for k, v in headers).get("retry-after")
+            with lock:
+                r = por_status.setdefault(status, {"n": 0, "latencias": [], "retry_after": set()})
+                r["n"] += 1
+                if latencia is not None:
+                    r["latencias"].append(latencia)
+                if reintentar:
+                    r["retry_after"].add(reintentar)
+        cliente.cerrar()
+
+    hilos = [threading.Thread(target=trabajador, daemon=True) for _ in range(concurrencia)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    return {
+        status: {
+            "requests": r["n"],
+            "p50_ms": percentil(r["latencias"], 50),
+            "p99_ms": percentil(r["latencias"], 99),
+            "retry_after": sorted(r["retry_after"]),
+        }
+        for status, r in sorted(por_status.items())
+    }
+
+
+def esperar_servidor(base_url, timeout=30.0):
+    """
+    Espera hasta que el servidor responda (cualquier status) o se agote el tiempo.
+    """
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        cliente = ClienteHTTP(base_url, timeout=2)
+        try:
+            cliente.request("GET", "/")
+            return True
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.2)
+        finally:
+            cliente.cerrar()
+    return False
+
+
+def consultas_de(headers):
+    for nombre, valor in headers:
+        if nombre.lower() == HEADER_CONSULTAS.lower():
+            try:
+                return int(valor)
+            except ValueError:
+                return None
+    return None
+
+
+# =========================
+# Mezcla realista de tráfico
+# =========================
+# (acción, rol, peso). Los pesos aproximan el tráfico real: mucha lectura
+# anónima y pocas escrituras.
+MEZCLA_DEFAULT = [
+    ("home", "anonimo", 35),
+    ("buscar_shoppers", "anonimo", 25),
+    ("create_order", "cliente", 10),
+    ("reportar_pago", "cliente", 10),
+    ("tomar_pedido", "shopper", 10),
+    ("aprobar_pago", "shopper", 10),
+]
+
+
+class PoolsCarga:
+    """
+    IDs que necesitan las acciones de escritura (pedidos abiertos, pedidos
+    por cliente, pagos pendientes por shopper). Se refrescan desde la BD en
+    un hilo aparte para que los trabajadores no le agreguen consultas.
+    """
+
+    def __init__(self, usernames_clientes, usernames_shoppers):
+        self.usernames_clientes = usernames_clientes
+        self.usernames_shoppers = usernames_shoppers
+        self.lock = threading.Lock()
+        self.pedidos_abiertos = []
+        self.pedidos_por_cliente = {}
+        self.pagos_pendientes_por_shopper = {}
+
+    def refrescar(self):
+        abiertos = list(
+            Order.objects.filter(shopper__isnull=True, estado="BUSCANDO_SHOPPER")
+            .order_by("-creado")
+            .values_list("pk", flat=True)[:500]
+        )
+        por_cliente = {}
+        for pk, username in Order.objects.filter(
+            customer__user__username__in=self.usernames_clientes,
+            shopper__isnull=False,
+        ).values_list("pk", "customer__user__username"):
+            por_cliente.setdefault(username, []).append(pk)
+        pendientes = {}
+        for pago_id, pedido_id, username in Payment.objects.filter(
+            aprobado=False,
+            pedido__shopper__user__username__in=self.usernames_shoppers,
+        ).values_list("pk", "pedido_id", "pedido__shopper__user__username")[:5000]:
+            pendientes.setdefault(username, []).append((pedido_id, pago_id))
+        with self.lock:
+            self.pedidos_abiertos = abiertos
+            self.pedidos_por_cliente = por_cliente
+            self.pagos_pendientes_por_shopper = pendientes
+        close_old_connections()
+
+    def tomar_abierto(self):
+        with self.lock:
+            return self.pedidos_abiertos.pop() if self.pedidos_abiertos else None
+
+    def pedido_de(self, username):
+        with self.lock:
+            pedidos = self.pedidos_por_cliente.get(username) or []
+            return random.choice(pedidos) if pedidos else None
+
+    def pago_pendiente_de(self, username):
+        with self.lock:
+            pagos = self.pagos_pendientes_por_shopper.get(username) or []
+            return pagos.pop() if pagos else None
+
+
+def _accion(nombre, cliente, username, pools, rng):
+    """
+    Ejecuta una acción de la mezcla. Devuelve (status, headers, latencia) o
+    None si no había datos para ejecutarla (p.ej. no quedan pedidos abiertos).
+    """
+    if nombre == "home":
+        status, headers, _, lat = cliente.request("GET", "/")
+    elif nombre == "buscar_shoppers":
+        status, headers, _, lat = cliente.request("GET", "/shoppers/")
+    elif nombre == "create_order":
+        status, headers, _, lat = cliente.post(
+            "/pedidos/nuevo/",
+            {
+                "presupuesto_maximo_total": rng.randint(10, 500) * 1000,
+                "moneda": "CRC",
+                "shopper": "",
+                "numero_articulos": 1,
+                "articulo_1_nombre": "Artículo de carga",
+                "articulo_1_categoria": "ROPA",
+                "articulo_1_cantidad": 1,
+            },
+        )
+    elif nombre == "reportar_pago":
+        pk = pools.pedido_de(username)
+        if pk is None:
+            return None
+        status, headers, _, lat = cliente.post(
+            f"/dashboard/pedidos/{pk}/",
+            {
+                "reportar_pago": "1",
+                "monto": rng.randint(1, 50) * 1000,
+                "tipo_pago": "PARCIAL",
+                "metodo": "SINPE",
+                "nota": "carga",
+            },
+        )
+    elif nombre == "tomar_pedido":
+        pk = pools.tomar_abierto()
+        if pk is None:
+            return None
+        status, headers, _, lat = cliente.request("GET", f"/dashboard/shopper/pedidos/{pk}/tomar/")
+        if status == 404:
+            # Otro shopper lo tomó primero: es una carrera esperada, no un error.
+            status = 409
+    elif nombre == "aprobar_pago":
+        par = pools.pago_pendiente_de(username)
+        if par is None:
+            return None
+        pedido_id, pago_id = par
+        status, headers, _, lat = cliente.post(
+            f"/dashboard/shopper/pedidos/{pedido_id}/",
+            {"aprobar_pago": "1", "pago_id": pago_id},
+        )
+    else:
+        raise ValueError(f"Acción desconocida: {nombre}")
+    return status, headers, lat
+
+
+def correr_mezcla(
+    base_url,
+    usernames_clientes,
+    usernames_shoppers,
+    mezcla=None,
+    usuarios=16,
+    duracion=30.0,
+    refresco=2.0,
+    semilla=1234,
+):
+    """
+    Simula `usuarios` usuarios concurrentes (anónimos, clientes y shoppers
+    según la mezcla) con sesión propia. Cada uno hace login una vez y luego
+    elige acciones por peso. Devuelve el mismo formato que correr_carga().
+    """
+    mezcla = mezcla or MEZCLA_DEFAULT
+    resultados = {nombre: ResultadoEndpoint(nombre) for nombre, _, _ in mezcla}
+    lock = threading.Lock()
+    pools = PoolsCarga(usernames_clientes, usernames_shoppers)
+    pools.refrescar()
+
+    t_fin = time.perf_counter() + duracion
+    parar = threading.Event()
+
+    def refrescador():
+        while not parar.wait(refresco):
+            pools.refrescar()
+
+    # Cada usuario tiene un rol fijo; las acciones se filtran por rol.
+    peso_por_rol = {}
+    for _, rol, peso in mezcla:
+        peso_por_rol[rol] = peso_por_rol.get(rol, 0) + peso
+    roles = list(peso_por_rol)
+
+    def trabajador(n):
+        rng = random.Random(semilla + n)
+        rol = rng.choices(roles, weights=[peso_por_rol[r] for r in roles])[0]
+        acciones = [(nombre, peso) for nombre, r, peso in mezcla if r == rol]
+        cliente = ClienteHTTP(base_url)
+        username = None
+        if rol == "cliente" and usernames_clientes:
+            username = usernames_clientes[n % len(usernames_clientes)]
+        elif rol == "shopper" and usernames_shoppers:
+            username = usernames_shoppers[n % len(usernames_shoppers)]
+        if username and not cliente.login(username):
+            with lock:
+                resultados[acciones[0][0]].errores += 1
+            return
+
+        while time.perf_counter() < t_fin:
+            nombre = rng.choices([a for a, _ in acciones], weights=[p for _, p in acciones])[0]
+            inicio = time.perf_counter()
+            try:
+                res = _accion(nombre, cliente, username, pools, rng)
+            except (OSError, http.client.HTTPException):
+                res = (599, [], (time.perf_counter() - inicio) * 1000)
+            if res is None:
+                continue
+            status, headers, lat = res
+            with lock:
+                r = resultados[nombre]
+                r.latencias.append(lat)
+                if status >= 400 and status != 409:
+                    r.errores += 1
+                consultas = consultas_de(headers)
+                if consultas is not None:
+                    r.consultas.append(consultas)
+        cliente.cerrar()
+
+    hilo_refresco = threading.Thread(target=refrescador, daemon=True)
+    hilo_refresco.start()
+    hilos = [threading.Thread(target=trabajador, args=(n,), daemon=True) for n in range(usuarios)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    parar.set()
+    hilo_refresco.join()
+
+    todas = []
+    errores = 0
+    for r in resultados.values():
+        todas.extend(r.latencias)
+        errores += r.errores
+
+    return {
+        "requests": len(todas),
+        "rps": len(todas) / duracion if duracion else 0.0,
+        "p50_ms": percentil(todas, 50),
+        "p99_ms": percentil(todas, 99),
+        "error_rate": errores / len(todas) if todas else 0.0,
+        "endpoints": [r.resumen(duracion) for r in resultados.values()],
+    }
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:48:30 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/archivar_pedidos.py
+# Mueve los pedidos cerrados (ENTREGADO / CANCELADO) sin cambios hace más de
+# --dias al archivo, con sus artículos, pagos y gastos (ver
+# marketplace/archivo.py). Cada lote es una transacción corta; se puede
+# cortar y volver a correr en cualquier momento.
+#
+#   python manage.py archivar_pedidos --dias 180 --lote 500
+#   python manage.py archivar_pedidos --simular
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from marketplace import archivo
+
+
+class Command(BaseCommand):
+    help = "Archiva pedidos cerrados viejos (y sus hijos) por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=settings.ARCHIVO_PEDIDOS_DIAS)
+        parser.add_argument("--lote", type=int, default=500, help="Pedidos por transacción.")
+        parser.add_argument("--pausa", type=float, default=0.05, help="Segundos entre lotes.")
+        parser.add_argument("--simular", action="store_true", help="Solo contar lo que se archivaría.")
+
+    def handle(self, *args, **opts):
+        if opts["simular"]:
+            n = archivo.archivables(opts["dias"]).count()
+            self.stdout.write(f"{n} pedido(s) cerrados hace más de {opts['dias']} días.")
+            return
+
+        inicio = time.perf_counter()
+        total = archivo.archivar(
+            dias=opts["dias"],
+            lote=opts["lote"],
+            pausa=opts["pausa"],
+            al_avanzar=lambda n: self.stdout.write(f"  {n} archivados…"),
+        )
+        self.stdout.write(f"{total} pedido(s) archivados en {time.perf_counter() - inicio:.1f} s.")
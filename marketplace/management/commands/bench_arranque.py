@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 02:17:52 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/bench_arranque.py
+# Tiempo hasta el primer request (TTFR) de gunicorn en frío, sin preload y
+# con preload + precarga + gc.freeze (gunicorn.conf.py):
+#
+#   ttfr        desde lanzar el proceso hasta la primera respuesta de --ruta
+#   1er req     latencia de esa primera respuesta (lo que paga el visitante)
+#   USS / PSS   memoria privada y proporcional por worker tras --calentar
+#               requests (Linux, /proc/<pid>/smaps_rollup)
+#
+#   python manage.py bench_arranque --workers 4 --repeticiones 5
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from marketplace.loadtest import ClienteHTTP
+
+ESCENARIOS = {
+    "sin_preload": {"GUNICORN_PRELOAD": "False"},
+    "preload": {"GUNICORN_PRELOAD": "True"},
+}
+
+
+def _hijos(pid):
+    ruta = Path(f"/proc/{pid}/task/{pid}/children")
+    try:
+        return [int(p) for p in ruta.read_text().split()]
+    except OSError:
+        return []
+
+
+def _memoria_kb(pid):
+    """
+    (uss_kb, pss_kb) del proceso, o None fuera de Linux.
+    """
+    try:
+        texto = Path(f"/proc/{pid}/smaps_rollup").read_text()
+    except OSError:
+        return None
+    campos = {}
+    for linea in texto.splitlines():
+        partes = linea.split()
+        if len(partes) >= 2 and partes[1].isdigit():
+            campos[partes[0].rstrip(":")] = int(partes[1])
+    uss = campos.get("Private_Clean", 0) + campos.get("Private_Dirty", 0)
+    return uss, campos.get("Pss", 0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el tiempo hasta el primer request y la memoria por worker de "
+        "gunicorn con y sin preload + gc.freeze."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--repeticiones", type=int, default=3)
+        parser.add_argument("--ruta", default="/")
+        parser.add_argument("--calentar", type=int, default=50, help="Requests antes de medir memoria.")
+        parser.add_argument("--puerto", type=int, default=8767)
+        parser.add_argument("--escenario", choices=sorted(ESCENARIOS), action="append")
+
+    def _corrida(self, opts, env_extra):
+        env = os.environ.copy()
+        env.update(env_extra)
+        url = f"http://127.0.0.1:{opts['puerto']}"
+        inicio = time.perf_counter()
+        proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn",
+                "--bind", f"127.0.0.1:{opts['puerto']}",
+                "--workers", str(opts["workers"]),
+                "--log-level", "warning",
+                "personal_shoppers.wsgi:application",
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+        )
+        try:
+            cliente = ClienteHTTP(url, timeout=30)
+            while True:
+                if proc.poll() is not None:
+                    raise CommandError("gunicorn terminó antes de responder")
+                if time.perf_counter() - inicio > 60:
+                    raise CommandError(f"gunicorn no respondió en {url}")
+                try:
+                    status, _, _, primero_ms = cliente.request("GET", opts["ruta"])
+                    break
+                except OSError:
+                    time.sleep(0.01)
+            ttfr_ms = (time.perf_counter() - inicio) * 1000
+            if status >= 500:
+                raise CommandError(f"{opts['ruta']} respondió {status}")
+
+            for _ in range(opts["calentar"]):
+                # Conexión nueva cada vez para repartir entre workers
+                cliente.cerrar()
+                cliente.request("GET", opts["ruta"])
+            cliente.cerrar()
+            memorias = [m for m in (_memoria_kb(pid) for pid in _hijos(proc.pid)) if m]
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        return ttfr_ms, primero_ms, memorias
+
+    def handle(self, *args, **opts):
+        self.stdout.write(
+            f"{'escenario':<14}{'ttfr p50':>10}{'ttfr max':>10}{'1er req':>10}{'USS/worker':>13}{'PSS/worker':>13}"
+        )
+        for nombre in opts["escenario"] or list(ESCENARIOS):
+            ttfrs, primeros, uss, pss = [], [], [], []
+            for _ in range(opts["repeticiones"]):
+                ttfr, primero, memorias = self._corrida(opts, ESCENARIOS[nombre])
+                ttfrs.append(ttfr)
+                primeros.append(primero)
+                uss += [u for u, _ in memorias]
+                pss += [p for _, p in memorias]
+            memoria = (
+                f"{statistics.mean(uss) / 1024:>11.1f}MB{statistics.mean(pss) / 1024:>11.1f}MB"
+                if uss
+                else f"{'-':>13}{'-':>13}"
+            )
+            self.stdout.write(
+                f"{nombre:<14}{statistics.median(ttfrs):>8.0f}ms{max(ttfrs):>8.0f}ms"
+                f"{statistics.median(primeros):>8.0f}ms{memoria}"
+            )
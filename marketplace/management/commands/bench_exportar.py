@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:21:44 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/bench_exportar.py
+# Verifica que la exportación en streaming (marketplace/exportar.py) use
+# memoria constante: carga un shopper con N pagos y N gastos, consume cada
+# exportación midiendo el pico de memoria con tracemalloc y falla si el pico
+# con el N más grande supera --tolerancia veces el del más chico. El N más
+# chico tiene que llenar al menos un chunk del iterator (CHUNK_SIZE filas):
+# por debajo de eso el pico todavía crece con N, y es lo esperado.
+#
+#   python manage.py bench_exportar --filas 5000 20000 50000
+
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
+
+from marketplace import exportar
+from marketplace.loadtest import sembrar_datos
+from marketplace.models import CustomerProfile, Expense, Order, Payment, ShopperProfile
+
+PREFIJO = "benchexport"
+PAGOS_POR_PEDIDO = 10
+LOTE = 5000
+
+
+def _completar(shopper, cliente, n):
+    """
+    Lleva al shopper a n pagos y n gastos (bulk_create, sin señales).
+    """
+    faltan = n - Payment.objects.filter(pedido__shopper=shopper).count()
+    if faltan > 0:
+        with transaction.atomic():
+            pedidos = Order.objects.bulk_create(
+                [
+                    Order(customer=cliente, shopper=shopper, titulo=f"{PREFIJO} {i}", estado="ENTREGADO", precio=10000)
+                    for i in range(-(-faltan // PAGOS_POR_PEDIDO))
+                ],
+                batch_size=LOTE,
+            )
+            pagos = (
+                Payment(pedido=pedidos[i // PAGOS_POR_PEDIDO], monto=1000 + i, tipo_pago="PARCIAL", metodo="SINPE")
+                for i in range(faltan)
+            )
+            lote = []
+            for pago in pagos:
+                lote.append(pago)
+                if len(lote) >= LOTE:
+                    Payment.objects.bulk_create(lote)
+                    lote = []
+            Payment.objects.bulk_create(lote)
+
+    faltan = n - Expense.objects.filter(shopper=shopper).count()
+    if faltan > 0:
+        with transaction.atomic():
+            for inicio in range(0, faltan, LOTE):
+                Expense.objects.bulk_create(
+                    Expense(shopper=shopper, categoria="OTRO", monto=100, descripcion=f"gasto {inicio + j}")
+                    for j in range(min(LOTE, faltan - inicio))
+                )
+
+
+def _medir(shopper, que, formato):
+    reset_queries()
+    _, contenido = exportar.exportar(shopper, que, formato)
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    total = 0
+    for parte in contenido:
+        total += len(parte)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico, total, segundos
+
+
+class Command(BaseCommand):
+    help = "Pico de memoria de las exportaciones CSV/XLSX con N filas: debe mantenerse plano."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, nargs="+", default=[5000, 20000, 50000])
+        parser.add_argument("--formato", choices=sorted(exportar.FORMATOS), action="append")
+        parser.add_argument(
+            "--tolerancia",
+            type=float,
+            default=1.5,
+            help="Máximo pico(N mayor) / pico(N menor) aceptado.",
+        )
+        parser.add_argument("--conservar", action="store_true", help="No borrar los datos creados.")
+
+    def handle(self, *args, **opts):
+        sembrar_datos(n_shoppers=1, n_clientes=1, pedidos_por_cliente=0, prefijo=PREFIJO)
+        shopper = ShopperProfile.objects.get(user__username=f"{PREFIJO}_shopper_0")
+        cliente = CustomerProfile.objects.get(user__username=f"{PREFIJO}_cliente_0")
+
+        casos = [("pagos", "csv"), ("gastos", "csv"), ("todo", "xlsx")]
+        formatos = opts["formato"] or sorted(exportar.FORMATOS)
+        casos = [(que, formato) for que, formato in casos if formato in formatos]
+
+        if min(opts["filas"]) < 2 * exportar.CHUNK_SIZE:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"El N más chico ({min(opts['filas'])}) no llena dos chunks de "
+                    f"{exportar.CHUNK_SIZE} filas: la comparación no es representativa."
+                )
+            )
+
+        picos = {}
+        try:
+            for n in sorted(opts["filas"]):
+                _completar(shopper, cliente, n)
+                for que, formato in casos:
+                    pico, total, segundos = _medir(shopper, que, formato)
+                    picos.setdefault((que, formato), []).append((n, pico))
+                    self.stdout.write(
+                        f"{que:<7} {formato:<5} N={n:<7} pico={pico / 1024:>8.0f} KiB  "
+                        f"archivo={total / 1024:>9.0f} KiB  {segundos:>6.2f} s"
+                    )
+        finally:
+            if not opts["conservar"]:
+                Order.objects.filter(shopper=shopper).delete()
+                Expense.objects.filter(shopper=shopper).delete()
+
+        self.stdout.write("\n" + "=" * 56)
+        fallas = []
+        for (que, formato), medidas in picos.items():
+            (n_min, pico_min), (n_max, pico_max) = medidas[0], medidas[-1]
+            razon = pico_max / pico_min if pico_min else 1.0
+            estado = "OK" if razon <= opts["tolerancia"] else "CRECE"
+            self.stdout.write(f"{que:<7} {formato:<5} N {n_min}->{n_max}: pico x{razon:.2f}  {estado}")
+            if estado != "OK":
+                fallas.append(f"{que}.{formato}")
+        if fallas:
+            raise CommandError(f"La memoria crece con la cantidad de filas: {', '.join(fallas)}")
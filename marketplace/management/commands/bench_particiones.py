@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 22:44:18 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/bench_particiones.py
+# Compara una tabla de pagos sin particionar contra la misma tabla con
+# particiones mensuales (como las de marketplace/particiones.py), con los
+# mismos N filas repartidas en --meses meses hacia atrás:
+#
+#   - inserción de lotes nuevos (van todos a la partición del mes),
+#   - consulta de lo reciente (últimos 7 días: count + suma, lo que hace el
+#     dashboard), que en la particionada solo toca la partición del mes,
+#   - búsqueda por pedido_id (el caso que NO mejora: revisa cada partición).
+#
+# Trabaja con tablas temporales propias (bench_part_*), no con las reales, y
+# las borra al final. Solo Postgres.
+#
+#   python manage.py bench_particiones --filas 2000000 --meses 24
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from marketplace.particiones import _mes_siguiente
+
+PLANA = "bench_part_plana"
+PARTICIONADA = "bench_part_mensual"
+
+COLUMNAS = (
+    "id bigserial NOT NULL, pedido_id bigint NOT NULL, monto integer NOT NULL, "
+    "estado varchar(20) NOT NULL DEFAULT 'PENDIENTE', creado timestamptz NOT NULL"
+)
+
+
+def _cronometrar(cursor, sql, params, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cursor.execute(sql, params)
+        if cursor.description:
+            cursor.fetchall()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+class Command(BaseCommand):
+    help = "Inserción y consultas recientes: tabla de pagos plana vs particionada por mes (solo Postgres)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=1_000_000)
+        parser.add_argument("--meses", type=int, default=24, help="Meses de historia (y de particiones).")
+        parser.add_argument("--lote", type=int, default=1000, help="Filas por INSERT en la prueba de inserción.")
+        parser.add_argument("--repeticiones", type=int, default=20)
+
+    def _crear(self, cursor, meses):
+        cursor.execute(f"CREATE TABLE {PLANA} ({COLUMNAS}, PRIMARY KEY (id))")
+        cursor.execute(f"CREATE TABLE {PARTICIONADA} ({COLUMNAS}, PRIMARY KEY (id, creado)) PARTITION BY RANGE (creado)")
+        cursor.execute("SELECT (date_trunc('month', now()) - make_interval(months => %s))::date", [meses])
+        mes = cursor.fetchone()[0]
+        for _ in range(meses + 2):
+            siguiente = _mes_siguiente(mes)
+            cursor.execute(
+                f"CREATE TABLE {PARTICIONADA}_p{mes:%Y%m} PARTITION OF {PARTICIONADA} FOR VALUES FROM (%s) TO (%s)",
+                [mes, siguiente],
+            )
+            mes = siguiente
+        cursor.execute(f"CREATE TABLE {PARTICIONADA}_default PARTITION OF {PARTICIONADA} DEFAULT")
+        for tabla in (PLANA, PARTICIONADA):
+            cursor.execute(f"CREATE INDEX {tabla}_creado ON {tabla} (creado)")
+            cursor.execute(f"CREATE INDEX {tabla}_pedido ON {tabla} (pedido_id)")
+
+    def _llenar(self, cursor, filas, meses):
+        cursor.execute("SELECT setseed(0.42)")
+        cursor.execute(
+            f"INSERT INTO {PLANA} (pedido_id, monto, creado) "
+            "SELECT 1 + (random() * %s)::bigint, (random() * 100000)::int, "
+            "now() - random() * make_interval(months => %s) "
+            "FROM generate_series(1, %s)",
+            [max(filas // 10, 1), meses, filas],
+        )
+        cursor.execute(f"INSERT INTO {PARTICIONADA} SELECT * FROM {PLANA}")
+        cursor.execute(f"ANALYZE {PLANA}")
+        cursor.execute(f"ANALYZE {PARTICIONADA}")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            raise CommandError(f"Solo tiene sentido en Postgres (base actual: {connection.vendor}).")
+        rep = opts["repeticiones"]
+
+        with connection.cursor() as cursor:
+            try:
+                self._crear(cursor, opts["meses"])
+                inicio = time.perf_counter()
+                self._llenar(cursor, opts["filas"], opts["meses"])
+                self.stdout.write(f"{opts['filas']} filas en {opts['meses']} meses: {time.perf_counter() - inicio:.1f} s\n")
+
+                cursor.execute(f"SELECT max(pedido_id) / 2 FROM {PLANA}")
+                pedido = cursor.fetchone()[0]
+                pruebas = [
+                    (
+                        f"insertar {opts['lote']}",
+                        "INSERT INTO {t} (pedido_id, monto, creado) "
+                        "SELECT 1 + (random() * 1000)::bigint, 1000, now() FROM generate_series(1, %s)",
+                        [opts["lote"]],
+                    ),
+                    (
+                        "últimos 7 días",
+                        "SELECT count(*), coalesce(sum(monto), 0) FROM {t} WHERE creado >= now() - interval '7 days'",
+                        [],
+                    ),
+                    (
+                        "mes actual",
+                        "SELECT count(*), coalesce(sum(monto), 0) FROM {t} WHERE creado >= date_trunc('month', now())",
+                        [],
+                    ),
+                    ("por pedido_id", "SELECT id, monto, creado FROM {t} WHERE pedido_id = %s", [pedido]),
+                ]
+
+                self.stdout.write(f"{'prueba':<18} {'plana':>12} {'particionada':>14} {'razón':>8}")
+                for nombre, sql, params in pruebas:
+                    plana = _cronometrar(cursor, sql.format(t=PLANA), params, rep)
+                    part = _cronometrar(cursor, sql.format(t=PARTICIONADA), params, rep)
+                    self.stdout.write(
+                        f"{nombre:<18} {plana * 1000:>10.2f}ms {part * 1000:>12.2f}ms {plana / part if part else 0:>7.2f}x"
+                    )
+                self.stdout.write("\n(razón > 1: la particionada es más rápida; mediana de %d corridas)" % rep)
+            finally:
+                cursor.execute(f"DROP TABLE IF EXISTS {PLANA}, {PARTICIONADA} CASCADE")
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:40:05 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/bench_servidores.py
+# Compara gunicorn (workers sync, WSGI) contra gunicorn + UvicornWorker (ASGI)
+# sobre el mismo dataset y las mismas páginas de lectura.
+#
+# Uso:
+#   python manage.py bench_servidores --sembrar --workers 4 --concurrencia 32 --duracion 20
+
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from marketplace.loadtest import correr_carga, esperar_servidor, sembrar_datos
+from marketplace.models import ShopperProfile
+
+SERVIDORES = {
+    "gunicorn-sync": [
+        "personal_shoppers.wsgi:application",
+    ],
+    "uvicorn": [
+        "-k", "uvicorn.workers.UvicornWorker",
+        "personal_shoppers.asgi:application",
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Levanta gunicorn sync y gunicorn+uvicorn en local, les aplica la misma "
+        "carga de lectura (home, buscar_shoppers, shopper_detail) y compara "
+        "requests/segundo y latencia p99. Con DEBUG=False corré antes collectstatic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--concurrencia", type=int, default=32)
+        parser.add_argument("--duracion", type=float, default=15.0)
+        parser.add_argument("--puerto", type=int, default=8765)
+        parser.add_argument(
+            "--sembrar",
+            action="store_true",
+            help="Crea/completa el dataset de carga antes de medir.",
+        )
+        parser.add_argument(
+            "--servidor",
+            choices=sorted(SERVIDORES),
+            action="append",
+            help="Limitar a uno o más servidores (por defecto, todos).",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["sembrar"]:
+            self.stdout.write("Sembrando dataset de carga…")
+            sembrar_datos()
+
+        shopper_ids = list(ShopperProfile.objects.values_list("pk", flat=True)[:20])
+        rutas = ["/", "/shoppers/"] + [f"/shoppers/{pk}/" for pk in shopper_ids[:5]]
+
+        base_url = f"http://127.0.0.1:{opts['puerto']}"
+        filas = []
+        for nombre in opts["servidor"] or list(SERVIDORES):
+            cmd = [
+                sys.executable, "-m", "gunicorn",
+                "--bind", f"127.0.0.1:{opts['puerto']}",
+                "--workers", str(opts["workers"]),
+                "--log-level", "warning",
+                *SERVIDORES[nombre],
+            ]
+            self.stdout.write(f"\n>>> {nombre}: {' '.join(cmd[2:])}")
+            proc = subprocess.Popen(cmd, cwd=settings.BASE_DIR, env=os.environ.copy())
+            try:
+                if not esperar_servidor(base_url):
+                    raise CommandError(f"{nombre} no respondió en {base_url}")
+                res = correr_carga(
+                    base_url,
+                    rutas,
+                    concurrencia=opts["concurrencia"],
+                    duracion=opts["duracion"],
+                )
+            finally:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+            filas.append((nombre, res))
+            self.stdout.write(
+                f"{res['requests']} requests · {res['rps']:.1f} req/s · "
+                f"p99 {res['p99_ms']:.1f} ms · errores {res['error_rate']:.2%}"
+            )
+
+        self.stdout.write("\n" + "=" * 64)
+        self.stdout.write(f"{'servidor':<16}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errores':>10}")
+        for nombre, res in filas:
+            self.stdout.write(
+                f"{nombre:<16}{res['rps']:>10.1f}{res['p50_ms']:>10.1f}"
+                f"{res['p99_ms']:>10.1f}{res['error_rate']:>10.2%}"
+            )
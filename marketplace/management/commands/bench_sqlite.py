@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:34:18 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/bench_sqlite.py
+# Throughput de escritura en SQLite con N procesos concurrentes (lo mismo que
+# N workers de gunicorn), con el modo concurrente de settings y, para
+# comparar, con la configuración por defecto de SQLite.
+#
+#   python manage.py bench_sqlite --workers 1 2 4 8 --duracion 5
+
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.db.backends.signals import connection_created
+
+from marketplace.loadtest import sembrar_datos
+from marketplace.models import CustomerProfile, Order, OrderItem, Payment
+from marketplace.sqlite import aplicar_pragmas
+
+PREFIJO_TITULO = "bench-sqlite"
+
+
+def _trabajador(modo, customer_id, duracion, cola):
+    # Proceso hijo (fork): conexiones nuevas, nada heredado del padre.
+    connections.close_all()
+    if modo == "default":
+        connection_created.disconnect(aplicar_pragmas, dispatch_uid="marketplace_sqlite_pragmas")
+        opciones = connection.settings_dict.setdefault("OPTIONS", {})
+        opciones.pop("transaction_mode", None)
+        opciones["timeout"] = 5  # default de sqlite3.connect()
+
+    escrituras = 0
+    bloqueos = 0
+    fin = time.perf_counter() + duracion
+    while time.perf_counter() < fin:
+        try:
+            # Misma forma que create_order + reportar pago: varias escrituras por transacción
+            with transaction.atomic():
+                pedido = Order.objects.create(customer_id=customer_id, titulo=PREFIJO_TITULO)
+                OrderItem.objects.create(pedido=pedido, nombre="x", categoria="OTRO")
+                Payment.objects.create(pedido=pedido, monto=1, tipo_pago="PARCIAL", metodo="SINPE")
+            escrituras += 1
+        except OperationalError:
+            bloqueos += 1
+    connections.close_all()
+    cola.put((escrituras, bloqueos))
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide transacciones de escritura por segundo en SQLite con N procesos "
+        "concurrentes, en modo concurrente (WAL + BEGIN IMMEDIATE + busy timeout) "
+        "y con la configuración por defecto."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+        parser.add_argument("--duracion", type=float, default=5.0)
+        parser.add_argument(
+            "--modo",
+            choices=["concurrente", "default", "ambos"],
+            default="ambos",
+        )
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "sqlite":
+            raise CommandError("Este benchmark es solo para SQLite.")
+        if str(settings.DATABASES["default"]["NAME"]) == ":memory:":
+            raise CommandError("Necesita una base SQLite en archivo.")
+
+        sembrar_datos(n_shoppers=1, n_clientes=1, pedidos_por_cliente=0, prefijo="benchsqlite")
+        customer_id = CustomerProfile.objects.filter(user__username="benchsqlite_cliente_0").values_list("pk", flat=True)[0]
+
+        modos = ["concurrente", "default"] if opts["modo"] == "ambos" else [opts["modo"]]
+        ctx = multiprocessing.get_context("fork")
+        filas = []
+        for modo in modos:
+            if modo == "default":
+                with connection.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode=DELETE")
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode=WAL")
+            connections.close_all()
+
+            for n in opts["workers"]:
+                cola = ctx.Queue()
+                procesos = [
+                    ctx.Process(target=_trabajador, args=(modo, customer_id, opts["duracion"], cola))
+                    for _ in range(n)
+                ]
+                for p in procesos:
+                    p.start()
+                resultados = [cola.get() for _ in procesos]
+                for p in procesos:
+                    p.join()
+                escrituras = sum(r[0] for r in resultados)
+                bloqueos = sum(r[1] for r in resultados)
+                tps = escrituras / opts["duracion"]
+                filas.append((modo, n, tps, bloqueos))
+                self.stdout.write(f"{modo:<12} workers={n:<3} {tps:>9.1f} tx/s  locked={bloqueos}")
+
+        # Limpieza de lo creado por el benchmark
+        Order.objects.filter(titulo=PREFIJO_TITULO).delete()
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode=WAL")
+
+        self.stdout.write("\n" + "=" * 48)
+        self.stdout.write(f"{'modo':<12}{'workers':>8}{'tx/s':>12}{'locked':>10}")
+        for modo, n, tps, bloqueos in filas:
+            self.stdout.write(f"{modo:<12}{n:>8}{tps:>12.1f}{bloqueos:>10}")
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:05:51 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/bench_templates.py
+# Tiempo de render de las páginas con listas de shoppers (home,
+# buscar_shoppers) con N tarjetas, sin BD: los objetos se arman en memoria.
+# Reporta ms por render y µs por tarjeta (costo marginal respecto a N=0),
+# con el cache de tarjetas frío y caliente.
+#
+#   python manage.py bench_templates --items 0 10 100 500 --repeticiones 20
+
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from marketplace import tarjetas
+from marketplace.models import ShopperProfile
+from marketplace.views import _chunk_list
+
+
+def _shopper(i):
+    user = get_user_model()(pk=i, username=f"bench{i}", first_name="Shopper", last_name=str(i))
+    shopper = ShopperProfile(
+        pk=i,
+        user=user,
+        calificacion=Decimal("4.50"),
+        actualmente_en_el_extranjero=(i % 2 == 0),
+        pais_extranjero="USA",
+        ciudad_extranjero="Miami",
+        ciudad_base="San José",
+        especialidades="Ropa, tecnología",
+    )
+    # Sin foto y sin consultar la BD para averiguarlo
+    ShopperProfile.photo.related.set_cached_value(shopper, None)
+    return shopper
+
+
+def _contexto_home(shoppers):
+    en_usa = [tarjetas.datos_tarjeta(s, chip="EN EE. UU.", chip_clase="ps-chip-usa") for s in shoppers]
+    pronto = [
+        tarjetas.datos_tarjeta(s, chip="VIAJA 24/10", chip_clase="ps-chip-soon", destino="Miami, Estados Unidos")
+        for s in shoppers
+    ]
+    return {
+        "shoppers": [tarjetas.datos_tarjeta(s) for s in shoppers[:6]],
+        "stats_shoppers": len(shoppers),
+        "stats_orders": 0,
+        "stats_rating": 4.5,
+        "en_usa_slides": _chunk_list(en_usa, size=2),
+        "viajan_pronto_slides": _chunk_list(pronto, size=2),
+        "carousel_slides": [],
+        "hero_bg": None,
+    }, len(en_usa) + len(pronto)
+
+
+def _contexto_buscar(shoppers):
+    return {"shoppers": [tarjetas.datos_tarjeta(s) for s in shoppers]}, len(shoppers)
+
+
+PAGINAS = {
+    "home": ("marketplace/home.html", _contexto_home),
+    "buscar_shoppers": ("marketplace/buscar_shoppers.html", _contexto_buscar),
+}
+
+
+class Command(BaseCommand):
+    help = "Benchmark de render de templates: µs por tarjeta de shopper con N items."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, nargs="+", default=[0, 10, 100, 500])
+        parser.add_argument("--repeticiones", type=int, default=20)
+        parser.add_argument("--pagina", choices=sorted(PAGINAS), action="append")
+
+    def _medir(self, plantilla, contexto, request, repeticiones, frio):
+        render_to_string(plantilla, contexto, request=request)  # compila / calienta
+        total = 0.0
+        for _ in range(repeticiones):
+            if frio:
+                tarjetas.limpiar_cache()
+            inicio = time.perf_counter()
+            render_to_string(plantilla, contexto, request=request)
+            total += time.perf_counter() - inicio
+        return total / repeticiones * 1000
+
+    def handle(self, *args, **opts):
+        loader = engines["django"].engine.template_loaders[0]
+        self.stdout.write(f"loader: {type(loader).__module__}.{type(loader).__name__}")
+
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        request.session = {}
+
+        shoppers = [_shopper(i) for i in range(1, max(opts["items"]) + 1)]
+        filas = []
+        for pagina in opts["pagina"] or sorted(PAGINAS):
+            plantilla, armar = PAGINAS[pagina]
+            base = {}
+            for n in sorted(opts["items"]):
+                contexto, cantidad = armar(shoppers[:n])
+                for frio in (True, False):
+                    ms = self._medir(plantilla, contexto, request, opts["repeticiones"], frio)
+                    if n == 0:
+                        base[frio] = ms
+                    us_item = (ms - base.get(frio, 0.0)) * 1000 / cantidad if cantidad else 0.0
+                    cache = "frío" if frio else "caliente"
+                    filas.append((pagina, n, cantidad, cache, ms, us_item))
+                    self.stdout.write(f"{pagina:<16} N={n:<5} cache={cache:<9} {ms:>9.2f} ms  {us_item:>8.1f} µs/tarjeta")
+
+        self.stdout.write("\n" + "=" * 66)
+        self.stdout.write(f"{'página':<16}{'N':>6}{'tarjetas':>10}{'cache':>10}{'ms/render':>12}{'µs/tarjeta':>12}")
+        for pagina, n, cantidad, cache, ms, us_item in filas:
+            self.stdout.write(f"{pagina:<16}{n:>6}{cantidad:>10}{cache:>10}{ms:>12.2f}{us_item:>12.1f}")
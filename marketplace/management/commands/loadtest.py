@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:31:47 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/loadtest.py
+# Harness de carga local con mezcla realista de tráfico del marketplace.
+#
+# Contra un runserver ya levantado (con LOADTEST_QUERY_HEADER=1 para ver consultas
+# y LIMITES_ACTIVOS=0: todos los usuarios simulados salen de la misma IP):
+#   python manage.py loadtest --url http://127.0.0.1:8000 --sembrar
+#
+# Levantando gunicorn propio:
+#   python manage.py loadtest --gunicorn 4 --usuarios 32 --duracion 60
+
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from marketplace.loadtest import (
+    MEZCLA_DEFAULT,
+    correr_mezcla,
+    esperar_servidor,
+    sembrar_datos,
+    usuarios_sembrados,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra datos, inicia sesión con clientes y shoppers simulados y reproduce "
+        "una mezcla ponderada (home, búsqueda, crear pedido, tomar pedido, reporte y "
+        "aprobación de pagos) contra un servidor local. Reporta throughput, "
+        "percentiles, tasa de error y consultas SQL por endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--gunicorn",
+            type=int,
+            metavar="WORKERS",
+            help="Levanta gunicorn (sync) con WORKERS workers en --url en lugar de usar uno existente.",
+        )
+        parser.add_argument("--usuarios", type=int, default=16)
+        parser.add_argument("--duracion", type=float, default=30.0)
+        parser.add_argument("--sembrar", action="store_true")
+        parser.add_argument("--shoppers", type=int, default=50)
+        parser.add_argument("--clientes", type=int, default=200)
+        parser.add_argument(
+            "--peso",
+            action="append",
+            default=[],
+            metavar="ACCION=N",
+            help="Cambia el peso de una acción, p.ej. --peso create_order=30",
+        )
+        parser.add_argument("--json", action="store_true", help="Salida en JSON.")
+
+    def handle(self, *args, **opts):
+        pesos = {}
+        for item in opts["peso"]:
+            nombre, _, valor = item.partition("=")
+            if not valor.isdigit():
+                raise CommandError(f"--peso inválido: {item}")
+            pesos[nombre] = int(valor)
+        acciones = {nombre for nombre, _, _ in MEZCLA_DEFAULT}
+        desconocidas = set(pesos) - acciones
+        if desconocidas:
+            raise CommandError(f"Acciones desconocidas: {', '.join(sorted(desconocidas))}")
+        mezcla = [
+            (nombre, rol, pesos.get(nombre, peso))
+            for nombre, rol, peso in MEZCLA_DEFAULT
+            if pesos.get(nombre, peso) > 0
+        ]
+
+        if opts["sembrar"]:
+            self.stderr.write("Sembrando dataset de carga…")
+            shoppers, clientes = sembrar_datos(n_shoppers=opts["shoppers"], n_clientes=opts["clientes"])
+        else:
+            # Sin --sembrar no se escribe nada en la BD: se usan los carga_* que ya existan
+            shoppers, clientes = usuarios_sembrados(n_shoppers=opts["shoppers"], n_clientes=opts["clientes"])
+            if not shoppers or not clientes:
+                raise CommandError("No hay usuarios carga_* en la BD: corré una vez con --sembrar")
+
+        proc = None
+        if opts["gunicorn"]:
+            bind = opts["url"].split("://", 1)[-1].rstrip("/")
+            env = os.environ.copy()
+            env["LOADTEST_QUERY_HEADER"] = "1"
+            # Todos los usuarios simulados comparten IP: los límites de tasa
+            # cortarían los logins y pedidos (probar_limites los mide aparte)
+            env.setdefault("LIMITES_ACTIVOS", "False")
+            proc = subprocess.Popen(
+                [
+                    sys.executable, "-m", "gunicorn",
+                    "--bind", bind,
+                    "--workers", str(opts["gunicorn"]),
+                    "--log-level", "warning",
+                    "personal_shoppers.wsgi:application",
+                ],
+                cwd=settings.BASE_DIR,
+                env=env,
+            )
+
+        try:
+            if not esperar_servidor(opts["url"]):
+                raise CommandError(f"No hay servidor respondiendo en {opts['url']}")
+            res = correr_mezcla(
+                opts["url"],
+                clientes,
+                shoppers,
+                mezcla=mezcla,
+                usuarios=opts["usuarios"],
+                duracion=opts["duracion"],
+            )
+        finally:
+            if proc is not None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(res, indent=2))
+            return
+
+        self.stdout.write(
+            f"\nTotal: {res['requests']} requests · {res['rps']:.1f} req/s · "
+            f"p50 {res['p50_ms']:.1f} ms · p99 {res['p99_ms']:.1f} ms · "
+            f"errores {res['error_rate']:.2%}\n"
+        )
+        self.stdout.write(
+            f"{'endpoint':<18}{'n':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>8}{'SQL':>7}"
+        )
+        for e in res["endpoints"]:
+            sql = "-" if e["consultas_prom"] is None else f"{e['consultas_prom']:.1f}"
+            self.stdout.write(
+                f"{e['endpoint']:<18}{e['requests']:>7}{e['rps']:>9.1f}{e['p50_ms']:>9.1f}"
+                f"{e['p95_ms']:>9.1f}{e['p99_ms']:>9.1f}{e['error_rate']:>8.1%}{sql:>7}"
+            )
+        if all(e["consultas_prom"] is None for e in res["endpoints"]):
+            self.stdout.write(
+                "\n(Sin conteo de SQL: levantá el servidor con LOADTEST_QUERY_HEADER=1.)"
+            )
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 22:31:05 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/particiones.py
+# Mantenimiento de las particiones mensuales de pagos y gastos (Postgres,
+# ver marketplace/particiones.py).
+#
+#   python manage.py particiones                      # listar
+#   python manage.py particiones --crear              # meses que falten (cron mensual)
+#   python manage.py particiones --desprender-antes 2024-01
+#
+# --desprender-antes saca de la tabla las particiones que terminan antes de
+# ese mes: sus filas dejan de verse en la app (P&L, exportes, detalle de
+# pedido) pero la tabla queda en la BD para respaldarla o volver a adjuntarla.
+
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from marketplace import particiones
+
+
+def _mes(valor):
+    try:
+        anio, mes = valor.split("-")
+        return date(int(anio), int(mes), 1)
+    except ValueError:
+        raise CommandError(f"Mes inválido: {valor!r} (formato AAAA-MM).")
+
+
+class Command(BaseCommand):
+    help = "Lista, crea o desprende las particiones mensuales de pagos y gastos (solo Postgres)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--crear",
+            type=int,
+            nargs="?",
+            const=settings.PARTICIONES_MESES_ADELANTE,
+            metavar="MESES",
+            help=f"Crear las particiones que falten hasta MESES adelante (default {settings.PARTICIONES_MESES_ADELANTE}).",
+        )
+        parser.add_argument("--desprender-antes", metavar="AAAA-MM", help="Desprender las particiones anteriores a ese mes.")
+        parser.add_argument("--si", action="store_true", help="No pedir confirmación al desprender.")
+
+    def handle(self, *args, **opts):
+        if not particiones.disponible():
+            raise CommandError(f"Las particiones solo existen en Postgres (base actual: {connection.vendor}).")
+
+        if opts["crear"] is not None:
+            with transaction.atomic():
+                for tabla in particiones.TABLAS:
+                    creadas = particiones.crear_particiones(tabla, opts["crear"])
+                    self.stdout.write(f"{tabla}: {', '.join(creadas) or 'nada que crear'}")
+
+        if opts["desprender_antes"]:
+            limite = _mes(opts["desprender_antes"])
+            if limite > date.today().replace(day=1):
+                raise CommandError("No se desprenden meses en curso ni futuros.")
+            if not opts["si"]:
+                respuesta = input(
+                    f"Los pagos y gastos anteriores a {limite:%Y-%m} dejarán de verse en la app. ¿Seguir? [s/N] "
+                )
+                if respuesta.strip().lower() != "s":
+                    raise CommandError("Cancelado.")
+            with transaction.atomic():
+                for tabla in particiones.TABLAS:
+                    fuera = particiones.desprender_anteriores(tabla, limite)
+                    self.stdout.write(f"{tabla}: desprendidas {', '.join(fuera) or 'ninguna'}")
+
+        for tabla in particiones.TABLAS:
+            self.stdout.write(self.style.MIGRATE_HEADING(tabla))
+            filas = particiones.listar(tabla)
+            if not filas:
+                self.stdout.write("  (sin particionar: falta la migración 0022)")
+            for nombre, rango, estimadas in filas:
+                self.stdout.write(f"  {nombre:<36} {rango:<70} ~{max(estimadas, 0)} filas")
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 02:03:26 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/perfil_importacion.py
+# Cuánto cuesta importar cada módulo al arrancar un worker (python -X
+# importtime en un intérprete nuevo, que es lo que paga un worker en frío).
+#
+# Reporta el tiempo total, el costo propio agrupado por paquete (suma lo
+# mismo que el total), los módulos más caros por tiempo propio y las
+# importaciones de primer nivel por tiempo acumulado (quién arrastró qué).
+#
+#   python manage.py perfil_importacion
+#   python manage.py perfil_importacion --precarga --top 40
+
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+RE_LINEA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+ARRANQUE = """
+import json, os, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "personal_shoppers.settings")
+inicio = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+if {precarga}:
+    from marketplace.arranque import precargar
+    precargar()
+print(json.dumps({{"ms": (time.perf_counter() - inicio) * 1000}}))
+"""
+
+
+def leer_importtime(texto):
+    """
+    [(modulo, propio_us, acumulado_us, nivel)] de la salida de -X importtime.
+    """
+    filas = []
+    for linea in texto.splitlines():
+        m = RE_LINEA.match(linea)
+        if m:
+            filas.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return filas
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo de importación por módulo y por paquete al arrancar la "
+        "app (WSGI) en un intérprete nuevo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=25)
+        parser.add_argument(
+            "--precarga",
+            action="store_true",
+            help="Incluye la precarga de gunicorn.conf.py (URLs, templates, traducciones).",
+        )
+        parser.add_argument("--json", action="store_true", help="Salida en JSON.")
+
+    def handle(self, *args, **opts):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", ARRANQUE.format(precarga=opts["precarga"])],
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"El arranque falló:\n{proc.stderr[-3000:]}")
+        total_ms = json.loads(proc.stdout.strip().splitlines()[-1])["ms"]
+        filas = leer_importtime(proc.stderr)
+
+        por_paquete = {}
+        for modulo, propio, _, _ in filas:
+            paquete = modulo.split(".", 1)[0]
+            por_paquete[paquete] = por_paquete.get(paquete, 0) + propio
+        paquetes = sorted(por_paquete.items(), key=lambda x: -x[1])[: opts["top"]]
+        propios = sorted(filas, key=lambda f: -f[1])[: opts["top"]]
+        raices = sorted((f for f in filas if f[3] == 0), key=lambda f: -f[2])[: opts["top"]]
+
+        if opts["json"]:
+            self.stdout.write(
+                json.dumps(
+                    {
+                        "total_ms": total_ms,
+                        "modulos": len(filas),
+                        "importacion_ms": sum(f[1] for f in filas) / 1000,
+                        "paquetes": [{"paquete": p, "ms": us / 1000} for p, us in paquetes],
+                        "modulos_propio": [{"modulo": m, "ms": p / 1000} for m, p, _, _ in propios],
+                        "primer_nivel": [{"modulo": m, "ms": a / 1000} for m, _, a, _ in raices],
+                    },
+                    indent=2,
+                )
+            )
+            return
+
+        self.stdout.write(
+            f"Arranque: {total_ms:.0f} ms · {len(filas)} módulos importados · "
+            f"{sum(f[1] for f in filas) / 1000:.0f} ms en importaciones\n"
+        )
+        self.stdout.write(f"{'paquete':<36}{'ms':>9}")
+        for paquete, us in paquetes:
+            self.stdout.write(f"{paquete:<36}{us / 1000:>9.1f}")
+        self.stdout.write(f"\n{'módulo (tiempo propio)':<52}{'ms':>9}")
+        for modulo, propio, _, _ in propios:
+            self.stdout.write(f"{modulo:<52}{propio / 1000:>9.1f}")
+        self.stdout.write(f"\n{'primer nivel (acumulado)':<52}{'ms':>9}")
+        for modulo, _, acumulado, _ in raices:
+            self.stdout.write(f"{modulo:<52}{acumulado / 1000:>9.1f}")
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 01:14:33 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/probar_limites.py
+# Prueba de carga de los límites (ver marketplace/limites.py), con gunicorn
+# propio en --puerto:
+#
+#   1. login: ráfaga de POST /login/ con clave incorrecta desde una IP. Pasada
+#      la capacidad de LIMITE_LOGIN todo es 429 barato, sin hashear claves.
+#   2. concurrencia: la misma carga sobre --ruta, primero sin límite y después
+#      con CONCURRENCIA_MAXIMA=--maxima. Lo admitido mantiene su latencia y el
+#      excedente recibe 503 + Retry-After enseguida en vez de encolarse.
+#
+# Uso:
+#   python manage.py probar_limites --workers 2 --hilos 8 --maxima 4 --concurrencia 32
+#
+# Sin REDIS_URL los baldes viven en la BD y CONCURRENCIA_MAXIMA vale por
+# worker (ver limites.py).
+
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from marketplace.loadtest import correr_rafaga, esperar_servidor
+
+
+class Command(BaseCommand):
+    help = (
+        "Levanta gunicorn (gthread) y muestra los límites en acción: 429 en una "
+        "ráfaga de logins y 503 + Retry-After al pasar de CONCURRENCIA_MAXIMA, "
+        "comparado con la misma carga sin límite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--hilos", type=int, default=8, help="Hilos por worker (gthread).")
+        parser.add_argument("--maxima", type=int, default=4, help="CONCURRENCIA_MAXIMA para la 2da fase.")
+        parser.add_argument("--concurrencia", type=int, default=32)
+        parser.add_argument("--duracion", type=float, default=10.0)
+        parser.add_argument("--ruta", default="/shoppers/")
+        parser.add_argument("--puerto", type=int, default=8766)
+
+    def _servidor(self, opts, **env_extra):
+        env = os.environ.copy()
+        env.update({k: str(v) for k, v in env_extra.items()})
+        proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn",
+                "--bind", f"127.0.0.1:{opts['puerto']}",
+                "--workers", str(opts["workers"]),
+                "--worker-class", "gthread",
+                "--threads", str(opts["hilos"]),
+                "--log-level", "warning",
+                "personal_shoppers.wsgi:application",
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+        )
+        if not esperar_servidor(self.base_url):
+            proc.kill()
+            raise CommandError(f"gunicorn no respondió en {self.base_url}")
+        return proc
+
+    def _fase(self, opts, titulo, ruta, datos=None, **env_extra):
+        self.stdout.write(f"\n>>> {titulo}")
+        proc = self._servidor(opts, **env_extra)
+        try:
+            res = correr_rafaga(
+                self.base_url, ruta, datos, concurrencia=opts["concurrencia"], duracion=opts["duracion"]
+            )
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+        total = sum(r["requests"] for r in res.values()) or 1
+        self.stdout.write(f"{'status':<8}{'n':>8}{'%':>8}{'p50':>9}{'p99':>9}  Retry-After")
+        for status, r in res.items():
+            self.stdout.write(
+                f"{status or 'error':<8}{r['requests']:>8}{r['requests'] / total:>8.1%}"
+                f"{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}  {', '.join(r['retry_after']) or '-'}"
+            )
+        return res
+
+    def handle(self, *args, **opts):
+        self.base_url = f"http://127.0.0.1:{opts['puerto']}"
+
+        self._fase(
+            opts,
+            f"Ráfaga de login (LIMITE_LOGIN={settings.LIMITES_TASA['login']})",
+            "/login/",
+            {"username": "probar_limites", "password": "incorrecta"},
+            LIMITES_ACTIVOS="True",
+            CONCURRENCIA_MAXIMA=0,
+        )
+        sin = self._fase(
+            opts,
+            f"{opts['ruta']} sin límite de concurrencia",
+            opts["ruta"],
+            LIMITES_ACTIVOS="True",
+            CONCURRENCIA_MAXIMA=0,
+        )
+        con = self._fase(
+            opts,
+            f"{opts['ruta']} con CONCURRENCIA_MAXIMA={opts['maxima']}",
+            opts["ruta"],
+            LIMITES_ACTIVOS="True",
+            CONCURRENCIA_MAXIMA=opts["maxima"],
+        )
+
+        ok_sin, ok_con = sin.get(200), con.get(200)
+        if ok_sin and ok_con:
+            self.stdout.write(
+                f"\np99 de los 200: {ok_sin['p99_ms']:.1f} ms sin límite -> {ok_con['p99_ms']:.1f} ms con límite; "
+                f"descartados con 503: {con.get(503, {}).get('requests', 0)}"
+            )
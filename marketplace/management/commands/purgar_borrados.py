@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:58:14 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/purgar_borrados.py
+# Borra las lápidas (modelo Borrado) más viejas que --dias. Los clientes con
+# un cursor anterior reciben 410 en /api/v1/sync/ y sincronizan desde cero
+# (ver marketplace/sincronizacion.py). Pensado para un cron diario.
+#
+#   python manage.py purgar_borrados --dias 90
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from marketplace import sincronizacion
+
+
+class Command(BaseCommand):
+    help = "Purga las lápidas de la API de sincronización más viejas que --dias."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=settings.SYNC_BORRADOS_DIAS)
+
+    def handle(self, *args, **opts):
+        if opts["dias"] != settings.SYNC_BORRADOS_DIAS:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"--dias ({opts['dias']}) distinto de SYNC_BORRADOS_DIAS ({settings.SYNC_BORRADOS_DIAS}): "
+                    "la API solo declara vencidos los cursores según el setting."
+                )
+            )
+        n = sincronizacion.purgar_borrados(opts["dias"])
+        self.stdout.write(f"{n} lápida(s) borradas.")
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:03:15 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/recalcular_ranking.py
+# Recalcula ShopperProfile.puntaje_ranking de todos los shoppers (ver
+# marketplace/ranking.py). Pensado para correr periódicamente (cron diario):
+# el peso de cada reseña decae con el tiempo y la media de la plataforma se
+# mueve, cosas que la actualización al crear una reseña no alcanza.
+#
+#   python manage.py recalcular_ranking
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from marketplace import ranking
+
+
+class Command(BaseCommand):
+    help = "Recalcula el puntaje de ranking de todos los shoppers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=1000, help="Filas por UPDATE en bulk_update.")
+
+    def handle(self, *args, **opts):
+        inicio = time.perf_counter()
+        cambiados = ranking.recalcular_todos(lote=opts["lote"])
+        self.stdout.write(
+            f"media plataforma={ranking.media_plataforma():.3f}  "
+            f"{cambiados} shopper(s) actualizados en {time.perf_counter() - inicio:.2f} s"
+        )
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 00:52:40 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/verificar_api.py
+# Comprueba el `max_consultas` que declara cada recurso de la API
+# (marketplace/api.py): pide la lista y el detalle con todas las relaciones
+# incluidas, como cliente y como shopper, con pocos y con muchos pedidos por
+# cliente, y falla si alguna vista pasa de lo declarado o si las consultas
+# crecen con las filas (N+1). También verifica el 304 con If-None-Match.
+# Todo corre en una transacción que se deshace al final.
+#
+#   python manage.py verificar_api
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from marketplace import api
+from marketplace.loadtest import sembrar_datos
+
+PREFIJO = "verifapi"
+TAMANOS = (2, 12)  # pedidos por cliente
+
+
+class Command(BaseCommand):
+    help = "Verifica el máximo de consultas declarado por cada endpoint de /api/v1/."
+
+    def _pedir(self, user, recurso, pk=None, **headers):
+        rec = api.RECURSOS[recurso]
+        params = {"include": ",".join(rec.incluir), "limite": "200"}
+        request = RequestFactory().get(f"/api/v1/{recurso}/", params, **headers)
+        request.user = user
+        with CaptureQueriesContext(connection) as consultas:
+            if pk is None:
+                response = api.lista(request, recurso)
+            else:
+                response = api.detalle(request, recurso, pk)
+        return response, len(consultas.captured_queries)
+
+    def _primer_id(self, user, recurso):
+        response, _ = self._pedir(user, recurso)
+        datos = json.loads(response.content)["datos"]
+        return datos[0]["id"] if datos else None
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        medidas = {}
+        fallas = []
+        with transaction.atomic():
+            for tamano in TAMANOS:
+                sembrar_datos(n_shoppers=3, n_clientes=2, pedidos_por_cliente=tamano, prefijo=PREFIJO)
+                usuarios = {
+                    "cliente": User.objects.get(username=f"{PREFIJO}_cliente_0"),
+                    "shopper": User.objects.get(username=f"{PREFIJO}_shopper_1"),
+                }
+                for nombre, rec in api.RECURSOS.items():
+                    roles = ["anonimo"] if rec.publico else [r for r in usuarios if r in rec.duenos]
+                    for rol in roles:
+                        user = usuarios.get(rol) or AnonymousUser()
+                        pk = self._primer_id(user, nombre)
+                        for vista, clave in (("lista", None), ("detalle", pk)):
+                            if vista == "detalle" and pk is None:
+                                continue
+                            response, n = self._pedir(user, nombre, clave)
+                            if response.status_code != 200:
+                                fallas.append(f"{nombre} {vista} {rol}: HTTP {response.status_code}")
+                                continue
+                            medidas.setdefault((nombre, vista, rol), []).append(n)
+                            if vista == "detalle":
+                                repetida, _ = self._pedir(user, nombre, clave, HTTP_IF_NONE_MATCH=response["ETag"])
+                                if repetida.status_code != 304:
+                                    fallas.append(f"{nombre} detalle {rol}: If-None-Match -> {repetida.status_code}")
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'recurso':<10} {'vista':<8} {'rol':<8} {'consultas':>12} {'máx':>4}")
+        for (nombre, vista, rol), ns in medidas.items():
+            maximo = api.RECURSOS[nombre].max_consultas
+            estado = "OK"
+            if max(ns) > maximo:
+                estado = "EXCEDE"
+            elif len(set(ns)) > 1:
+                estado = "CRECE"
+            self.stdout.write(f"{nombre:<10} {vista:<8} {rol:<8} {'/'.join(map(str, ns)):>12} {maximo:>4}  {estado}")
+            if estado != "OK":
+                fallas.append(f"{nombre} {vista} {rol}: {ns} (máx {maximo})")
+        if fallas:
+            raise CommandError("Falló la verificación de la API:\n  " + "\n  ".join(fallas))
+        self.stdout.write(self.style.SUCCESS("Todos los endpoints dentro de su máximo de consultas."))
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:10:52 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/verificar_indices.py
+# Corre EXPLAIN sobre las consultas críticas de las vistas (con un dataset
+# sembrado) y falla si alguna hace un scan secuencial de la tabla principal.
+#
+#   python manage.py verificar_indices            # sale con error si hay seq scan
+#   python manage.py verificar_indices --verbose  # imprime los planes
+#
+# En Postgres se desactiva enable_seqscan dentro de la transacción: así el
+# resultado no depende del tamaño del dataset (con pocas filas el planner
+# prefiere un seq scan aunque el índice exista). Si aun así aparece
+# "Seq Scan", es porque no hay índice utilizable.
+
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from marketplace.loadtest import sembrar_datos
+from marketplace.models import (
+    CustomerProfile,
+    Expense,
+    Order,
+    Payment,
+    ShopperProfile,
+    Trip,
+)
+
+_RE_SEQ_PG = re.compile(r"Seq Scan on (\w+)")
+_RE_SCAN_SQLITE = re.compile(r"\bSCAN (?:TABLE )?(\w+)(.*)$")
+
+
+class _Rollback(Exception):
+    pass
+
+
+def consultas_criticas():
+    """
+    (nombre, queryset, tabla) de las consultas que hacen las vistas en cada
+    request. `tabla` es la que debe resolverse por índice.
+    """
+    shopper = ShopperProfile.objects.order_by("pk").first()
+    customer = CustomerProfile.objects.order_by("pk").first()
+    pedido = Order.objects.filter(shopper=shopper).order_by("pk").first()
+    hoy = timezone.now().date()
+
+    o = Order._meta.db_table
+    p = Payment._meta.db_table
+    e = Expense._meta.db_table
+    t = Trip._meta.db_table
+    s = ShopperProfile._meta.db_table
+
+    return [
+        (
+            "shopper_dashboard: pedidos del shopper",
+            Order.objects.filter(shopper=shopper).order_by("-creado"),
+            o,
+        ),
+        (
+            "mi_perfil: pedidos completados",
+            Order.objects.filter(shopper=shopper, estado="ENTREGADO"),
+            o,
+        ),
+        (
+            "shopper_dashboard: pedidos abiertos",
+            Order.objects.filter(shopper__isnull=True, estado="BUSCANDO_SHOPPER").order_by("-creado"),
+            o,
+        ),
+        (
+            "customer_dashboard: pedidos del cliente",
+            Order.objects.filter(customer=customer).order_by("-creado"),
+            o,
+        ),
+        (
+            "shopper_order_detail: pagos pendientes",
+            Payment.objects.filter(pedido=pedido, aprobado=False).order_by("-creado"),
+            p,
+        ),
+        (
+            "Order.total_pagos: pagos aprobados",
+            Payment.objects.filter(pedido=pedido, aprobado=True),
+            p,
+        ),
+        (
+            "shopper_dashboard: ingresos aprobados",
+            Payment.objects.filter(pedido__shopper=shopper, aprobado=True),
+            p,
+        ),
+        (
+            "shopper_gastos_generales: gastos generales",
+            Expense.objects.filter(shopper=shopper, pedido__isnull=True).order_by("-creado"),
+            e,
+        ),
+        (
+            "shopper_dashboard: gastos por pedido",
+            Expense.objects.filter(shopper=shopper, pedido__isnull=False),
+            e,
+        ),
+        (
+            "mi_perfil: viajes futuros",
+            Trip.objects.filter(shopper=shopper, fecha_inicio__gte=hoy).order_by("fecha_inicio"),
+            t,
+        ),
+        (
+            "home: viajan pronto",
+            Trip.objects.filter(fecha_inicio__gte=hoy, fecha_inicio__lte=hoy + timezone.timedelta(days=7)),
+            t,
+        ),
+        (
+            "buscar_shoppers: shoppers disponibles",
+            ShopperProfile.objects.filter(acepta_nuevos_pedidos=True).order_by("-puntaje_ranking", "-creado"),
+            s,
+        ),
+    ]
+
+
+def tablas_con_seq_scan(plan, vendor):
+    tablas = set()
+    for linea in plan.splitlines():
+        if vendor == "postgresql":
+            tablas.update(_RE_SEQ_PG.findall(linea))
+        else:
+            m = _RE_SCAN_SQLITE.search(linea)
+            if m and "USING" not in m.group(2):
+                tablas.add(m.group(1))
+    return tablas
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta EXPLAIN sobre las consultas críticas de las vistas y falla si "
+        "alguna cae en un scan secuencial (Postgres y SQLite)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose", action="store_true", help="Imprime cada plan.")
+        parser.add_argument(
+            "--conservar",
+            action="store_true",
+            help="No revierte el dataset sembrado (por defecto todo corre en una transacción y se descarta).",
+        )
+
+    def handle(self, *args, **opts):
+        vendor = connection.vendor
+        if vendor not in ("postgresql", "sqlite"):
+            raise CommandError(f"Motor no soportado para EXPLAIN: {vendor}")
+
+        fallas = []
+        try:
+            with transaction.atomic():
+                sembrar_datos(n_shoppers=20, n_clientes=40, pedidos_por_cliente=4, prefijo="explain")
+                with connection.cursor() as cursor:
+                    if vendor == "postgresql":
+                        cursor.execute("ANALYZE")
+                        cursor.execute("SET LOCAL enable_seqscan = off")
+
+                for nombre, qs, tabla in consultas_criticas():
+                    plan = qs.explain()
+                    seq = tablas_con_seq_scan(plan, vendor)
+                    ok = tabla not in seq
+                    self.stdout.write(f"[{'OK' if ok else 'SEQ SCAN'}] {nombre}")
+                    if opts["verbose"] or not ok:
+                        for linea in plan.splitlines():
+                            self.stdout.write(f"    {linea}")
+                    if not ok:
+                        fallas.append(nombre)
+
+                if not opts["conservar"]:
+                    raise _Rollback
+        except _Rollback:
+            pass
+
+        if fallas:
+            raise CommandError(
+                f"{len(fallas)} consulta(s) crítica(s) sin índice: " + "; ".join(fallas)
+            )
+        self.stdout.write(self.style.SUCCESS("Todas las consultas críticas usan índices."))
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 02:58:14 2026
+
+@author: jvz16
+"""
+
+# marketplace/management/commands/warm_caches.py
+# Calienta caches después de un deploy (ver marketplace/calentamiento.py).
+#
+# Después de cada deploy, con el servicio nuevo ya sirviendo (desde el Shell
+# de Render o un job), no en build.sh: el build corre antes de que arranque
+# la versión nueva. Calienta los workers por HTTP y, con REDIS_URL, también
+# el cache compartido (ranking y páginas):
+#   python manage.py warm_caches --url https://<servicio>.onrender.com --rondas 8
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from marketplace.calentamiento import calentar, tareas
+
+
+class Command(BaseCommand):
+    help = (
+        "Precalienta el cache compartido (ranking, snapshot de métricas, páginas "
+        "de home / buscar_shoppers / perfiles) y, con --url, los caches de cada "
+        "worker del servidor vivo. Corre en paralelo con un pool acotado y "
+        "reporta tiempos. Es seguro con tráfico."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Servidor vivo para calentar también cada worker.")
+        parser.add_argument("--rondas", type=int, default=4, help="Requests por página con --url (≥ workers).")
+        parser.add_argument("--shoppers", type=int, default=20, help="Perfiles de shopper a calentar.")
+        parser.add_argument("--hilos", type=int, default=4)
+        parser.add_argument(
+            "--estricto",
+            action="store_true",
+            help="Termina con error si alguna tarea falla (por defecto solo se reporta).",
+        )
+        parser.add_argument("--json", action="store_true", help="Salida en JSON.")
+
+    def handle(self, *args, **opts):
+        lista, avisos = tareas(url=opts["url"], rondas=opts["rondas"], n_shoppers=opts["shoppers"])
+        resultados, total_ms = calentar(lista, hilos=opts["hilos"])
+        errores = [r for r in resultados if r["error"]]
+
+        if opts["json"]:
+            self.stdout.write(
+                json.dumps({"total_ms": total_ms, "tareas": resultados, "avisos": avisos}, indent=2)
+            )
+        else:
+            for aviso in avisos:
+                self.stdout.write(self.style.WARNING(aviso))
+            self.stdout.write(f"{'tarea':<40}{'ms':>9}  resultado")
+            for r in resultados:
+                detalle = self.style.ERROR(r["error"]) if r["error"] else r["resultado"]
+                self.stdout.write(f"{r['tarea']:<40}{r['ms']:>9.1f}  {detalle}")
+            suma = sum(r["ms"] for r in resultados)
+            self.stdout.write(
+                f"\n{len(resultados)} tareas en {total_ms:.0f} ms con {opts['hilos']} hilos "
+                f"(en serie serían ~{suma:.0f} ms); {len(errores)} con error"
+            )
+
+        if errores and opts["estricto"]:
+            raise CommandError(f"{len(errores)} tareas fallaron")
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 12:02:18 2026
+
+@author: jvz16
+"""
+
+# marketplace/metricas.py
+# Métricas estilo Prometheus sin dependencias externas.
+#
+# Cada proceso (worker de gunicorn) acumula contadores e histogramas en
+# memoria y los vuelca cada pocos segundos a METRICAS_DIR/<pid>-<inicio>.json
+# (escritura atómica). /metrics suma los archivos de todos los workers, así
+# que el resultado es el mismo sin importar qué worker atiende el scrape.
+# Los archivos de workers que ya terminaron (reinicio, max_requests, deploy)
+# se suman a METRICAS_DIR/acumulado.json en el scrape y se borran, así la
+# carpeta no crece y los contadores no retroceden. El directorio es por
+# máquina: "terminó" se decide por el pid.
+#
+# Los gauges de negocio (pedidos abiertos, pagos pendientes, shoppers
+# activos) salen de un snapshot compartido en METRICAS_DIR/snapshot.json que
+# se recalcula como máximo cada METRICAS_SNAPSHOT_SEGUNDOS, no en cada scrape.
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+# Buckets de latencia en segundos (convención Prometheus)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+AYUDA = {
+    "marketplace_http_requests_total": ("counter", "Requests atendidos por vista y status."),
+    "marketplace_http_request_duration_seconds": ("histogram", "Latencia de requests por vista."),
+    "marketplace_db_queries_total": ("counter", "Consultas SQL ejecutadas por vista."),
+    "marketplace_cache_requests_total": ("counter", "Lecturas de cache por cache y resultado (hit/miss)."),
+    "marketplace_limite_tasa_rechazos_total": ("counter", "Requests rechazados con 429 por regla y balde (ip/usuario/cuenta)."),
+    "marketplace_carga_descartada_total": ("counter", "Requests descartados con 503 por exceso de requests en curso."),
+    "marketplace_pedidos_buscando_shopper": ("gauge", "Pedidos BUSCANDO_SHOPPER sin shopper asignado."),
+    "marketplace_pagos_pendientes": ("gauge", "Pagos reportados por clientes pendientes de aprobación."),
+    "marketplace_shoppers_activos": ("gauge", "Shoppers que aceptan nuevos pedidos."),
+    "marketplace_snapshot_timestamp_seconds": ("gauge", "Momento (epoch) del último snapshot de negocio."),
+}
+
+
+def directorio_metricas():
+    return str(
+        getattr(settings, "METRICAS_DIR", "")
+        or os.path.join(tempfile.gettempdir(), "personal_shoppers_metricas")
+    )
+
+
+def _escribir_atomico(ruta, datos):
+    carpeta = os.path.dirname(ruta)
+    fd, tmp = tempfile.mkstemp(dir=carpeta, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+        os.replace(tmp, ruta)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# =========================
+# Registro por proceso
+# =========================
+class RegistroMetricas:
+    def __init__(self, intervalo_volcado=5.0):
+        self.lock = threading.Lock()
+        self.contadores = {}  # (nombre, labels) -> float
+        self.histogramas = {}  # (nombre, labels) -> [buckets..., +Inf, suma]
+        self.intervalo_volcado = intervalo_volcado
+        self._ultimo_volcado = 0.0
+        self._pid = None
+        self._archivo = None
+
+    def _clave(self, nombre, labels):
+        return nombre, tuple(sorted(labels.items()))
+
+    def inc(self, nombre, labels, valor=1):
+        clave = self._clave(nombre, labels)
+        with self.lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, labels, valor, buckets=BUCKETS_LATENCIA):
+        clave = self._clave(nombre, labels)
+        with self.lock:
+            h = self.histogramas.get(clave)
+            if h is None:
+                h = self.histogramas[clave] = [0] * (len(buckets) + 1) + [0.0]
+            for i, limite in enumerate(buckets):
+                if valor <= limite:
+                    h[i] += 1
+            h[len(buckets)] += 1  # +Inf (= count)
+            h[-1] += valor
+
+    def _archivo_proceso(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            if self._pid is not None:
+                # Tras un fork (gunicorn --preload) lo heredado es del padre,
+                # que ya lo volcó en su propio archivo: el worker arranca de cero.
+                with self.lock:
+                    self.contadores.clear()
+                    self.histogramas.clear()
+            self._pid = pid
+            self._archivo = os.path.join(directorio_metricas(), f"{pid}-{int(time.time())}.json")
+        return self._archivo
+
+    def volcar_si_toca(self, forzar=False):
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo_volcado < self.intervalo_volcado:
+            return
+        self._ultimo_volcado = ahora
+        archivo = self._archivo_proceso()
+        with self.lock:
+            datos = {
+                "contadores": [[n, list(l), v] for (n, l), v in self.contadores.items()],
+                "histogramas": [[n, list(l), list(h)] for (n, l), h in self.histogramas.items()],
+            }
+        os.makedirs(os.path.dirname(archivo), exist_ok=True)
+        _escribir_atomico(archivo, datos)
+
+
+registro = RegistroMetricas()
+
+
+def registrar_request(vista, status, segundos, consultas):
+    labels = {"vista": vista or "desconocida"}
+    registro.inc("marketplace_http_requests_total", {**labels, "status": str(status)})
+    registro.observar("marketplace_http_request_duration_seconds", labels, segundos)
+    registro.inc("marketplace_db_queries_total", labels, consultas)
+    registro.volcar_si_toca()
+
+
+def registrar_cache(cache, hit):
+    """
+    Punto único para reportar lecturas de cache (lo usan las capas de cache
+    del sitio). Permite calcular el hit ratio por cache en Prometheus.
+    """
+    registro.inc("marketplace_cache_requests_total", {"cache": cache, "resultado": "hit" if hit else "miss"})
+
+
+def registrar_limite(regla, balde):
+    registro.inc("marketplace_limite_tasa_rechazos_total", {"regla": regla, "balde": balde})
+
+
+def registrar_descarte():
+    registro.inc("marketplace_carga_descartada_total", {})
+
+
+# =========================
+# Snapshot de negocio compartido
+# =========================
+def _calcular_snapshot():
+    from .models import Order, Payment, ShopperProfile
+
+    return {
+        "marketplace_pedidos_buscando_shopper": Order.objects.filter(
+            estado="BUSCANDO_SHOPPER", shopper__isnull=True
+        ).count(),
+        "marketplace_pagos_pendientes": Payment.objects.filter(aprobado=False).count(),
+        "marketplace_shoppers_activos": ShopperProfile.objects.filter(acepta_nuevos_pedidos=True).count(),
+    }
+
+
+def snapshot_negocio():
+    """
+    Devuelve el snapshot vigente. Si está vencido lo recalcula un solo
+    worker (lock por archivo con O_EXCL); los demás usan el anterior.
+    """
+    ttl = float(getattr(settings, "METRICAS_SNAPSHOT_SEGUNDOS", 60))
+    carpeta = directorio_metricas()
+    ruta = os.path.join(carpeta, "snapshot.json")
+    ruta_lock = ruta + ".lock"
+
+    actual = None
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            actual = json.load(f)
+    except (OSError, ValueError):
+        actual = None
+
+    if actual and time.time() - actual.get("ts", 0) < ttl:
+        registrar_cache("metricas_snapshot", True)
+        return actual
+    registrar_cache("metricas_snapshot", False)
+
+    os.makedirs(carpeta, exist_ok=True)
+    try:
+        # Lock huérfano (worker muerto a mitad de cálculo): se libera pasado el TTL.
+        if time.time() - os.path.getmtime(ruta_lock) > ttl:
+            os.unlink(ruta_lock)
+    except OSError:
+        pass
+    try:
+        fd = os.open(ruta_lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return actual or {"ts": 0, "valores": {}}
+
+    try:
+        os.close(fd)
+        nuevo = {"ts": time.time(), "valores": _calcular_snapshot()}
+        _escribir_atomico(ruta, nuevo)
+        return nuevo
+    finally:
+        try:
+            os.unlink(ruta_lock)
+        except OSError:
+            pass
+
+
+# =========================
+# Workers terminados -> acumulado.json
+# =========================
+ACUMULADO = "acumulado.json"
+
+# Un lock de compactación más viejo que esto es de un worker que murió a mitad
+LOCK_COMPACTAR_SEGUNDOS = 60
+
+
+def _leer_json(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _sumar(contadores, histogramas, datos):
+    for n, labels, valor in datos.get("contadores", []):
+        clave = (n, tuple(tuple(x) for x in labels))
+        contadores[clave] = contadores.get(clave, 0) + valor
+    for n, labels, h in datos.get("histogramas", []):
+        clave = (n, tuple(tuple(x) for x in labels))
+        previo = histogramas.get(clave)
+        histogramas[clave] = h if previo is None else [a + b for a, b in zip(previo, h)]
+
+
+def _archivos_procesos(carpeta):
+    try:
+        nombres = os.listdir(carpeta)
+    except OSError:
+        return []
+    return [
+        n for n in nombres
+        if n.endswith(".json") and not n.startswith(".") and n not in ("snapshot.json", ACUMULADO)
+    ]
+
+
+def _proceso_vivo(nombre):
+    pid = nombre.split("-", 1)[0]
+    if os.name == "nt" or not pid.isdigit():
+        # En Windows os.kill(pid, 0) termina el proceso: nunca se compacta
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # existe pero es de otro usuario
+    return True
+
+
+def compactar_terminados():
+    """
+    Suma los archivos de los procesos que ya no existen a acumulado.json y
+    los borra. Un solo proceso a la vez (lock con O_EXCL). acumulado.json
+    anota qué archivos ya sumó: si algo falla antes de borrarlos, no se
+    cuentan dos veces. Devuelve cuántos archivos compactó.
+    """
+    carpeta = directorio_metricas()
+    muertos = [n for n in _archivos_procesos(carpeta) if not _proceso_vivo(n)]
+    if not muertos:
+        return 0
+
+    ruta = os.path.join(carpeta, ACUMULADO)
+    ruta_lock = ruta + ".lock"
+    try:
+        if time.time() - os.path.getmtime(ruta_lock) > LOCK_COMPACTAR_SEGUNDOS:
+            os.unlink(ruta_lock)
+    except OSError:
+        pass
+    try:
+        fd = os.open(ruta_lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return 0  # otro worker está compactando
+
+    try:
+        os.close(fd)
+        acumulado = _leer_json(ruta) or {}
+        incluidos = set(acumulado.get("incluidos", []))
+        contadores, histogramas = {}, {}
+        _sumar(contadores, histogramas, acumulado)
+        nuevos = []
+        for nombre in muertos:
+            if nombre in incluidos:
+                continue
+            datos = _leer_json(os.path.join(carpeta, nombre))
+            if datos is not None:
+                _sumar(contadores, histogramas, datos)
+            nuevos.append(nombre)
+        if nuevos:
+            existentes = set(_archivos_procesos(carpeta))
+            _escribir_atomico(
+                ruta,
+                {
+                    "contadores": [[n, list(l), v] for (n, l), v in contadores.items()],
+                    "histogramas": [[n, list(l), list(h)] for (n, l), h in histogramas.items()],
+                    # Solo hace falta recordar los que todavía están en disco
+                    "incluidos": sorted((incluidos | set(nuevos)) & existentes),
+                },
+            )
+        for nombre in muertos:
+            try:
+                os.unlink(os.path.join(carpeta, nombre))
+            except OSError:
+                pass
+        return len(nuevos)
+    finally:
+        try:
+            os.unlink(ruta_lock)
+        except OSError:
+            pass
+
+
+# =========================
+# Exposición en formato texto
+# =========================
+def _leer_procesos():
+    contadores = {}
+    histogramas = {}
+    carpeta = directorio_metricas()
+    acumulado = _leer_json(os.path.join(carpeta, ACUMULADO)) or {}
+    _sumar(contadores, histogramas, acumulado)
+    # Los que ya están en acumulado.json pero no se llegaron a borrar no se suman
+    incluidos = set(acumulado.get("incluidos", []))
+    for nombre in _archivos_procesos(carpeta):
+        if nombre in incluidos:
+            continue
+        datos = _leer_json(os.path.join(carpeta, nombre))
+        if datos is not None:
+            _sumar(contadores, histogramas, datos)
+    return contadores, histogramas
+
+
+def _labels_texto(labels):
+    if not labels:
+        return ""
+    partes = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        partes.append(f'{k}="{v}"')
+    return "{" + ",".join(partes) + "}"
+
+
+def _num(valor):
+    if isinstance(valor, float) and not valor.is_integer():
+        return repr(valor)
+    return str(int(valor))
+
+
+def exposicion_texto():
+    snapshot = snapshot_negocio()
+    registro.volcar_si_toca(forzar=True)
+    compactar_terminados()
+    contadores, histogramas = _leer_procesos()
+
+    lineas = []
+    vistos = set()
+
+    def encabezado(nombre):
+        if nombre in vistos:
+            return
+        vistos.add(nombre)
+        tipo, ayuda = AYUDA.get(nombre, ("untyped", ""))
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+
+    for (nombre, labels), valor in sorted(contadores.items()):
+        encabezado(nombre)
+        lineas.append(f"{nombre}{_labels_texto(labels)} {_num(valor)}")
+
+    for (nombre, labels), h in sorted(histogramas.items()):
+        encabezado(nombre)
+        for i, limite in enumerate(BUCKETS_LATENCIA):
+            lineas.append(f"{nombre}_bucket{_labels_texto(labels + (('le', str(limite)),))} {_num(h[i])}")
+        total = h[len(BUCKETS_LATENCIA)]
+        lineas.append(f"{nombre}_bucket{_labels_texto(labels + (('le', '+Inf'),))} {_num(total)}")
+        lineas.append(f"{nombre}_sum{_labels_texto(labels)} {_num(h[-1])}")
+        lineas.append(f"{nombre}_count{_labels_texto(labels)} {_num(total)}")
+
+    for nombre, valor in sorted(snapshot.get("valores", {}).items()):
+        encabezado(nombre)
+        lineas.append(f"{nombre} {_num(valor)}")
+    encabezado("marketplace_snapshot_timestamp_seconds")
+    lineas.append(f"marketplace_snapshot_timestamp_seconds {_num(float(snapshot.get('ts', 0)))}")
+
+    return "\n".join(lineas) + "\n"
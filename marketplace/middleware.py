@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:05:12 2026
+
+@author: jvz16
+"""
+
+# marketplace/middleware.py
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.shortcuts import render
+
+from . import db_router, instrumentacion, limites, metricas
+
+logger_perf = logging.getLogger("marketplace.perf")
+
+
+class ConteoConsultasMiddleware:
+    """
+    Agrega el header X-DB-Queries con el número de consultas SQL del request.
+    Lo usa el harness de carga (manage.py loadtest) para reportar consultas
+    por endpoint. Solo se activa con LOADTEST_QUERY_HEADER=True; si no, Django
+    lo descarta al arrancar (MiddlewareNotUsed) y no cuesta nada.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "LOADTEST_QUERY_HEADER", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        contador = [0]
+
+        def contar(execute, sql, params, many, context):
+            contador[0] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(contar):
+            response = self.get_response(request)
+        response["X-DB-Queries"] = str(contador[0])
+        return response
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide cada request muestreado: cantidad de consultas, tiempo total de BD,
+    las consultas más lentas (con fingerprint normalizado) y el tiempo de
+    render de templates. Emite una línea JSON en el logger "marketplace.perf"
+    y, si INSTRUMENTACION_SERVER_TIMING está activo, el header Server-Timing.
+
+    Con INSTRUMENTACION_ACTIVA=False Django lo descarta al arrancar
+    (MiddlewareNotUsed): no queda ni una llamada extra en el camino del request.
+    Bajo ASGI corre async, sin sacar a las vistas async de su loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "INSTRUMENTACION_ACTIVA", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.muestreo = float(getattr(settings, "INSTRUMENTACION_MUESTREO", 1.0))
+        self.umbral_request_ms = float(getattr(settings, "INSTRUMENTACION_UMBRAL_REQUEST_MS", 0))
+        self.umbral_sql_ms = float(getattr(settings, "INSTRUMENTACION_UMBRAL_SQL_MS", 100))
+        self.top_sql = int(getattr(settings, "INSTRUMENTACION_TOP_SQL", 5))
+        self.server_timing = bool(getattr(settings, "INSTRUMENTACION_SERVER_TIMING", False))
+        instrumentacion.instalar_medicion_templates()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _muestreado(self):
+        return self.muestreo >= 1.0 or random.random() < self.muestreo
+
+    def _medicion(self):
+        return instrumentacion.MedicionRequest(top_n=self.top_sql, umbral_sql_ms=self.umbral_sql_ms)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._muestreado():
+            return self.get_response(request)
+
+        medicion = self._medicion()
+        token = instrumentacion.activar(medicion)
+        try:
+            with connection.execute_wrapper(medicion):
+                response = self.get_response(request)
+        finally:
+            instrumentacion.desactivar(token)
+        return self._reportar(request, response, medicion)
+
+    async def __acall__(self, request):
+        if not self._muestreado():
+            return await self.get_response(request)
+
+        # La medición viaja en un ContextVar y el wrapper queda en la conexión
+        # del contexto: las consultas que el ORM async corre en su hilo cuentan
+        medicion = self._medicion()
+        token = instrumentacion.activar(medicion)
+        try:
+            with connection.execute_wrapper(medicion):
+                response = await self.get_response(request)
+        finally:
+            instrumentacion.desactivar(token)
+        return self._reportar(request, response, medicion)
+
+    def _reportar(self, request, response, medicion):
+        total_ms = medicion.total_ms
+        vista = getattr(getattr(request, "resolver_match", None), "view_name", None) or ""
+
+        if self.server_timing:
+            response["Server-Timing"] = medicion.server_timing()
+
+        for ms, sql in medicion.sobre_umbral:
+            norm = instrumentacion.normalizar_sql(sql)
+            logger_perf.warning(
+                json.dumps(
+                    {
+                        "evento": "slow_query",
+                        "vista": vista,
+                        "ms": round(ms, 2),
+                        "fingerprint": instrumentacion.fingerprint_sql(norm),
+                        "sql": norm[:1000],
+                    },
+                    ensure_ascii=False,
+                )
+            )
+
+        if total_ms >= self.umbral_request_ms:
+            logger_perf.info(
+                json.dumps(
+                    {
+                        "evento": "request",
+                        "metodo": request.method,
+                        "path": request.path,
+                        "vista": vista,
+                        "status": response.status_code,
+                        "total_ms": round(total_ms, 2),
+                        "db_ms": round(medicion.db_ms, 2),
+                        "template_ms": round(medicion.template_ms, 2),
+                        "consultas": medicion.consultas,
+                        "top_sql": medicion.consultas_lentas(),
+                    },
+                    ensure_ascii=False,
+                )
+            )
+        return response
+
+
+class MetricasMiddleware:
+    """
+    Alimenta /metrics: latencia por vista (histograma), requests por status
+    y consultas SQL por vista. Se activa con METRICAS_ACTIVAS. Bajo ASGI
+    corre async, sin sacar a las vistas async de su loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICAS_ACTIVAS", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _contador():
+        contador = [0]
+
+        def contar(execute, sql, params, many, context):
+            contador[0] += 1
+            return execute(sql, params, many, context)
+
+        return contador, contar
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        contador, contar = self._contador()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(contar):
+            response = self.get_response(request)
+        self._registrar(request, response, time.perf_counter() - inicio, contador[0])
+        return response
+
+    async def __acall__(self, request):
+        contador, contar = self._contador()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(contar):
+            response = await self.get_response(request)
+        self._registrar(request, response, time.perf_counter() - inicio, contador[0])
+        return response
+
+    @staticmethod
+    def _registrar(request, response, segundos, consultas):
+        match = getattr(request, "resolver_match", None)
+        vista = match.view_name if match else "sin_ruta"
+        if vista != "metrics":
+            metricas.registrar_request(vista, response.status_code, segundos, consultas)
+
+
+class ReplicaMiddleware:
+    """
+    Marca como "puede leer de la réplica" los requests GET/HEAD a las vistas
+    de REPLICA_VISTAS. Después de cualquier POST deja una cookie corta para
+    que esa sesión lea del primario (read-your-writes) mientras la réplica
+    se pone al día. Sin DATABASE_REPLICA_URL Django lo descarta al arrancar.
+    Bajo ASGI corre async, sin sacar a las vistas async de su loop.
+    """
+
+    COOKIE = "ps_rw"
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if db_router.ALIAS_REPLICA not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.vistas = set(getattr(settings, "REPLICA_VISTAS", []))
+        self.ventana = int(getattr(settings, "REPLICA_READ_YOUR_WRITES_SEGUNDOS", 10))
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django adapta process_view según sea o no corrutina
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = db_router.usar_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.usar_replica.reset(token)
+        return self._marcar_escritura(request, response)
+
+    async def __acall__(self, request):
+        token = db_router.usar_replica.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_router.usar_replica.reset(token)
+        return self._marcar_escritura(request, response)
+
+    def _marcar_escritura(self, request, response):
+        if request.method not in ("GET", "HEAD", "OPTIONS") and self.ventana > 0:
+            response.set_cookie(
+                self.COOKIE,
+                "1",
+                max_age=self.ventana,
+                httponly=True,
+                samesite="Lax",
+                secure=request.is_secure(),
+            )
+        return response
+
+    def _marcar_lectura(self, request):
+        match = request.resolver_match
+        if (
+            request.method in ("GET", "HEAD")
+            and match is not None
+            and match.view_name in self.vistas
+            and self.COOKIE not in request.COOKIES
+        ):
+            db_router.usar_replica.set(True)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self._marcar_lectura(request)
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        # Sin hilo: el ContextVar queda en el contexto del request
+        self._marcar_lectura(request)
+        return None
+
+
+class LimiteConcurrenciaMiddleware:
+    """
+    Descarta con 503 + Retry-After los requests que llegan cuando ya hay
+    CONCURRENCIA_MAXIMA en curso (entre todos los workers con Redis, en el
+    proceso si no; ver limites.py). Responder rápido y que el cliente
+    reintente es mejor que encolar hasta que todos los workers se cuelguen.
+    Estáticos y /metrics no cuentan. Con CONCURRENCIA_MAXIMA=0 Django lo descarta al
+    arrancar. Bajo ASGI corre async y no saca a las vistas async de su loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        maxima = int(getattr(settings, "CONCURRENCIA_MAXIMA", 0))
+        if maxima <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.concurrencia = limites.Concurrencia(maxima)
+        self.reintentar = str(int(getattr(settings, "CONCURRENCIA_REINTENTAR_SEGUNDOS", 2)))
+        self.exentos = tuple(p for p in (settings.STATIC_URL, "/metrics") if p)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _descartar(self):
+        metricas.registrar_descarte()
+        response = HttpResponse(
+            "El sitio está con mucha carga. Probá de nuevo en unos segundos.",
+            status=503,
+            content_type="text/plain; charset=utf-8",
+        )
+        response["Retry-After"] = self.reintentar
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path.startswith(self.exentos):
+            return self.get_response(request)
+        ficha = self.concurrencia.entrar()
+        if ficha is None:
+            return self._descartar()
+        try:
+            return self.get_response(request)
+        finally:
+            self.concurrencia.salir(ficha)
+
+    async def __acall__(self, request):
+        if request.path.startswith(self.exentos):
+            return await self.get_response(request)
+        # El cliente de Redis es síncrono: solo entonces se pasa a un hilo
+        if self.concurrencia.compartida:
+            ficha = await sync_to_async(self.concurrencia.entrar)()
+        else:
+            ficha = self.concurrencia.entrar()
+        if ficha is None:
+            return self._descartar()
+        try:
+            return await self.get_response(request)
+        finally:
+            if self.concurrencia.compartida:
+                await sync_to_async(self.concurrencia.salir)(ficha)
+            else:
+                self.concurrencia.salir(ficha)
+
+
+class LimiteTasaMiddleware:
+    """
+    Aplica los límites de tasa de las vistas marcadas con @limites.limitar
+    (solo a los POST). Va antes de CsrfViewMiddleware para rechazar sin
+    parsear el cuerpo (uploads). Con LIMITES_ACTIVOS=False Django lo
+    descarta al arrancar. Bajo ASGI process_view es async y solo pasa a un
+    hilo para los POST a vistas marcadas.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "LIMITES_ACTIVOS", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django adapta process_view según sea o no corrutina
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    @staticmethod
+    def _marca(request, view_func):
+        if request.method in limites.METODOS_SEGUROS:
+            return None
+        return getattr(view_func, "limite_tasa", None) or getattr(
+            getattr(view_func, "view_class", None), "limite_tasa", None
+        )
+
+    def _revisar(self, request, marca):
+        rechazo = limites.revisar(request, *marca)
+        if rechazo is None:
+            return None
+        balde, espera = rechazo
+        metricas.registrar_limite(marca[0], balde)
+        reintentar = limites.reintentar_en(espera)
+        response = render(
+            request,
+            "marketplace/limite_excedido.html",
+            {"reintentar": reintentar},
+            status=429,
+        )
+        response["Retry-After"] = reintentar
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        marca = self._marca(request, view_func)
+        if marca is None:
+            return None
+        return self._revisar(request, marca)
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        marca = self._marca(request, view_func)
+        if marca is None:
+            return None
+        return await sync_to_async(self._revisar)(request, marca)
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0016_remove_shopperprofile_tarifa_base_crc'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['shopper', 'pedido'], name='expense_shopper_pedido_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(condition=models.Q(('pedido__isnull', True)), fields=['shopper', '-creado'], name='expense_generales_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['shopper', 'estado'], name='order_shopper_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['shopper', '-creado'], name='order_shopper_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', '-creado'], name='order_customer_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('estado', 'BUSCANDO_SHOPPER'), ('shopper__isnull', True)), fields=['-creado'], name='order_abiertos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['pedido', 'aprobado'], name='payment_pedido_aprob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('aprobado', False)), fields=['-creado'], name='payment_pendientes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shopperprofile',
+            index=models.Index(fields=['acepta_nuevos_pedidos', '-calificacion', '-creado'], name='shopper_acepta_calif_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shopperprofile',
+            index=models.Index(fields=['-calificacion', '-creado'], name='shopper_calif_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['shopper', 'fecha_inicio'], name='trip_shopper_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['fecha_inicio'], name='trip_inicio_idx'),
+        ),
+    ]
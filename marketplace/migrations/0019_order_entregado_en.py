@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-19 15:21
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def llenar_entregado_en(apps, schema_editor):
+    # Sin historia de estados: lo más cercano a la entrega es `actualizado`
+    Order = apps.get_model("marketplace", "Order")
+    Order.objects.filter(estado="ENTREGADO", entregado_en__isnull=True).update(entregado_en=F("actualizado"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0018_expense_expense_creado_idx_order_order_creado_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='entregado_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Entregado el'),
+        ),
+        migrations.RunPython(llenar_entregado_en, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg
+from django.utils import timezone
+
+
+def calcular_puntaje(resenas, media, ahora, peso_prior, vida_media_dias):
+    # Copia de marketplace.ranking.calcular_puntaje al escribir esta
+    # migración: si cambia la fórmula, la historia de migraciones no cambia
+    suma = peso_prior * media
+    pesos = peso_prior
+    for rating, creado in resenas:
+        dias = max((ahora - creado).total_seconds() / 86400, 0)
+        w = 0.5 ** (dias / vida_media_dias)
+        suma += w * rating
+        pesos += w
+    return round(suma / pesos, 4) if pesos else 0.0
+
+
+def llenar_puntajes(apps, schema_editor):
+    Review = apps.get_model("marketplace", "Review")
+    ShopperProfile = apps.get_model("marketplace", "ShopperProfile")
+    ahora = timezone.now()
+    media = float(Review.objects.aggregate(avg=Avg("rating"))["avg"] or 0)
+    por_shopper = {}
+    for shopper_id, rating, creado in Review.objects.values_list("shopper_id", "rating", "creado"):
+        por_shopper.setdefault(shopper_id, []).append((rating, creado))
+    shoppers = list(ShopperProfile.objects.only("pk"))
+    for shopper in shoppers:
+        shopper.puntaje_ranking = calcular_puntaje(
+            por_shopper.get(shopper.pk, ()),
+            media,
+            ahora,
+            settings.RANKING_PESO_PRIOR,
+            settings.RANKING_VIDA_MEDIA_DIAS,
+        )
+    ShopperProfile.objects.bulk_update(shoppers, ["puntaje_ranking"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0019_order_entregado_en'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='shopperprofile',
+            name='shopper_acepta_calif_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='shopperprofile',
+            name='shopper_calif_idx',
+        ),
+        migrations.AddField(
+            model_name='shopperprofile',
+            name='puntaje_ranking',
+            field=models.FloatField(default=0, editable=False, verbose_name='Puntaje de ranking'),
+        ),
+        migrations.RunPython(llenar_puntajes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='shopperprofile',
+            index=models.Index(fields=['acepta_nuevos_pedidos', '-puntaje_ranking', '-creado'], name='shopper_acepta_ranking_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shopperprofile',
+            index=models.Index(fields=['-puntaje_ranking', '-creado'], name='shopper_ranking_idx'),
+        ),
+    ]
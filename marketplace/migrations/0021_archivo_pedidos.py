@@ -0,0 +1,106 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0020_shopperprofile_puntaje_ranking'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='review',
+            name='order',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='review', to='marketplace.order'),
+        ),
+        migrations.CreateModel(
+            name='PedidoArchivado',
+            fields=[
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('titulo', models.CharField(blank=True, default='', help_text='Ej: Vestido para boda, laptop de trabajo, regalos…', max_length=200, verbose_name='Título del pedido')),
+                ('precio', models.PositiveIntegerField(blank=True, help_text='Precio acordado del pedido (en la moneda del pedido).', null=True, verbose_name='Precio')),
+                ('descripcion', models.TextField(blank=True, verbose_name='Descripción')),
+                ('modo_presupuesto', models.CharField(choices=[('POR_ARTICULO', 'Presupuesto máximo por artículo'), ('TOTAL', 'Presupuesto máximo total')], default='TOTAL', max_length=20, verbose_name='Modo de presupuesto')),
+                ('moneda', models.CharField(choices=[('CRC', 'Colones'), ('USD', 'Dólares')], default='CRC', max_length=3, verbose_name='Moneda')),
+                ('presupuesto_maximo_por_articulo', models.PositiveIntegerField(blank=True, null=True, verbose_name='Presupuesto máximo por artículo')),
+                ('presupuesto_maximo_total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Presupuesto máximo total')),
+                ('fecha_limite', models.DateField(blank=True, null=True, verbose_name='Fecha límite')),
+                ('estado', models.CharField(choices=[('NUEVO', 'Nuevo'), ('BUSCANDO_SHOPPER', 'Buscando shopper'), ('EN_SELECCION', 'En selección'), ('COMPRADO', 'Comprado'), ('EN_TRANSITO', 'En tránsito'), ('ENTREGADO', 'Entregado'), ('CANCELADO', 'Cancelado')], default='BUSCANDO_SHOPPER', max_length=30)),
+                ('entregado_en', models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Entregado el')),
+                ('foto_referencia_url', models.URLField(blank=True, verbose_name='Foto de referencia (URL)')),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('actualizado', models.DateTimeField()),
+                ('archivado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pedidos_archivados', to='marketplace.customerprofile', verbose_name='Cliente')),
+                ('shopper', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pedidos_archivados', to='marketplace.shopperprofile', verbose_name='Shopper asignado')),
+            ],
+            options={
+                'verbose_name': 'pedido archivado',
+                'verbose_name_plural': 'pedidos archivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='PagoArchivado',
+            fields=[
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('monto', models.PositiveIntegerField(verbose_name='Monto')),
+                ('tipo_pago', models.CharField(choices=[('ADELANTO', 'Adelanto'), ('PARCIAL', 'Pago parcial'), ('FINAL', 'Pago final')], max_length=20, verbose_name='Tipo de pago')),
+                ('metodo', models.CharField(choices=[('SINPE', 'SINPE'), ('EFECTIVO', 'Efectivo'), ('TARJETA', 'Tarjeta'), ('PAYPAL', 'PayPal'), ('OTRO', 'Otro')], max_length=20, verbose_name='Método de pago')),
+                ('nota', models.CharField(blank=True, max_length=255, verbose_name='Nota')),
+                ('creado_por', models.CharField(choices=[('SHOPPER', 'Shopper'), ('CLIENTE', 'Cliente')], default='SHOPPER', max_length=10)),
+                ('aprobado', models.BooleanField(default=True)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('actualizado', models.DateTimeField()),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pagos', to='marketplace.pedidoarchivado')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='GastoArchivado',
+            fields=[
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('categoria', models.CharField(choices=[('PRODUCTO', 'Producto'), ('ENVIO', 'Envío'), ('IMPUESTO', 'Impuesto'), ('VUELO', 'Vuelo'), ('HOSPEDAJE', 'Hospedaje'), ('COMIDA', 'Comida'), ('TRANSPORTE', 'Transporte'), ('OTRO', 'Otro')], max_length=20, verbose_name='Categoría')),
+                ('monto', models.PositiveIntegerField(verbose_name='Monto')),
+                ('descripcion', models.CharField(blank=True, max_length=255, verbose_name='Descripción')),
+                ('moneda', models.CharField(choices=[('CRC', 'Colones'), ('USD', 'Dólares')], default='CRC', max_length=3, verbose_name='Moneda')),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('actualizado', models.DateTimeField()),
+                ('shopper', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='gastos_archivados', to='marketplace.shopperprofile')),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gastos', to='marketplace.pedidoarchivado')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArticuloArchivado',
+            fields=[
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('nombre', models.CharField(max_length=200, verbose_name='Artículo')),
+                ('categoria', models.CharField(choices=[('ROPA', 'Ropa'), ('CALZADO', 'Calzado'), ('TECH', 'Tecnología'), ('ACCESORIOS', 'Accesorios'), ('COSMETICOS', 'Cosméticos / Belleza'), ('HOGAR', 'Hogar'), ('DEPORTES', 'Deportes'), ('NINOS', 'Niños / Bebés'), ('JUGUETES', 'Juguetes'), ('LUJO', 'Lujo'), ('OTRO', 'Otro')], max_length=20)),
+                ('cantidad', models.PositiveIntegerField(default=1)),
+                ('nota', models.CharField(blank=True, max_length=255, verbose_name='Nota')),
+                ('precio_unitario', models.PositiveIntegerField(blank=True, help_text='Precio por unidad (en la moneda del pedido).', null=True, verbose_name='Precio unitario')),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('actualizado', models.DateTimeField()),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='articulos', to='marketplace.pedidoarchivado')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pedidoarchivado',
+            index=models.Index(fields=['shopper', '-creado'], name='archivo_pedido_shopper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedidoarchivado',
+            index=models.Index(fields=['customer', '-creado'], name='archivo_pedido_customer_idx'),
+        ),
+    ]
@@ -0,0 +1,146 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:44
+#
+# Payment y Expense pasan a ser tablas particionadas por mes de `creado`
+# (solo Postgres; ver marketplace/particiones.py). El DDL está copiado acá
+# a propósito: si cambia el módulo, la historia de migraciones no cambia.
+
+from datetime import date
+
+from django.db import migrations
+
+TABLAS = ("marketplace_payment", "marketplace_expense")
+
+# Meses que se crean de entrada; los siguientes los crea manage.py particiones
+MESES_ADELANTE = 3
+
+
+def _mes_siguiente(mes):
+    return date(mes.year + (mes.month == 12), mes.month % 12 + 1, 1)
+
+
+def _particionar_tabla(cursor, q, tabla):
+    """
+    Convierte `tabla` en particionada por mes de `creado`. La tabla actual
+    queda como la partición del mes en curso (sin copiar esas filas); lo de
+    meses anteriores se copia a una partición por mes y se borra de ella.
+    """
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [tabla])
+    fila = cursor.fetchone()
+    if fila and fila[0] == "p":
+        return  # ya particionada
+
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s",
+        [tabla],
+    )
+    indices = [(nombre, definicion) for nombre, definicion in cursor.fetchall() if nombre != f"{tabla}_pkey"]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [tabla],
+    )
+    fks = cursor.fetchall()
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {q(tabla)}")
+    siguiente_id = cursor.fetchone()[0]
+    cursor.execute(f"SELECT date_trunc('month', now())::date, date_trunc('month', MIN(creado))::date FROM {q(tabla)}")
+    actual, primero = cursor.fetchone()
+    limite = _mes_siguiente(actual)
+    sufijo = f"_p{actual:%Y%m}"
+    en_curso = tabla + sufijo
+
+    # 1) La tabla actual pasa a ser la partición del mes en curso: sin
+    #    identity (Postgres no deja adjuntar particiones con columnas
+    #    identity) y con la PK que exige la madre, que tiene que incluir la
+    #    columna de partición. Reconstruir la PK recorre las filas.
+    cursor.execute(f"ALTER TABLE {q(tabla)} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [tabla])
+    serial = cursor.fetchone()[0]
+    if serial:
+        cursor.execute(f"ALTER TABLE {q(tabla)} ALTER COLUMN id DROP DEFAULT")
+        cursor.execute(f"DROP SEQUENCE {serial}")
+    cursor.execute(f"ALTER TABLE {q(tabla)} RENAME TO {q(en_curso)}")
+    cursor.execute(
+        f"ALTER TABLE {q(en_curso)} DROP CONSTRAINT {q(tabla + '_pkey')}, "
+        f"ADD CONSTRAINT {q(en_curso + '_pkey')} PRIMARY KEY (id, creado)"
+    )
+    for nombre, _ in indices:
+        cursor.execute(f"ALTER INDEX {q(nombre)} RENAME TO {q((nombre + sufijo)[:63])}")
+
+    # 2) Tabla madre particionada con las mismas columnas, checks, índices y FKs
+    cursor.execute(
+        f"CREATE TABLE {q(tabla)} (LIKE {q(en_curso)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (creado)"
+    )
+    secuencia = f"{tabla}_id_seq"
+    cursor.execute(f"CREATE SEQUENCE {q(secuencia)} START WITH {int(siguiente_id)} OWNED BY {q(tabla)}.id")
+    cursor.execute(f"ALTER TABLE {q(tabla)} ALTER COLUMN id SET DEFAULT nextval('{secuencia}')")
+    cursor.execute(f"ALTER TABLE {q(tabla)} ADD CONSTRAINT {q(tabla + '_pkey')} PRIMARY KEY (id, creado)")
+    for nombre, definicion in fks:
+        cursor.execute(f"ALTER TABLE {q(tabla)} ADD CONSTRAINT {q(nombre)} {definicion}")
+    for _, definicion in indices:
+        # La definición guardada apunta al nombre original, que ahora es la madre
+        cursor.execute(definicion)
+
+    # 3) Meses anteriores: una partición por mes, copiada de la tabla vieja
+    #    antes de adjuntarla (el ATTACH crea sus índices)
+    mes = primero or actual
+    while mes < actual:
+        siguiente = _mes_siguiente(mes)
+        nombre = f"{tabla}_p{mes:%Y%m}"
+        cursor.execute(f"CREATE TABLE {q(nombre)} (LIKE {q(tabla)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(
+            f"INSERT INTO {q(nombre)} SELECT * FROM {q(en_curso)} WHERE creado >= %s AND creado < %s",
+            [mes, siguiente],
+        )
+        cursor.execute(
+            f"ALTER TABLE {q(tabla)} ATTACH PARTITION {q(nombre)} FOR VALUES FROM (%s) TO (%s)",
+            [mes, siguiente],
+        )
+        mes = siguiente
+    cursor.execute(f"DELETE FROM {q(en_curso)} WHERE creado < %s", [actual])
+
+    # 4) Meses siguientes y DEFAULT para lo que caiga fuera; filas con fecha
+    #    futura (no debería haber) pasan por la madre a la que les toca
+    cursor.execute(f"CREATE TABLE {q(tabla + '_default')} PARTITION OF {q(tabla)} DEFAULT")
+    mes = limite
+    for _ in range(MESES_ADELANTE):
+        siguiente = _mes_siguiente(mes)
+        cursor.execute(
+            f"CREATE TABLE {q(f'{tabla}_p{mes:%Y%m}')} PARTITION OF {q(tabla)} FOR VALUES FROM (%s) TO (%s)",
+            [mes, siguiente],
+        )
+        mes = siguiente
+    cursor.execute(
+        f"WITH movidas AS (DELETE FROM {q(en_curso)} WHERE creado >= %s RETURNING *) "
+        f"INSERT INTO {q(tabla)} SELECT * FROM movidas",
+        [limite],
+    )
+
+    # 5) Lo que quedó (el mes en curso) se adjunta tal cual; Postgres
+    #    reutiliza sus índices
+    cursor.execute(
+        f"ALTER TABLE {q(tabla)} ATTACH PARTITION {q(en_curso)} FOR VALUES FROM (%s) TO (%s)",
+        [actual, limite],
+    )
+
+
+def particionar(apps, schema_editor):
+    # Solo Postgres; en SQLite (desarrollo) las tablas quedan como estaban.
+    # No cambia el estado de los modelos: para Django son las mismas tablas.
+    conexion = schema_editor.connection
+    if conexion.vendor != "postgresql":
+        return
+    with conexion.cursor() as cursor:
+        for tabla in TABLAS:
+            _particionar_tabla(cursor, conexion.ops.quote_name, tabla)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0021_archivo_pedidos'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0022_particionar_pagos_gastos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['actualizado', 'id'], name='order_actualizado_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0023_order_actualizado_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Borrado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('modelo', models.CharField(max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['shopper', 'actualizado', 'id'], name='expense_shopper_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['pedido', 'actualizado', 'id'], name='expense_pedido_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', 'actualizado', 'id'], name='order_customer_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['shopper', 'actualizado', 'id'], name='order_shopper_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['pedido', 'actualizado', 'id'], name='item_pedido_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['pedido', 'actualizado', 'id'], name='payment_pedido_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['customer', 'actualizado', 'id'], name='review_customer_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['shopper', 'actualizado', 'id'], name='review_shopper_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['shopper', 'actualizado', 'id'], name='trip_shopper_sync_idx'),
+        ),
+        migrations.AddField(
+            model_name='borrado',
+            name='customer',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='marketplace.customerprofile'),
+        ),
+        migrations.AddField(
+            model_name='borrado',
+            name='shopper',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='marketplace.shopperprofile'),
+        ),
+        migrations.AddIndex(
+            model_name='borrado',
+            index=models.Index(fields=['customer', 'actualizado', 'id'], name='borrado_customer_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrado',
+            index=models.Index(fields=['shopper', 'actualizado', 'id'], name='borrado_shopper_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrado',
+            index=models.Index(fields=['actualizado'], name='borrado_actualizado_idx'),
+        ),
+    ]
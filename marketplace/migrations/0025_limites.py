@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-19 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0024_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BaldeLimite',
+            fields=[
+                ('clave', models.CharField(max_length=200, primary_key=True, serialize=False)),
+                ('fichas', models.FloatField()),
+                ('ts', models.FloatField()),
+                ('lleno', models.FloatField(db_index=True)),
+            ],
+        ),
+    ]
@@ -159,6 +159,8 @@ class ShopperProfile(TimestampedModel):
     )
 
     calificacion = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    # Orden de los listados: promedio bayesiano con peso por antigüedad (ver ranking.py)
+    puntaje_ranking = models.FloatField("Puntaje de ranking", default=0, editable=False)
     verificado = models.BooleanField(default=False)
     telefono_nacional = models.CharField(
         "Teléfono (sin código de país)",
@@ -166,6 +168,16 @@ class ShopperProfile(TimestampedModel):
         help_text="Número de WhatsApp sin código de país.",
     )
 
+    class Meta:
+        indexes = [
+            # buscar_shoppers / get_top_shoppers_for_customer
+            models.Index(
+                fields=["acepta_nuevos_pedidos", "-puntaje_ranking", "-creado"],
+                name="shopper_acepta_ranking_idx",
+            ),
+            # home: vitrina ordenada por ranking
+            models.Index(fields=["-puntaje_ranking", "-creado"], name="shopper_ranking_idx"),
+        ]
 
     def __str__(self):
         return f"Shopper: {self.user.get_full_name() or self.user.username}"
@@ -203,8 +215,22 @@ class Trip(TimestampedModel):
     def __str__(self):
         return f"Viaje a {self.ciudad_destino} ({self.shopper})"
 
+    class Meta:
+        indexes = [
+            # mi_perfil: viajes futuros / pasados del shopper
+            models.Index(fields=["shopper", "fecha_inicio"], name="trip_shopper_inicio_idx"),
+            # home: "viajan pronto" (rango de fechas para todos los shoppers)
+            models.Index(fields=["fecha_inicio"], name="trip_inicio_idx"),
+            # Sincronización incremental (sincronizacion.py)
+            models.Index(fields=["shopper", "actualizado", "id"], name="trip_shopper_sync_idx"),
+        ]
+
+
+class PedidoBase(TimestampedModel):
+    """
+    Campos de un pedido, compartidos por Order y PedidoArchivado.
+    """
 
-class Order(TimestampedModel):
     ESTADO_CHOICES = [
         ("NUEVO", "Nuevo"),
         ("BUSCANDO_SHOPPER", "Buscando shopper"),
@@ -220,20 +246,6 @@ class Order(TimestampedModel):
         ("TOTAL", "Presupuesto máximo total"),
     ]
 
-    customer = models.ForeignKey(
-        CustomerProfile,
-        on_delete=models.CASCADE,
-        related_name="pedidos",
-        verbose_name="Cliente",
-    )
-    shopper = models.ForeignKey(
-        ShopperProfile,
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True,
-        related_name="pedidos",
-        verbose_name="Shopper asignado",
-    )
     titulo = models.CharField(
         max_length=200,
         verbose_name="Título del pedido",
@@ -283,10 +295,21 @@ class Order(TimestampedModel):
         choices=ESTADO_CHOICES,
         default="BUSCANDO_SHOPPER",
     )
+    # Se fija al pasar a ENTREGADO y no lo mueven las ediciones posteriores
+    # (`actualizado` sí): es el mes del pedido en el P&L (ver reportes.py)
+    entregado_en = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Entregado el",
+    )
     foto_referencia_url = models.URLField(
         "Foto de referencia (URL)", blank=True
     )
 
+    class Meta:
+        abstract = True
+
     def __str__(self):
         return f"Pedido {self.id} - {self.titulo or 'Sin título'}"
 
@@ -322,7 +345,46 @@ class Order(TimestampedModel):
         return int(self.total_pagos or 0) - int(self.total_gastos or 0)
 
 
-class OrderItem(TimestampedModel):
+class Order(PedidoBase):
+    customer = models.ForeignKey(
+        CustomerProfile,
+        on_delete=models.CASCADE,
+        related_name="pedidos",
+        verbose_name="Cliente",
+    )
+    shopper = models.ForeignKey(
+        ShopperProfile,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="pedidos",
+        verbose_name="Shopper asignado",
+    )
+
+    class Meta:
+        indexes = [
+            # Dashboards del shopper (pedidos propios, filtrados por estado)
+            models.Index(fields=["shopper", "estado"], name="order_shopper_estado_idx"),
+            models.Index(fields=["shopper", "-creado"], name="order_shopper_creado_idx"),
+            # Dashboard del cliente
+            models.Index(fields=["customer", "-creado"], name="order_customer_creado_idx"),
+            # Admin: date_hierarchy / filtro por fecha
+            models.Index(fields=["creado"], name="order_creado_idx"),
+            # Feed de pedidos abiertos (novedades.py): lo cambiado desde el cursor
+            models.Index(fields=["actualizado", "id"], name="order_actualizado_idx"),
+            # Sincronización incremental (sincronizacion.py)
+            models.Index(fields=["customer", "actualizado", "id"], name="order_customer_sync_idx"),
+            models.Index(fields=["shopper", "actualizado", "id"], name="order_shopper_sync_idx"),
+            # Pedidos abiertos: índice parcial, solo contiene los que buscan shopper
+            models.Index(
+                fields=["-creado"],
+                condition=models.Q(estado="BUSCANDO_SHOPPER", shopper__isnull=True),
+                name="order_abiertos_idx",
+            ),
+        ]
+
+
+class ArticuloBase(TimestampedModel):
     CATEGORIA_ARTICULO_CHOICES = [
         ("ROPA", "Ropa"),
         ("CALZADO", "Calzado"),
@@ -337,9 +399,6 @@ class OrderItem(TimestampedModel):
         ("OTRO", "Otro"),
     ]
 
-    pedido = models.ForeignKey(
-        Order, on_delete=models.CASCADE, related_name="articulos"
-    )
     nombre = models.CharField("Artículo", max_length=200)
     categoria = models.CharField(
         max_length=20, choices=CATEGORIA_ARTICULO_CHOICES
@@ -355,12 +414,26 @@ class OrderItem(TimestampedModel):
         help_text="Precio por unidad (en la moneda del pedido).",
     )
 
+    class Meta:
+        abstract = True
+
     def __str__(self):
         return f"{self.nombre} ({self.get_categoria_display()})"
 
 
+class OrderItem(ArticuloBase):
+    pedido = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="articulos"
+    )
+
+    class Meta:
+        indexes = [
+            # Sincronización incremental (sincronizacion.py)
+            models.Index(fields=["pedido", "actualizado", "id"], name="item_pedido_sync_idx"),
+        ]
+
 
-class Payment(TimestampedModel):
+class PagoBase(TimestampedModel):
     TIPO_PAGO_CHOICES = [
         ("ADELANTO", "Adelanto"),
         ("PARCIAL", "Pago parcial"),
@@ -380,9 +453,6 @@ class Payment(TimestampedModel):
         ("CLIENTE", "Cliente"),
     ]
 
-    pedido = models.ForeignKey(
-        Order, on_delete=models.CASCADE, related_name="pagos"
-    )
     monto = models.PositiveIntegerField("Monto")
     tipo_pago = models.CharField(
         max_length=20, choices=TIPO_PAGO_CHOICES, verbose_name="Tipo de pago"
@@ -402,12 +472,37 @@ class Payment(TimestampedModel):
     )
     aprobado = models.BooleanField(default=True)
 
+    class Meta:
+        abstract = True
+
     def __str__(self):
         estado = "aprobado" if self.aprobado else "pendiente"
         return f"Pago {self.monto} ({self.tipo_pago}) - {estado}"
 
 
-class Expense(TimestampedModel):
+class Payment(PagoBase):
+    pedido = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="pagos"
+    )
+
+    class Meta:
+        indexes = [
+            # Totales por pedido (aprobados / pendientes)
+            models.Index(fields=["pedido", "aprobado"], name="payment_pedido_aprob_idx"),
+            # Admin: date_hierarchy / filtro por fecha
+            models.Index(fields=["creado"], name="payment_creado_idx"),
+            # Pagos pendientes de aprobación (parcial: es una fracción pequeña)
+            models.Index(
+                fields=["-creado"],
+                condition=models.Q(aprobado=False),
+                name="payment_pendientes_idx",
+            ),
+            # Sincronización incremental (sincronizacion.py)
+            models.Index(fields=["pedido", "actualizado", "id"], name="payment_pedido_sync_idx"),
+        ]
+
+
+class GastoBase(TimestampedModel):
     CATEGORIA_CHOICES = [
         ("PRODUCTO", "Producto"),
         ("ENVIO", "Envío"),
@@ -419,6 +514,26 @@ class Expense(TimestampedModel):
         ("OTRO", "Otro"),
     ]
 
+    categoria = models.CharField(
+        max_length=20, choices=CATEGORIA_CHOICES, verbose_name="Categoría"
+    )
+    monto = models.PositiveIntegerField("Monto")
+    descripcion = models.CharField("Descripción", max_length=255, blank=True)
+    moneda = models.CharField(
+        max_length=3,
+        choices=CURRENCY_CHOICES,
+        default="CRC",
+        verbose_name="Moneda",
+    )
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return f"Gasto {self.categoria} {self.monto} {self.moneda}"
+
+
+class Expense(GastoBase):
     pedido = models.ForeignKey(
         Order,
         on_delete=models.CASCADE,
@@ -434,20 +549,23 @@ class Expense(TimestampedModel):
         null=True,
         blank=True,
     )
-    categoria = models.CharField(
-        max_length=20, choices=CATEGORIA_CHOICES, verbose_name="Categoría"
-    )
-    monto = models.PositiveIntegerField("Monto")
-    descripcion = models.CharField("Descripción", max_length=255, blank=True)
-    moneda = models.CharField(
-        max_length=3,
-        choices=CURRENCY_CHOICES,
-        default="CRC",
-        verbose_name="Moneda",
-    )
 
-    def __str__(self):
-        return f"Gasto {self.categoria} {self.monto} {self.moneda}"
+    class Meta:
+        indexes = [
+            # Gastos por pedido del shopper
+            models.Index(fields=["shopper", "pedido"], name="expense_shopper_pedido_idx"),
+            # Admin: date_hierarchy / filtro por fecha
+            models.Index(fields=["creado"], name="expense_creado_idx"),
+            # Gastos generales (sin pedido): índice parcial
+            models.Index(
+                fields=["shopper", "-creado"],
+                condition=models.Q(pedido__isnull=True),
+                name="expense_generales_idx",
+            ),
+            # Sincronización incremental (sincronizacion.py)
+            models.Index(fields=["shopper", "actualizado", "id"], name="expense_shopper_sync_idx"),
+            models.Index(fields=["pedido", "actualizado", "id"], name="expense_pedido_sync_idx"),
+        ]
 
 
 class ShopperPhoto(models.Model):
@@ -469,10 +587,13 @@ class Review(TimestampedModel):
     - Comentario opcional
     - Vinculada a un pedido entregado
     """
+    # Sin FK en la BD: al archivar el pedido (ver archivo.py) la reseña se
+    # queda y order_id apunta al mismo id en PedidoArchivado.
     order = models.OneToOneField(
         Order,
         on_delete=models.CASCADE,
         related_name="review",
+        db_constraint=False,
     )
     shopper = models.ForeignKey(
         ShopperProfile,
@@ -490,10 +611,60 @@ class Review(TimestampedModel):
     )
     comment = models.TextField("Comentario", blank=True)
 
+    class Meta:
+        indexes = [
+            # Sincronización incremental (sincronizacion.py)
+            models.Index(fields=["customer", "actualizado", "id"], name="review_customer_sync_idx"),
+            models.Index(fields=["shopper", "actualizado", "id"], name="review_shopper_sync_idx"),
+        ]
+
     def __str__(self):
         return f"Review {self.rating}★ de {self.customer} a {self.shopper}"
 
 
+# =========================
+# Sincronización incremental: registro de borrados (ver sincronizacion.py)
+# =========================
+class Borrado(TimestampedModel):
+    """
+    Lápida de un objeto borrado (o que dejó de pertenecer a un shopper), para
+    que los clientes que sincronizan por `actualizado` se enteren. Sin FK en
+    la BD: se escriben mientras se borran los dueños en cascada.
+    """
+
+    modelo = models.CharField(max_length=20)
+    objeto_id = models.BigIntegerField()
+    customer = models.ForeignKey(
+        CustomerProfile,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+        related_name="+",
+        db_constraint=False,
+        db_index=False,  # cubierto por los índices de abajo
+    )
+    shopper = models.ForeignKey(
+        ShopperProfile,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+        related_name="+",
+        db_constraint=False,
+        db_index=False,  # cubierto por los índices de abajo
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["customer", "actualizado", "id"], name="borrado_customer_sync_idx"),
+            models.Index(fields=["shopper", "actualizado", "id"], name="borrado_shopper_sync_idx"),
+            # Purga de lápidas viejas
+            models.Index(fields=["actualizado"], name="borrado_actualizado_idx"),
+        ]
+
+    def __str__(self):
+        return f"Borrado {self.modelo} #{self.objeto_id}"
+
+
 # =========================
 # NUEVO: Carrusel dinámico (Admin -> Landing)
 # =========================
@@ -543,4 +714,84 @@ class HeroBackground(TimestampedModel):
         ordering = ("-creado",)
 
     def __str__(self):
-        return self.comentario.strip() or f"Hero background #{self.pk}"
\ No newline at end of file
+        return self.comentario.strip() or f"Hero background #{self.pk}"
+
+# =========================
+# Archivo de pedidos cerrados (ver archivo.py)
+# =========================
+# Mismos campos y mismos ids que en las tablas vivas. `actualizado` no es
+# auto_now: se conserva el valor original al archivar.
+class PedidoArchivado(PedidoBase):
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(
+        CustomerProfile,
+        on_delete=models.CASCADE,
+        related_name="pedidos_archivados",
+        verbose_name="Cliente",
+    )
+    shopper = models.ForeignKey(
+        ShopperProfile,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="pedidos_archivados",
+        verbose_name="Shopper asignado",
+    )
+    actualizado = models.DateTimeField()
+    archivado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "pedido archivado"
+        verbose_name_plural = "pedidos archivados"
+        indexes = [
+            models.Index(fields=["shopper", "-creado"], name="archivo_pedido_shopper_idx"),
+            models.Index(fields=["customer", "-creado"], name="archivo_pedido_customer_idx"),
+        ]
+
+
+class ArticuloArchivado(ArticuloBase):
+    id = models.BigIntegerField(primary_key=True)
+    pedido = models.ForeignKey(
+        PedidoArchivado, on_delete=models.CASCADE, related_name="articulos"
+    )
+    actualizado = models.DateTimeField()
+
+
+class PagoArchivado(PagoBase):
+    id = models.BigIntegerField(primary_key=True)
+    pedido = models.ForeignKey(
+        PedidoArchivado, on_delete=models.CASCADE, related_name="pagos"
+    )
+    actualizado = models.DateTimeField()
+
+
+class GastoArchivado(GastoBase):
+    id = models.BigIntegerField(primary_key=True)
+    # Los gastos generales (sin pedido) no se archivan
+    pedido = models.ForeignKey(
+        PedidoArchivado, on_delete=models.CASCADE, related_name="gastos"
+    )
+    shopper = models.ForeignKey(
+        ShopperProfile,
+        on_delete=models.CASCADE,
+        related_name="gastos_archivados",
+        null=True,
+        blank=True,
+    )
+    actualizado = models.DateTimeField()
+
+
+# =========================
+# Límites de tasa sin Redis (ver limites.py)
+# =========================
+# Los tiempos son epoch en segundos (float), igual que en los scripts de
+# Redis: la aritmética del balde se hace en el mismo UPDATE.
+class BaldeLimite(models.Model):
+    clave = models.CharField(max_length=200, primary_key=True)
+    fichas = models.FloatField()
+    ts = models.FloatField()
+    # Cuándo vuelve a estar lleno: desde ahí es igual a uno nuevo y se purga
+    lleno = models.FloatField(db_index=True)
+
+    def __str__(self):
+        return self.clave
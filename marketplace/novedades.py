@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:02:51 2026
+
+@author: jvz16
+"""
+
+# marketplace/novedades.py
+# Feed en vivo de pedidos abiertos (BUSCANDO_SHOPPER sin shopper) para el
+# panel del shopper, por Server-Sent Events (solo bajo ASGI).
+#
+# Un único Difusor por proceso (por event loop) consulta la BD cada
+# NOVEDADES_INTERVALO_SEGUNDOS mientras haya alguien conectado y reparte el
+# mismo evento ya serializado a la cola de cada conexión: con 1.000 shoppers
+# conectados sigue siendo una consulta por vuelta, no 1.000.
+#
+# Cada vuelta lee los pedidos con `actualizado` posterior al cursor (menos un
+# margen para commits que llegan tarde, índice order_actualizado_idx) y los
+# compara con el conjunto de ids abiertos que guarda en memoria:
+#
+#   nuevo      -> pasó a abierto (se manda la fila ya renderizada)
+#   tomado     -> lo tomó un shopper
+#   cancelado  -> lo canceló el cliente o el admin
+#   retirado   -> dejó de estar abierto por otra razón (o se borró)
+#
+# Como los eventos salen de comparar estados, releer el margen no duplica
+# nada. Cada NOVEDADES_RECONCILIAR vueltas se recarga el conjunto completo
+# (índice parcial order_abiertos_idx) para ver también los borrados.
+
+import asyncio
+import contextvars
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+PLANTILLA_FILA = "marketplace/novedades/pedido_abierto.html"
+
+# Commits más lentos que esto pueden perderse hasta la próxima reconciliación
+MARGEN = timedelta(seconds=5)
+
+# Eventos pendientes por conexión; si un cliente no los lee se lo corta (el
+# navegador reconecta solo)
+COLA_MAXIMA = 200
+
+
+def pedidos_abiertos():
+    return Order.objects.filter(shopper__isnull=True, estado="BUSCANDO_SHOPPER")
+
+
+def _evento(tipo, datos):
+    return f"event: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+def _motivo(estado, shopper_id):
+    if estado == "CANCELADO":
+        return "cancelado"
+    if shopper_id:
+        return "tomado"
+    return "retirado"
+
+
+class Estado:
+    """
+    Parte síncrona (BD): corre en un hilo, una vuelta a la vez.
+    """
+
+    def __init__(self):
+        self.abiertos = None
+        self.cursor = None
+        self.vueltas = 0
+
+    def _nuevos(self, ids):
+        pedidos = (
+            pedidos_abiertos()
+            .filter(pk__in=ids)
+            .select_related("customer__user")
+            .order_by("creado", "pk")
+        )
+        return [
+            _evento(
+                "nuevo",
+                {
+                    "id": p.pk,
+                    "abiertos": len(self.abiertos),
+                    "html": render_to_string(PLANTILLA_FILA, {"pedido": p}),
+                },
+            )
+            for p in pedidos
+        ]
+
+    def _fuera(self, pk, motivo):
+        self.abiertos.discard(pk)
+        return _evento(motivo, {"id": pk, "abiertos": len(self.abiertos)})
+
+    def revisar(self):
+        """
+        Una vuelta: devuelve la lista de eventos (texto SSE) a repartir.
+        """
+        close_old_connections()
+        if self.abiertos is None or self.vueltas % settings.NOVEDADES_RECONCILIAR == 0:
+            return self._reconciliar()
+        self.vueltas += 1
+
+        cambios = list(
+            Order.objects.filter(actualizado__gt=self.cursor - MARGEN)
+            .order_by("actualizado", "pk")
+            .values_list("pk", "estado", "shopper_id", "actualizado")
+        )
+        if cambios:
+            self.cursor = max(self.cursor, cambios[-1][3])
+
+        eventos, entran = [], []
+        for pk, estado, shopper_id, _ in cambios:
+            abierto = estado == "BUSCANDO_SHOPPER" and shopper_id is None
+            if abierto and pk not in self.abiertos:
+                self.abiertos.add(pk)
+                entran.append(pk)
+            elif not abierto and pk in self.abiertos:
+                eventos.append(self._fuera(pk, _motivo(estado, shopper_id)))
+        if entran:
+            eventos += self._nuevos(entran)
+        return eventos
+
+    def _reconciliar(self):
+        ahora = timezone.now()
+        actuales = set(pedidos_abiertos().values_list("pk", flat=True))
+        anteriores, self.abiertos = self.abiertos, actuales
+        self.vueltas = 1
+        if anteriores is None:
+            self.cursor = ahora
+            return []
+        eventos = [_evento("retirado", {"id": pk, "abiertos": len(actuales)}) for pk in anteriores - actuales]
+        entran = actuales - anteriores
+        if entran:
+            eventos += self._nuevos(entran)
+        return eventos
+
+
+class Difusor:
+    """
+    Un consultor compartido + una cola por conexión.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.conexiones = set()
+        self.tarea = None
+
+    def suscribir(self):
+        cola = asyncio.Queue(maxsize=COLA_MAXIMA)
+        self.conexiones.add(cola)
+        if self.tarea is None or self.tarea.done():
+            # Contexto vacío: la tarea vive más que el request que la arranca
+            # (no hereda su medición de consultas, ver instrumentacion.py)
+            self.tarea = contextvars.Context().run(self.loop.create_task, self._bucle())
+        return cola
+
+    def desuscribir(self, cola):
+        self.conexiones.discard(cola)
+
+    def _repartir(self, eventos):
+        for cola in list(self.conexiones):
+            try:
+                for evento in eventos:
+                    cola.put_nowait(evento)
+            except asyncio.QueueFull:
+                # Cliente que no lee: se vacía su cola y se le cierra el stream
+                self.conexiones.discard(cola)
+                while not cola.empty():
+                    cola.get_nowait()
+                cola.put_nowait(None)
+
+    async def _bucle(self):
+        # Un hilo propio: una sola conexión a BD para el feed, fuera de los
+        # hilos de los requests
+        hilo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="novedades")
+        estado = Estado()
+        try:
+            while self.conexiones:
+                try:
+                    eventos = await self.loop.run_in_executor(hilo, estado.revisar)
+                except Exception:
+                    logger.exception("Feed de pedidos abiertos: falló la consulta")
+                    estado.vueltas = 0  # reconciliar en la próxima vuelta
+                    eventos = []
+                if eventos:
+                    self._repartir(eventos)
+                await asyncio.sleep(settings.NOVEDADES_INTERVALO_SEGUNDOS)
+        finally:
+            # Sin conexiones la tarea termina; la próxima conexión arranca otra
+            # desde cero (el conjunto en memoria ya no se mantiene)
+            hilo.submit(connections.close_all)
+            hilo.shutdown(wait=False)
+
+
+_difusor = None
+
+
+def difusor():
+    global _difusor
+    if _difusor is None or _difusor.loop is not asyncio.get_running_loop():
+        _difusor = Difusor()
+    return _difusor
+
+
+async def transmitir():
+    """
+    Cuerpo de la respuesta text/event-stream de una conexión.
+    """
+    d = difusor()
+    cola = d.suscribir()
+    latido = settings.NOVEDADES_LATIDO_SEGUNDOS
+    try:
+        yield f"retry: {int(settings.NOVEDADES_INTERVALO_SEGUNDOS * 1000) * 2}\n\n"
+        while True:
+            try:
+                evento = await asyncio.wait_for(cola.get(), latido)
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene viva la conexión tras proxies
+                yield ": latido\n\n"
+                continue
+            if evento is None:
+                return
+            yield evento
+    finally:
+        d.desuscribir(cola)
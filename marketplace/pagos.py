@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:31:07 2026
+
+@author: jvz16
+"""
+
+# marketplace/pagos.py
+# Aprobación en lote de pagos reportados por clientes y conciliación contra
+# el extracto del banco (CSV).
+#
+# Aprobar / rechazar N pagos es UN statement (UPDATE / DELETE con el filtro
+# de dueño incluido) más un UPDATE de `actualizado` en los pedidos tocados,
+# todo en la misma transacción. Los totales del pedido (total_pagos, saldo)
+# se calculan al vuelo, así que no hay montos guardados que ajustar.
+
+import csv
+import io
+import re
+import unicodedata
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, Payment
+from .reportes import invalidar_pnl
+
+# Un pago y una línea del banco se consideran el mismo si el monto es igual y
+# las fechas no se separan más que esto (SINPE acredita el mismo día, pero el
+# cliente a veces reporta al día siguiente).
+TOLERANCIA_DIAS = 3
+
+_ALIAS_COLUMNAS = {
+    "fecha": ("fecha", "fecha contable", "fecha de movimiento", "date"),
+    "monto": ("monto", "credito", "creditos", "importe", "amount", "valor"),
+    "descripcion": ("descripcion", "concepto", "detalle", "nota", "referencia", "description"),
+}
+
+_FORMATOS_FECHA = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%y", "%Y/%m/%d")
+
+
+# =========================
+# Aprobar / rechazar en lote
+# =========================
+def _pendientes_de(shopper, ids):
+    return Payment.objects.filter(pk__in=ids, pedido__shopper=shopper, aprobado=False)
+
+
+@transaction.atomic
+def aprobar_pagos(shopper, ids):
+    """
+    Aprueba los pagos pendientes `ids` de pedidos del shopper. Devuelve cuántos.
+    Ids ajenos o ya aprobados se ignoran.
+    """
+    ahora = timezone.now()
+    qs = _pendientes_de(shopper, ids)
+    pedidos = list(qs.values_list("pedido_id", flat=True).distinct())
+    n = qs.update(aprobado=True, actualizado=ahora)
+    if n:
+        Order.objects.filter(pk__in=pedidos).update(actualizado=ahora)
+        transaction.on_commit(lambda: invalidar_pnl(shopper.pk))
+    return n
+
+
+@transaction.atomic
+def rechazar_pagos(shopper, ids):
+    """
+    Rechaza (borra) reportes pendientes: el cliente puede volver a reportarlo.
+    """
+    qs = _pendientes_de(shopper, ids)
+    pedidos = list(qs.values_list("pedido_id", flat=True).distinct())
+    n, _ = qs.delete()
+    if n:
+        Order.objects.filter(pk__in=pedidos).update(actualizado=timezone.now())
+        transaction.on_commit(lambda: invalidar_pnl(shopper.pk))
+    return n
+
+
+# =========================
+# Conciliación con extracto bancario
+# =========================
+def _normalizar(texto):
+    texto = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode()
+    return texto.strip().lower()
+
+
+def _palabras(texto):
+    return {p for p in re.findall(r"[a-z0-9]+", _normalizar(texto)) if len(p) > 2 or p.isdigit()}
+
+
+def parsear_monto(valor):
+    """
+    '₡12.500,00' / '12,500.00' / '12500' -> 12500 (entero, como Payment.monto).
+    """
+    limpio = re.sub(r"[^\d,.\-]", "", str(valor or ""))
+    if not limpio or limpio == "-":
+        return None
+    if "," in limpio and "." in limpio:
+        decimal = "," if limpio.rfind(",") > limpio.rfind(".") else "."
+    elif limpio.count(",") == 1 and len(limpio.split(",")[1]) <= 2:
+        decimal = ","
+    elif limpio.count(".") == 1 and len(limpio.split(".")[1]) <= 2:
+        decimal = "."
+    else:
+        decimal = None
+    miles = {",": ".", ".": ","}.get(decimal, "")
+    if decimal:
+        limpio = limpio.replace(miles, "").replace(decimal, ".")
+    else:
+        limpio = limpio.replace(",", "").replace(".", "")
+    try:
+        return int(round(float(limpio)))
+    except ValueError:
+        return None
+
+
+def parsear_fecha(valor):
+    texto = str(valor or "").strip()[:10]
+    for formato in _FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def leer_extracto(archivo):
+    """
+    Lee un CSV de banco (coma o punto y coma, con encabezado) y devuelve
+    [{"linea", "fecha", "monto", "descripcion"}]. Solo créditos (monto > 0).
+    """
+    crudo = archivo.read()
+    if isinstance(crudo, bytes):
+        try:
+            crudo = crudo.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            crudo = crudo.decode("latin-1")
+    try:
+        dialecto = csv.Sniffer().sniff(crudo[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.reader(io.StringIO(crudo), dialecto)
+
+    encabezado = [_normalizar(c) for c in next(lector, [])]
+    columnas = {}
+    for campo, alias in _ALIAS_COLUMNAS.items():
+        for i, nombre in enumerate(encabezado):
+            if nombre in alias:
+                columnas[campo] = i
+                break
+    if "fecha" not in columnas or "monto" not in columnas:
+        raise ValueError("El extracto debe tener columnas de fecha y monto.")
+
+    def _celda(fila, campo):
+        i = columnas.get(campo)
+        return fila[i] if i is not None and i < len(fila) else ""
+
+    lineas = []
+    for numero, fila in enumerate(lector, start=2):
+        if not any(fila):
+            continue
+        monto = parsear_monto(_celda(fila, "monto"))
+        fecha = parsear_fecha(_celda(fila, "fecha"))
+        if not monto or monto <= 0 or fecha is None:
+            continue
+        lineas.append({"linea": numero, "fecha": fecha, "monto": monto, "descripcion": _celda(fila, "descripcion")})
+    return lineas
+
+
+def conciliar(shopper, lineas, tolerancia_dias=TOLERANCIA_DIAS):
+    """
+    Empareja líneas del extracto con pagos pendientes del shopper en una sola
+    pasada: los pendientes se indexan por monto (una consulta) y cada línea
+    solo mira los de su mismo monto. Entre varios candidatos gana el que más
+    coincide en la nota (o menciona el #pedido) y, a igualdad, el de fecha
+    más cercana. Cada pago se usa una vez.
+
+    Devuelve (coincidencias, lineas_sin_pago, pagos_sin_linea).
+    """
+    pendientes = list(
+        Payment.objects.filter(pedido__shopper=shopper, aprobado=False)
+        .select_related("pedido", "pedido__customer__user")
+        .order_by("creado")
+    )
+    por_monto = {}
+    for pago in pendientes:
+        por_monto.setdefault(pago.monto, []).append(pago)
+
+    coincidencias = []
+    sin_pago = []
+    for linea in lineas:
+        candidatos = por_monto.get(linea["monto"], [])
+        palabras_linea = _palabras(linea["descripcion"])
+        mejor = None
+        mejor_puntaje = None
+        for pago in candidatos:
+            dias = abs((linea["fecha"] - timezone.localdate(pago.creado)).days)
+            if dias > tolerancia_dias:
+                continue
+            nota = len(palabras_linea & _palabras(pago.nota))
+            if str(pago.pedido_id) in palabras_linea:
+                nota += 1
+            puntaje = (nota, -dias)
+            if mejor_puntaje is None or puntaje > mejor_puntaje:
+                mejor, mejor_puntaje = pago, puntaje
+        if mejor is None:
+            sin_pago.append(linea)
+            continue
+        candidatos.remove(mejor)
+        coincidencias.append({"linea": linea, "pago": mejor, "coincide_nota": mejor_puntaje[0] > 0})
+
+    usados = {c["pago"].pk for c in coincidencias}
+    sin_linea = [p for p in pendientes if p.pk not in usados]
+    return coincidencias, sin_pago, sin_linea
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 22:10:36 2026
+
+@author: jvz16
+"""
+
+# marketplace/particiones.py
+# Particionado mensual por rango de `creado` para Payment y Expense, solo en
+# Postgres (en SQLite las tablas quedan como siempre).
+#
+# La conversión la hace la migración 0022 (con su propia copia del DDL): la
+# tabla existente queda como la partición del mes en curso y lo de meses
+# anteriores se reparte en una partición por mes. Cada mes tiene su
+# partición <tabla>_pYYYYMM y una partición DEFAULT atrapa lo que caiga fuera
+# (si el cron se atrasa). Acá queda el mantenimiento.
+#
+# Postgres exige que la PK incluya la columna de partición: en la BD la PK
+# pasa a ser (id, creado). Para Django `id` sigue siendo la PK (sale de una
+# secuencia, así que sigue siendo única) y nada apunta con FK a estas
+# tablas, así que el ORM (pedido.pagos, pedido.gastos, update/delete por id)
+# funciona igual.
+
+import re
+from datetime import date
+
+from django.db import connection
+
+TABLAS = ("marketplace_payment", "marketplace_expense")
+
+
+def disponible(conexion=connection):
+    return conexion.vendor == "postgresql"
+
+
+def _mes_siguiente(mes):
+    return date(mes.year + (mes.month == 12), mes.month % 12 + 1, 1)
+
+
+def _nombre(tabla, mes):
+    return f"{tabla}_p{mes:%Y%m}"
+
+
+def _q(nombre):
+    return connection.ops.quote_name(nombre)
+
+
+# =========================
+# Mantenimiento (manage.py particiones)
+# =========================
+def listar(tabla, cursor=None):
+    """
+    [(nombre, rango, filas_estimadas)] de las particiones de `tabla`.
+    """
+    cursor = cursor or connection.cursor()
+    cursor.execute(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+        [tabla],
+    )
+    return cursor.fetchall()
+
+
+def crear_particiones(tabla, meses, desde=None, cursor=None):
+    """
+    Crea las particiones mensuales que falten desde `desde` (por defecto el
+    mes actual) hasta `meses` meses adelante. Devuelve las creadas.
+    """
+    cursor = cursor or connection.cursor()
+    existentes = {nombre for nombre, _, _ in listar(tabla, cursor)}
+    mes = (desde or date.today()).replace(day=1)
+    creadas = []
+    for _ in range(meses + 1):
+        nombre = _nombre(tabla, mes)
+        siguiente = _mes_siguiente(mes)
+        if nombre not in existentes:
+            _crear_particion(cursor, tabla, nombre, mes, siguiente)
+            creadas.append(nombre)
+        mes = siguiente
+    return creadas
+
+
+def _crear_particion(cursor, tabla, nombre, desde, hasta):
+    default = f"{tabla}_default"
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {_q(default)} WHERE creado >= %s AND creado < %s)",
+        [desde, hasta],
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(
+            f"CREATE TABLE {_q(nombre)} PARTITION OF {_q(tabla)} FOR VALUES FROM (%s) TO (%s)",
+            [desde, hasta],
+        )
+        return
+    # Filas que cayeron en DEFAULT (cron atrasado): se mueven a la partición
+    # nueva antes de adjuntarla, si no Postgres rechaza el rango.
+    cursor.execute(f"CREATE TABLE {_q(nombre)} (LIKE {_q(tabla)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cursor.execute(
+        f"WITH movidas AS (DELETE FROM {_q(default)} WHERE creado >= %s AND creado < %s RETURNING *) "
+        f"INSERT INTO {_q(nombre)} SELECT * FROM movidas",
+        [desde, hasta],
+    )
+    cursor.execute(
+        f"ALTER TABLE {_q(tabla)} ATTACH PARTITION {_q(nombre)} FOR VALUES FROM (%s) TO (%s)",
+        [desde, hasta],
+    )
+
+
+def desprender_anteriores(tabla, mes_limite, cursor=None):
+    """
+    Desprende (DETACH) las particiones que terminan en o antes de
+    `mes_limite`. Las tablas quedan en la BD, fuera del alcance del ORM, para
+    respaldarlas o volver a adjuntarlas. Devuelve las desprendidas.
+    """
+    cursor = cursor or connection.cursor()
+    desprendidas = []
+    for nombre, rango, _ in listar(tabla, cursor):
+        if rango == "DEFAULT":
+            continue
+        hasta = re.findall(r"'([\d-]+)", rango)[-1][:10]
+        if date.fromisoformat(hasta) <= mes_limite:
+            cursor.execute(f"ALTER TABLE {_q(tabla)} DETACH PARTITION {_q(nombre)}")
+            desprendidas.append(nombre)
+    return desprendidas
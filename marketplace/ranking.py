@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:47:09 2026
+
+@author: jvz16
+"""
+
+# marketplace/ranking.py
+# Puntaje para ordenar shoppers (ShopperProfile.puntaje_ranking).
+#
+# Promedio bayesiano con peso por antigüedad:
+#
+#     puntaje = (C * m + Σ w_i * r_i) / (C + Σ w_i),   w_i = 0.5 ** (días_i / H)
+#
+#   m = promedio de la plataforma, C = RANKING_PESO_PRIOR (reseñas
+#   "virtuales" con nota m), H = RANKING_VIDA_MEDIA_DIAS.
+#
+# Con pocas reseñas el puntaje queda cerca de m (una sola de 5★ no le gana a
+# 200 de 4.9) y las reseñas viejas pesan menos que las recientes. Se guarda
+# en una columna indexada: al crear una reseña se recalcula solo ese shopper
+# y `manage.py recalcular_ranking` (periódico) recalcula todos, lo que además
+# aplica el paso del tiempo a los pesos.
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg
+from django.utils import timezone
+
+from .models import Review, ShopperProfile
+
+CACHE_MEDIA = "ranking_media_plataforma"
+
+
+def calcular_puntaje(resenas, media, ahora, peso_prior, vida_media_dias):
+    """
+    resenas: iterable de (rating, creado). Función pura (la migración 0020
+    tiene su propia copia).
+    """
+    suma = peso_prior * media
+    pesos = peso_prior
+    for rating, creado in resenas:
+        dias = max((ahora - creado).total_seconds() / 86400, 0)
+        w = 0.5 ** (dias / vida_media_dias)
+        suma += w * rating
+        pesos += w
+    return round(suma / pesos, 4) if pesos else 0.0
+
+
+def media_plataforma(refrescar=False):
+    media = None if refrescar else cache.get(CACHE_MEDIA)
+    if media is None:
+        media = float(Review.objects.aggregate(avg=Avg("rating"))["avg"] or 0)
+        cache.set(CACHE_MEDIA, media, None)
+    return media
+
+
+def _puntaje(resenas, media, ahora):
+    return calcular_puntaje(
+        resenas,
+        media,
+        ahora,
+        settings.RANKING_PESO_PRIOR,
+        settings.RANKING_VIDA_MEDIA_DIAS,
+    )
+
+
+def actualizar_shopper(shopper):
+    """
+    Tras una reseña nueva: recalcula calificación (promedio simple, la que se
+    muestra) y puntaje de este shopper. Una consulta de lectura + un UPDATE.
+    """
+    resenas = list(Review.objects.filter(shopper=shopper).values_list("rating", "creado"))
+    media = media_plataforma(refrescar=True)
+    shopper.calificacion = round(sum(r for r, _ in resenas) / len(resenas), 2) if resenas else 0
+    shopper.puntaje_ranking = _puntaje(resenas, media, timezone.now())
+    shopper.save(update_fields=["calificacion", "puntaje_ranking", "actualizado"])
+
+
+def recalcular_todos(lote=1000):
+    """
+    Recalcula el puntaje de todos los shoppers. Devuelve cuántos cambiaron.
+    Solo escribe los que cambian (bulk_update por lotes).
+    """
+    ahora = timezone.now()
+    media = media_plataforma(refrescar=True)
+    por_shopper = {}
+    for shopper_id, rating, creado in Review.objects.values_list("shopper_id", "rating", "creado").iterator():
+        por_shopper.setdefault(shopper_id, []).append((rating, creado))
+
+    cambiados = []
+    for shopper in ShopperProfile.objects.only("pk", "puntaje_ranking").iterator():
+        nuevo = _puntaje(por_shopper.get(shopper.pk, ()), media, ahora)
+        if shopper.puntaje_ranking != nuevo:
+            shopper.puntaje_ranking = nuevo
+            # bulk_update no dispara auto_now. El puntaje decide el orden de
+            # home y buscar_shoppers: sin esto los validadores (http_cache.py)
+            # no cambian y se seguiría sirviendo el orden viejo con 304
+            shopper.actualizado = ahora
+            cambiados.append(shopper)
+    ShopperProfile.objects.bulk_update(cambiados, ["puntaje_ranking", "actualizado"], batch_size=lote)
+    return len(cambiados)
+
+
+def _al_crear_shopper(sender, instance, **kwargs):
+    # Sin reseñas el puntaje es la media de la plataforma (no 0: no se hunde
+    # debajo de shoppers con reseñas malas).
+    if instance._state.adding and not instance.puntaje_ranking:
+        instance.puntaje_ranking = round(media_plataforma(), 4)
+
+
+def conectar_senales():
+    from django.db.models.signals import pre_save
+
+    pre_save.connect(_al_crear_shopper, sender=ShopperProfile, dispatch_uid="ranking_shopper_nuevo")
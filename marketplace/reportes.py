@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:12:36 2026
+
+@author: jvz16
+"""
+
+# marketplace/reportes.py
+# Estado de resultados (P&L) mensual por shopper.
+#
+# Todo sale de UNA consulta: SELECT agrupados por mes/moneda unidos con
+# UNION ALL (ingresos aprobados, gastos por tipo y categoría, pedidos
+# entregados; de las tablas vivas y del archivo). El resultado se guarda en
+# cache por shopper y se invalida cuando cambian sus pagos, gastos o pedidos
+# (señales + llamadas explícitas donde se escribe con update()/bulk_update(),
+# que no disparan señales).
+# Solo con cache compartido (Redis): con LocMem cada worker tendría su copia
+# y la invalidación llegaría solo al que atendió la escritura, así que ahí
+# se calcula en vivo en cada request.
+#
+# Notas:
+# - Los pagos no tienen moneda propia: se usa la del pedido.
+# - Un pedido ENTREGADO cuenta en el mes de `entregado_en`, que se fija al
+#   pasar a ese estado (señal pre_save y acción del admin). Los que se
+#   escriben sin señales (bulk_create) caen en el de `actualizado`.
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Case, CharField, Count, F, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import Expense, GastoArchivado, Order, PagoArchivado, Payment, PedidoArchivado
+
+INGRESO = "INGRESO"
+GASTO_PEDIDO = "GASTO_PEDIDO"
+GASTO_GENERAL = "GASTO_GENERAL"
+ENTREGADOS = "ENTREGADOS"
+
+
+def _clave(shopper_id):
+    return f"reporte_pnl:{shopper_id}"
+
+
+def _cache_compartido():
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def invalidar_pnl(*shopper_ids):
+    ids = {i for i in shopper_ids if i}
+    if ids:
+        cache.delete_many([_clave(i) for i in ids])
+
+
+def _consultas(shopper_id, pedido, pago, gasto):
+    texto = CharField()
+    ingresos = (
+        pago.objects.filter(pedido__shopper_id=shopper_id, aprobado=True)
+        .annotate(
+            mes=TruncMonth("creado"),
+            mon=F("pedido__moneda"),
+            tipo=Value(INGRESO, output_field=texto),
+            cat=Value("", output_field=texto),
+        )
+        .values("mes", "mon", "tipo", "cat")
+        .annotate(total=Sum("monto"), cantidad=Count("id"))
+        .order_by()
+    )
+    gastos = (
+        gasto.objects.filter(shopper_id=shopper_id)
+        .annotate(
+            mes=TruncMonth("creado"),
+            mon=F("moneda"),
+            tipo=Case(
+                When(pedido__isnull=True, then=Value(GASTO_GENERAL)),
+                default=Value(GASTO_PEDIDO),
+                output_field=texto,
+            ),
+            cat=F("categoria"),
+        )
+        .values("mes", "mon", "tipo", "cat")
+        .annotate(total=Sum("monto"), cantidad=Count("id"))
+        .order_by()
+    )
+    entregados = (
+        pedido.objects.filter(shopper_id=shopper_id, estado="ENTREGADO")
+        .annotate(
+            mes=TruncMonth(Coalesce("entregado_en", "actualizado")),
+            mon=F("moneda"),
+            tipo=Value(ENTREGADOS, output_field=texto),
+            cat=Value("", output_field=texto),
+        )
+        .values("mes", "mon", "tipo", "cat")
+        .annotate(total=Count("id"), cantidad=Count("id"))
+        .order_by()
+    )
+    return [ingresos, gastos, entregados]
+
+
+def _filas_agrupadas(shopper_id):
+    # Tablas vivas + archivo (pedidos cerrados viejos, ver archivo.py)
+    primera, *resto = _consultas(shopper_id, Order, Payment, Expense) + _consultas(
+        shopper_id, PedidoArchivado, PagoArchivado, GastoArchivado
+    )
+    return list(primera.union(*resto, all=True))
+
+
+def _armar(filas):
+    """
+    Filas agrupadas -> [{mes, moneda, ingresos, gastos_pedido{cat: monto},
+    gastos_pedidos, gastos_generales, neto, entregados, margen_por_pedido,
+    margen_pct}], del mes más reciente al más viejo.
+    """
+    meses = {}
+    for fila in filas:
+        mes = timezone.localtime(fila["mes"]).date() if timezone.is_aware(fila["mes"]) else fila["mes"].date()
+        clave = (mes, fila["mon"])
+        m = meses.setdefault(
+            clave,
+            {
+                "mes": mes,
+                "moneda": fila["mon"],
+                "ingresos": 0,
+                "gastos_pedido": {},
+                "gastos_pedidos": 0,
+                "gastos_generales": 0,
+                "entregados": 0,
+            },
+        )
+        total = int(fila["total"] or 0)
+        if fila["tipo"] == INGRESO:
+            m["ingresos"] += total
+        elif fila["tipo"] == GASTO_PEDIDO:
+            m["gastos_pedido"][fila["cat"]] = m["gastos_pedido"].get(fila["cat"], 0) + total
+            m["gastos_pedidos"] += total
+        elif fila["tipo"] == GASTO_GENERAL:
+            m["gastos_generales"] += total
+        elif fila["tipo"] == ENTREGADOS:
+            m["entregados"] += total
+
+    resultado = []
+    for (mes, moneda), m in sorted(meses.items(), key=lambda x: (x[0][0], x[0][1]), reverse=True):
+        m["neto"] = m["ingresos"] - m["gastos_pedidos"] - m["gastos_generales"]
+        # Margen de la operación de pedidos (sin gastos generales) por pedido entregado
+        m["margen_por_pedido"] = (
+            round((m["ingresos"] - m["gastos_pedidos"]) / m["entregados"]) if m["entregados"] else None
+        )
+        m["margen_pct"] = round(m["neto"] * 100 / m["ingresos"], 1) if m["ingresos"] else None
+        resultado.append(m)
+    return resultado
+
+
+def pnl_mensual(shopper_id, moneda=None):
+    """
+    P&L por mes (y moneda) del shopper. `moneda` filtra en memoria sobre el
+    resultado cacheado, así todas las variantes comparten una sola entrada.
+    """
+    if not _cache_compartido():
+        meses = _armar(_filas_agrupadas(shopper_id))
+    else:
+        clave = _clave(shopper_id)
+        meses = cache.get(clave)
+        if meses is None:
+            meses = _armar(_filas_agrupadas(shopper_id))
+            cache.set(clave, meses, settings.REPORTES_CACHE_SEGUNDOS)
+    if moneda:
+        return [m for m in meses if m["moneda"] == moneda]
+    return meses
+
+
+# =========================
+# Invalidación por señales (save()/delete() de a uno)
+# =========================
+def _al_cambiar_pago(sender, instance, **kwargs):
+    if Payment.pedido.is_cached(instance):
+        shopper_id = instance.pedido.shopper_id
+    else:
+        shopper_id = Order.objects.filter(pk=instance.pedido_id).values_list("shopper_id", flat=True).first()
+    invalidar_pnl(shopper_id)
+
+
+def _al_cambiar_gasto(sender, instance, **kwargs):
+    invalidar_pnl(instance.shopper_id)
+
+
+def _al_cambiar_pedido(sender, instance, **kwargs):
+    invalidar_pnl(instance.shopper_id)
+
+
+def _al_guardar_pedido(sender, instance, **kwargs):
+    # Fecha de entrega: al pasar a ENTREGADO; si vuelve atrás se borra y la
+    # próxima entrega toma la fecha nueva
+    if instance.estado == "ENTREGADO":
+        if instance.entregado_en is None:
+            instance.entregado_en = timezone.now()
+    else:
+        instance.entregado_en = None
+
+
+def conectar_senales():
+    from django.db.models.signals import post_delete, post_save, pre_save
+
+    pre_save.connect(_al_guardar_pedido, sender=Order, dispatch_uid="pnl_entregado_en")
+
+    for senal in (post_save, post_delete):
+        senal.connect(_al_cambiar_pago, sender=Payment, dispatch_uid=f"pnl_pago_{senal is post_save}")
+        senal.connect(_al_cambiar_gasto, sender=Expense, dispatch_uid=f"pnl_gasto_{senal is post_save}")
+        senal.connect(_al_cambiar_pedido, sender=Order, dispatch_uid=f"pnl_pedido_{senal is post_save}")
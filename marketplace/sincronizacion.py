@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:41:07 2026
+
+@author: jvz16
+"""
+
+# marketplace/sincronizacion.py
+# Sincronización incremental para la app móvil (GET /api/v1/sync/).
+#
+# El cliente manda el cursor que recibió la última vez y recibe solo lo que
+# cambió desde entonces (por `actualizado`) en sus pedidos, artículos, pagos,
+# gastos, viajes y reseñas, más los ids borrados (modelo Borrado). Sin
+# cursor recibe todo, por páginas. Protocolo:
+#
+#   1. Aplicar `borrados` (un pedido borrado se lleva sus hijos) y después
+#      `cambios` (upsert por id).
+#   2. Guardar `cursor`; si `mas` es true, volver a pedir enseguida.
+#   3. Con 410 (`reiniciar`), borrar lo local y sincronizar sin cursor.
+#
+# El cursor es opaco: por cada colección guarda la posición (actualizado, id)
+# de la última fila enviada, así que cada página es una consulta por
+# colección sobre los índices (dueño, actualizado, id). Las filas de los
+# últimos SYNC_MARGEN_SEGUNDOS no se envían todavía: una transacción que
+# guardó antes pero confirmó después no puede quedar detrás del cursor.
+
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Borrado, CustomerProfile, Expense, Order, OrderItem, Payment, Review, ShopperProfile, Trip
+
+VERSION = 1
+
+ROLES = ("cliente", "shopper")
+
+# clave -> (modelo, filtro de dueño por rol)
+COLECCIONES = {
+    "pedidos": (Order, {"cliente": "customer", "shopper": "shopper"}),
+    "articulos": (OrderItem, {"cliente": "pedido__customer", "shopper": "pedido__shopper"}),
+    "pagos": (Payment, {"cliente": "pedido__customer", "shopper": "pedido__shopper"}),
+    "gastos": (Expense, {"cliente": "pedido__customer", "shopper": "shopper"}),
+    "viajes": (Trip, {"shopper": "shopper"}),
+    "resenas": (Review, {"cliente": "customer", "shopper": "shopper"}),
+}
+
+# Modelo -> clave de colección (para las lápidas)
+CLAVES = {modelo: clave for clave, (modelo, _) in COLECCIONES.items()}
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+class CursorVencido(Exception):
+    """
+    El cursor es más viejo que las lápidas que se guardan: hay que empezar de
+    cero (ver purgar_borrados).
+    """
+
+
+def _campos(modelo):
+    return [f.attname for f in modelo._meta.concrete_fields]
+
+
+def codificar_cursor(rol, marcas):
+    datos = {
+        "v": VERSION,
+        "rol": rol,
+        "m": {clave: [ts.isoformat(), pk] for clave, (ts, pk) in marcas.items()},
+    }
+    return base64.urlsafe_b64encode(json.dumps(datos, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor, rol):
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        version, rol_cursor = datos["v"], datos["rol"]
+        marcas = {clave: (datetime.fromisoformat(ts), int(pk)) for clave, (ts, pk) in datos["m"].items()}
+        # Los cursores salen con zona horaria: uno naive no se puede comparar
+        if any(timezone.is_naive(ts) for ts, _ in marcas.values()):
+            raise ValueError("marca sin zona horaria")
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError) as e:
+        raise CursorInvalido("Cursor ilegible.") from e
+    if version != VERSION or rol_cursor != rol:
+        raise CursorInvalido("El cursor es de otra versión o de otro rol.")
+    return marcas
+
+
+def _despues(qs, marca):
+    if marca is None:
+        return qs
+    ts, pk = marca
+    return qs.filter(Q(actualizado__gt=ts) | Q(actualizado=ts, pk__gt=pk))
+
+
+def _pagina(qs, marca, horizonte, limite, campos):
+    qs = _despues(qs.filter(actualizado__lte=horizonte), marca).order_by("actualizado", "pk")
+    filas = list(qs.values(*campos)[: limite + 1])
+    mas = len(filas) > limite
+    filas = filas[:limite]
+    if filas:
+        marca = (filas[-1]["actualizado"], filas[-1]["id"])
+    return filas, marca, mas
+
+
+def rol_de(user, solicitado=None):
+    """
+    (rol, perfil) del usuario: el rol pedido o el primero que tenga.
+    """
+    modelos = {"cliente": CustomerProfile, "shopper": ShopperProfile}
+    for rol in [solicitado] if solicitado else ROLES:
+        perfil = modelos[rol].objects.filter(user=user).first()
+        if perfil is not None or solicitado:
+            return rol, perfil
+    return None, None
+
+
+def sincronizar(rol, perfil, cursor=None, limite=None):
+    """
+    Una página de cambios para el dueño `perfil` (CustomerProfile o
+    ShopperProfile según `rol`). Lanza CursorInvalido / CursorVencido.
+    """
+    limite = limite or settings.SYNC_LIMITE
+    ahora = timezone.now()
+    horizonte = ahora - timedelta(seconds=settings.SYNC_MARGEN_SEGUNDOS)
+    dueno = "customer" if rol == "cliente" else "shopper"
+
+    if cursor:
+        marcas = decodificar_cursor(cursor, rol)
+        vencido = ahora - timedelta(days=settings.SYNC_BORRADOS_DIAS)
+        marca_borrados = marcas.get("borrados")
+        if marca_borrados is None or marca_borrados[0] < vencido:
+            raise CursorVencido()
+    else:
+        # Sincronización completa: no hay nada local que borrar, solo lo
+        # que se borre desde ahora mientras se bajan las páginas
+        marcas = {"borrados": (horizonte, 0)}
+
+    cambios, mas = {}, False
+    for clave, (modelo, filtros) in COLECCIONES.items():
+        if rol not in filtros:
+            continue
+        qs = modelo.objects.filter(**{filtros[rol]: perfil})
+        cambios[clave], marca, hay_mas = _pagina(qs, marcas.get(clave), horizonte, limite, _campos(modelo))
+        if marca is not None:
+            marcas[clave] = marca
+        mas = mas or hay_mas
+
+    lapidas, marcas["borrados"], hay_mas = _pagina(
+        Borrado.objects.filter(**{dueno: perfil}),
+        marcas["borrados"],
+        horizonte,
+        limite,
+        ["id", "modelo", "objeto_id", "actualizado"],
+    )
+    if not hay_mas:
+        # Ya se enviaron todas hasta el horizonte: el cursor avanza aunque no
+        # haya lápidas, así no vence un cliente que sincroniza seguido
+        marcas["borrados"] = max(marcas["borrados"], (horizonte, 0))
+    borrados = {}
+    for lapida in lapidas:
+        borrados.setdefault(lapida["modelo"], []).append(lapida["objeto_id"])
+
+    return {
+        "version": VERSION,
+        "rol": rol,
+        "cursor": codificar_cursor(rol, marcas),
+        "mas": mas or hay_mas,
+        "cambios": cambios,
+        "borrados": borrados,
+    }
+
+
+# =========================
+# Lápidas (señales)
+# =========================
+def _duenos_del_pedido(instance):
+    if type(instance).pedido.is_cached(instance):
+        return instance.pedido.customer_id, instance.pedido.shopper_id
+    return Order.objects.filter(pk=instance.pedido_id).values_list("customer_id", "shopper_id").first() or (None, None)
+
+
+def _duenos(instance):
+    if isinstance(instance, (Order, Review)):
+        return instance.customer_id, instance.shopper_id
+    if isinstance(instance, (OrderItem, Payment)):
+        return _duenos_del_pedido(instance)
+    if isinstance(instance, Expense):
+        customer_id = _duenos_del_pedido(instance)[0] if instance.pedido_id else None
+        return customer_id, instance.shopper_id
+    return None, instance.shopper_id  # Trip
+
+
+def _al_borrar(sender, instance, **kwargs):
+    customer_id, shopper_id = _duenos(instance)
+    if customer_id or shopper_id:
+        Borrado.objects.create(
+            modelo=CLAVES[sender], objeto_id=instance.pk, customer_id=customer_id, shopper_id=shopper_id
+        )
+
+
+def _al_reasignar_pedido(sender, instance, update_fields=None, **kwargs):
+    # Si el pedido cambia de shopper, para el anterior es como si se hubiera
+    # borrado. Si vuelve a uno que ya tenía una lápida, se quita (el upsert
+    # llega igual por `actualizado`).
+    if instance._state.adding or (update_fields is not None and "shopper" not in update_fields):
+        return
+    anterior = Order.objects.filter(pk=instance.pk).values_list("shopper_id", flat=True).first()
+    if anterior == instance.shopper_id:
+        return
+    if anterior:
+        Borrado.objects.create(modelo="pedidos", objeto_id=instance.pk, shopper_id=anterior)
+    if instance.shopper_id:
+        Borrado.objects.filter(shopper_id=instance.shopper_id, modelo="pedidos", objeto_id=instance.pk).delete()
+        # Los hijos ya existían (con `actualizado` viejo, detrás del cursor
+        # del shopper nuevo): se tocan para que le lleguen
+        ahora = timezone.now()
+        for modelo in (OrderItem, Payment, Expense):
+            modelo.objects.filter(pedido_id=instance.pk).update(actualizado=ahora)
+
+
+def purgar_borrados(dias=None):
+    """
+    Borra las lápidas más viejas que `dias`; los cursores anteriores pasan a
+    recibir 410 (resincronizar). Devuelve cuántas borró.
+    """
+    dias = settings.SYNC_BORRADOS_DIAS if dias is None else dias
+    limite = timezone.now() - timedelta(days=dias)
+    return Borrado.objects.filter(actualizado__lt=limite)._raw_delete(Borrado.objects.db)
+
+
+def conectar_senales():
+    from django.db.models.signals import post_delete, pre_save
+
+    for modelo in CLAVES:
+        post_delete.connect(_al_borrar, sender=modelo, dispatch_uid=f"sync_borrado_{modelo.__name__}")
+    pre_save.connect(_al_reasignar_pedido, sender=Order, dispatch_uid="sync_reasignar_pedido")
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:02:44 2026
+
+@author: jvz16
+"""
+
+# marketplace/sqlite.py
+# Modo SQLite para producción chica (varios workers de gunicorn sobre el
+# mismo archivo). Se conecta a connection_created desde MarketplaceConfig.ready().
+#
+# - WAL: lectores y un escritor en paralelo (sin "database is locked" por leer).
+# - synchronous=NORMAL: con WAL es seguro ante caídas del proceso; solo se
+#   pierde la última transacción si se cae el sistema operativo.
+# - mmap_size / cache_size: menos syscalls de lectura.
+# - busy_timeout (OPTIONS["timeout"]): SQLite reintenta solo mientras otro
+#   worker tiene el lock de escritura, en lugar de fallar de inmediato.
+# - BEGIN IMMEDIATE (OPTIONS["transaction_mode"]): las transacciones toman el
+#   lock de escritura al empezar, así no hay deadlocks de "upgrade" de lectura
+#   a escritura (que SQLite resuelve con SQLITE_BUSY sin esperar).
+
+from django.conf import settings
+
+
+def aplicar_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", None) or {}
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for nombre, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nombre}={valor}")
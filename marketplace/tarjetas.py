@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:40:12 2026
+
+@author: jvz16
+"""
+
+# marketplace/tarjetas.py
+# Tarjeta de shopper (home: "En EE. UU. ahora" / "Viajan pronto";
+# buscar_shoppers). La vista arma un dict plano con todo resuelto (nombre,
+# foto, URL del perfil) y {% tarjeta_shopper %} lo renderiza; como el HTML
+# depende solo de ese dict, se memoriza por proceso con lru_cache.
+
+from functools import lru_cache
+
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+from .models import ShopperPhoto
+
+PLANTILLAS = {
+    "carrusel": "marketplace/tarjetas/shopper_carrusel.html",
+    "lista": "marketplace/tarjetas/shopper_lista.html",
+}
+
+_PAISES_USA = ("usa", "estados unidos", "united states")
+
+
+def _foto_url(shopper):
+    try:
+        foto = shopper.photo
+    except ShopperPhoto.DoesNotExist:
+        return ""
+    if not foto or not foto.image:
+        return ""
+    return foto.image.url
+
+
+def datos_tarjeta(shopper, **extra):
+    """
+    Dict con lo que muestra la tarjeta. Requiere select_related("user", "photo")
+    para no consultar la BD.
+    """
+    nombre = shopper.user.get_full_name() or shopper.user.username
+    pais = (shopper.pais_extranjero or "").lower()
+    datos = {
+        "pk": shopper.pk,
+        "nombre": nombre,
+        "inicial": nombre[:1].upper(),
+        "foto_url": _foto_url(shopper),
+        "calificacion": shopper.calificacion,
+        "ubicacion": shopper.ubicacion_actual,
+        "especialidades": shopper.especialidades,
+        "en_usa": bool(shopper.actualmente_en_el_extranjero and any(p in pais for p in _PAISES_USA)),
+        "url": reverse("shopper_detail", args=[shopper.pk]),
+    }
+    datos.update(extra)
+    return datos
+
+
+@lru_cache(maxsize=2048)
+def _render(variante, items):
+    return mark_safe(get_template(PLANTILLAS[variante]).render(dict(items)))
+
+
+def render_tarjeta(datos, variante="carrusel"):
+    return _render(variante, tuple(sorted(datos.items())))
+
+
+def limpiar_cache():
+    _render.cache_clear()
@@ -6,6 +6,10 @@ Created on Sun Dec  7 16:49:16 2025
 """
 
 from django import template
+from django.utils.safestring import mark_safe
+
+from ..huecos import marcar_hueco, plantilla_hueco
+from ..tarjetas import render_tarjeta
 
 register = template.Library()
 
@@ -22,3 +26,50 @@ def moneda(value):
         return value
     s = f"{value_int:,.0f}"
     return s.replace(",", ".")
+
+
+class HuecoNode(template.Node):
+    def __init__(self, nombre, nodelist):
+        self.nombre = nombre
+        self.nodelist = nodelist
+
+    def render(self, context):
+        request = context.get("request")
+        if getattr(request, "pagina_compartida", False):
+            # Render compartido (cache de página): contenido anónimo + marcas
+            with context.push(yo=None):
+                return marcar_hueco(self.nombre, self.nodelist.render(context))
+
+        contenido = self.nodelist.render(context)
+        plantilla = context.template.engine.get_template(plantilla_hueco(self.nombre))
+        with context.push(contenido=mark_safe(contenido)):
+            return plantilla.render(context)
+
+
+@register.tag
+def hueco(parser, token):
+    """
+    {% hueco "navbar" %} contenido anónimo {% endhueco %}
+
+    Parte de la página que depende del usuario. Se muestra con
+    marketplace/huecos/<nombre>.html (que recibe el bloque como `contenido`);
+    en páginas cacheadas se rellena al servirlas (ver marketplace/huecos.py).
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError("'hueco' recibe un único argumento: el nombre")
+    nombre = bits[1].strip("\"'")
+    nodelist = parser.parse(("endhueco",))
+    parser.delete_first_token()
+    return HuecoNode(nombre, nodelist)
+
+
+@register.simple_tag
+def tarjeta_shopper(datos, variante="carrusel"):
+    """
+    {% tarjeta_shopper t %} / {% tarjeta_shopper t "lista" %}
+
+    `datos` viene armado desde la vista (tarjetas.datos_tarjeta); el HTML se
+    memoriza por contenido, así que una tarjeta repetida no se re-renderiza.
+    """
+    return render_tarjeta(datos, variante)
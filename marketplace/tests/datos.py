@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:58:12 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/datos.py
+# Ajustes y datos mínimos compartidos por los tests.
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from marketplace.models import CustomerProfile, Order, Payment, ShopperProfile
+
+# Sin Cloudinary, sin manifest de collectstatic y sin redirección a https
+ajustes_prueba = override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    SECURE_SSL_REDIRECT=False,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+
+
+def crear_usuario(username, **campos):
+    return get_user_model().objects.create_user(username, **campos)
+
+
+def crear_shopper(username="shopper", **campos):
+    campos.setdefault("telefono_nacional", "88880000")
+    return ShopperProfile.objects.create(user=crear_usuario(username), **campos)
+
+
+def crear_cliente(username="cliente", **campos):
+    campos.setdefault("telefono_nacional", "87770000")
+    return CustomerProfile.objects.create(user=crear_usuario(username), **campos)
+
+
+def crear_pedido(cliente, shopper=None, **campos):
+    campos.setdefault("titulo", "Pedido de prueba")
+    return Order.objects.create(customer=cliente, shopper=shopper, **campos)
+
+
+def crear_pago(pedido, monto, **campos):
+    campos.setdefault("tipo_pago", "PARCIAL")
+    campos.setdefault("metodo", "SINPE")
+    return Payment.objects.create(pedido=pedido, monto=monto, **campos)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 01:05:44 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_api.py
+# API JSON de solo lectura (api.py): consultas acotadas por `max_consultas`
+# sin importar las filas, campos e inclusiones, páginas keyset, ETag / 304 y
+# los errores.
+
+import json
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from marketplace import api
+from marketplace.models import Expense, OrderItem, Review, Trip
+
+from .datos import crear_cliente, crear_pago, crear_pedido, crear_shopper
+
+
+class ApiTestCase(TestCase):
+    def setUp(self):
+        self.shopper = crear_shopper()
+        self.cliente = crear_cliente()
+        self.pedidos = []
+
+    def _sembrar(self, n):
+        for _ in range(n):
+            pedido = crear_pedido(self.cliente, self.shopper, estado="ENTREGADO")
+            OrderItem.objects.create(pedido=pedido, nombre="Tenis", precio_unitario=100)
+            OrderItem.objects.create(pedido=pedido, nombre="Gorra", precio_unitario=50)
+            crear_pago(pedido, 150)
+            Expense.objects.create(shopper=self.shopper, pedido=pedido, categoria="ENVIO", monto=10)
+            Review.objects.create(order=pedido, shopper=self.shopper, customer=self.cliente, rating=5)
+            Trip.objects.create(
+                shopper=self.shopper, ciudad_destino="Miami", fecha_inicio=date(2026, 11, 1), fecha_fin=date(2026, 11, 9)
+            )
+            self.pedidos.append(pedido)
+
+    def _pedir(self, recurso, pk=None, user=None, **params):
+        request = RequestFactory().get(f"/api/v1/{recurso}/", params)
+        request.user = user or self.cliente.user
+        with CaptureQueriesContext(connection) as consultas:
+            response = api.lista(request, recurso) if pk is None else api.detalle(request, recurso, pk)
+        return response, len(consultas.captured_queries)
+
+
+class ConsultasTests(ApiTestCase):
+    def _consultas(self, recurso, user, pk=None):
+        todos = ",".join(api.RECURSOS[recurso].incluir)
+        response, n = self._pedir(recurso, pk, user, include=todos, limite="200")
+        self.assertEqual(response.status_code, 200, response.content)
+        return n
+
+    def test_max_consultas_y_sin_n_mas_1(self):
+        usuarios = {"cliente": self.cliente.user, "shopper": self.shopper.user}
+        medidas = {}
+        for filas in (1, 6):
+            self._sembrar(filas - len(self.pedidos))
+            for recurso, rec in api.RECURSOS.items():
+                roles = ["cliente"] if rec.publico else list(usuarios)
+                for rol in roles:
+                    n = self._consultas(recurso, usuarios[rol])
+                    medidas.setdefault((recurso, rol), []).append(n)
+                    # El detalle nunca pasa de lo declarado
+                    ultimo = self.pedidos[-1]
+                    ids = {"shoppers": self.shopper.pk, "pedidos": ultimo.pk, "resenas": ultimo.review.pk}
+                    if recurso in ids:
+                        self.assertLessEqual(self._consultas(recurso, usuarios[rol], ids[recurso]), rec.max_consultas)
+        for (recurso, rol), (con_uno, con_seis) in medidas.items():
+            with self.subTest(recurso=recurso, rol=rol):
+                self.assertLessEqual(con_seis, api.RECURSOS[recurso].max_consultas)
+                self.assertEqual(con_uno, con_seis)
+
+
+class ListaTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self._sembrar(3)
+
+    def _datos(self, recurso, **params):
+        response, _ = self._pedir(recurso, **params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content)
+
+    def test_campos_e_inclusiones(self):
+        datos = self._datos("pedidos", fields="id,titulo", include="articulos", **{"fields[articulos]": "nombre"})
+        fila = datos["datos"][0]
+        self.assertEqual(set(fila), {"id", "titulo", "articulos"})
+        self.assertEqual(sorted(a["nombre"] for a in fila["articulos"]), ["Gorra", "Tenis"])
+
+    def test_paginas_keyset(self):
+        primera = self._datos("pedidos", limite="2", fields="id")
+        segunda = self._datos("pedidos", limite="2", fields="id", cursor=primera["siguiente"])
+        ids = [f["id"] for f in primera["datos"] + segunda["datos"]]
+        self.assertEqual(ids, sorted((p.pk for p in self.pedidos), reverse=True))
+        self.assertIsNone(segunda["siguiente"])
+
+    def test_solo_lo_del_dueno(self):
+        otro = crear_cliente("otro")
+        self.assertEqual(self._datos("pedidos", user=otro.user)["datos"], [])
+        response, _ = self._pedir("pedidos", self.pedidos[0].pk, user=otro.user)
+        self.assertEqual(response.status_code, 404)
+
+    def test_errores(self):
+        casos = [
+            ("pedidos", {"fields": "id,clave"}, 400),
+            ("pedidos", {"include": "cliente"}, 400),
+            ("pedidos", {"cursor": "basura"}, 400),
+            ("pedidos", {"rol": "admin"}, 400),
+            ("pedidos", {"rol": "shopper"}, 403),
+            ("clientes", {}, 404),
+        ]
+        for recurso, params, status in casos:
+            with self.subTest(recurso=recurso, params=params):
+                self.assertEqual(self._pedir(recurso, **params)[0].status_code, status)
+
+    def test_sin_sesion(self):
+        self.assertEqual(self._pedir("pedidos", user=AnonymousUser())[0].status_code, 401)
+        response, _ = self._pedir("shoppers", user=AnonymousUser())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+
+
+class EtagTests(ApiTestCase):
+    def test_304_con_if_none_match(self):
+        self._sembrar(1)
+        response, _ = self._pedir("pedidos")
+        etag = response["ETag"]
+        request = RequestFactory().get("/api/v1/pedidos/", HTTP_IF_NONE_MATCH=etag)
+        request.user = self.cliente.user
+        no_modificado = api.lista(request, "pedidos")
+        self.assertEqual(no_modificado.status_code, 304)
+        self.assertEqual(no_modificado.content, b"")
+        # Cambia el contenido -> cambia el ETag
+        crear_pedido(self.cliente, self.shopper)
+        self.assertEqual(api.lista(request, "pedidos").status_code, 200)
+
+
+class JsonTests(TestCase):
+    def test_mismo_json_con_y_sin_orjson(self):
+        if api.orjson is None:
+            self.skipTest("orjson no instalado")
+        datos = {"fecha": timezone.now(), "dia": date(2026, 1, 2), "texto": "ñandú", "n": 3}
+        con = json.loads(api.a_json(datos))
+        with mock.patch.object(api, "orjson", None):
+            sin = json.loads(api.a_json(datos))
+        self.assertEqual(con["dia"], sin["dia"])
+        self.assertEqual(con["texto"], sin["texto"])
+        self.assertEqual(con["fecha"][:19], sin["fecha"][:19])
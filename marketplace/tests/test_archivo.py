@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:48:30 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_archivo.py
+# Archivo de pedidos cerrados (archivo.py): qué se mueve, lectura con
+# obtener_pedido() (vivo primero, archivo después) y los detalles en solo
+# lectura.
+
+from datetime import timedelta
+
+from django.http import Http404
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace import archivo, reportes
+from marketplace.models import Expense, Order, PagoArchivado, Payment, PedidoArchivado
+
+from .datos import ajustes_prueba, crear_cliente, crear_pago, crear_pedido, crear_shopper
+
+
+class ArchivoTestCase(TestCase):
+    def setUp(self):
+        self.shopper = crear_shopper()
+        self.cliente = crear_cliente()
+
+    def _pedido_viejo(self, estado="ENTREGADO", dias=200, **campos):
+        pedido = crear_pedido(self.cliente, self.shopper, estado=estado, **campos)
+        Order.objects.filter(pk=pedido.pk).update(actualizado=timezone.now() - timedelta(days=dias))
+        return pedido
+
+
+class ArchivarTests(ArchivoTestCase):
+    def test_mueve_pedidos_cerrados_viejos_con_sus_hijos(self):
+        viejo = self._pedido_viejo(precio=5000)
+        pago = crear_pago(viejo, 5000)
+        Expense.objects.create(shopper=self.shopper, pedido=viejo, categoria="ENVIO", monto=800)
+        Order.objects.filter(pk=viejo.pk).update(actualizado=timezone.now() - timedelta(days=200))
+        reciente = self._pedido_viejo(dias=10)
+        abierto = self._pedido_viejo(estado="EN_PROCESO")
+
+        self.assertEqual(archivo.archivar(dias=180, lote=1, pausa=0), 1)
+
+        self.assertFalse(Order.objects.filter(pk=viejo.pk).exists())
+        self.assertFalse(Payment.objects.filter(pk=pago.pk).exists())
+        archivado = PedidoArchivado.objects.get(pk=viejo.pk)
+        self.assertEqual(archivado.precio, 5000)
+        self.assertEqual(list(archivado.pagos.values_list("pk", flat=True)), [pago.pk])
+        self.assertEqual(archivado.gastos.count(), 1)
+        self.assertEqual(set(Order.objects.values_list("pk", flat=True)), {reciente.pk, abierto.pk})
+
+    def test_pnl_incluye_lo_archivado(self):
+        viejo = self._pedido_viejo()
+        crear_pago(viejo, 3000)
+        Order.objects.filter(pk=viejo.pk).update(actualizado=timezone.now() - timedelta(days=200))
+        # Con el cache local de los tests el P&L se calcula en vivo
+        antes = reportes.pnl_mensual(self.shopper.pk)
+        archivo.archivar(dias=180, pausa=0)
+        self.assertEqual(PagoArchivado.objects.count(), 1)
+        self.assertEqual(reportes.pnl_mensual(self.shopper.pk), antes)
+
+
+class ObtenerPedidoTests(ArchivoTestCase):
+    def test_vivo(self):
+        pedido = crear_pedido(self.cliente, self.shopper)
+        self.assertEqual(archivo.obtener_pedido(pedido.pk, shopper=self.shopper), (pedido, False))
+
+    def test_archivado(self):
+        pedido = self._pedido_viejo()
+        archivo.archivar(dias=180, pausa=0)
+        encontrado, archivado = archivo.obtener_pedido(pedido.pk, customer=self.cliente)
+        self.assertTrue(archivado)
+        self.assertIsInstance(encontrado, PedidoArchivado)
+        self.assertEqual(encontrado.pk, pedido.pk)
+
+    def test_de_otro_dueno_da_404(self):
+        otro = crear_shopper("otro")
+        vivo = crear_pedido(self.cliente, self.shopper)
+        viejo = self._pedido_viejo()
+        archivo.archivar(dias=180, pausa=0)
+        for pk in (vivo.pk, viejo.pk):
+            with self.subTest(pk=pk), self.assertRaises(Http404):
+                archivo.obtener_pedido(pk, shopper=otro)
+
+
+@ajustes_prueba
+class DetalleArchivadoTests(ArchivoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pedido = self._pedido_viejo(titulo="Bolso archivado")
+        crear_pago(self.pedido, 1000)
+        archivo.archivar(dias=180, pausa=0)
+
+    def test_detalle_del_shopper(self):
+        self.client.force_login(self.shopper.user)
+        url = reverse("shopper_order_detail", args=[self.pedido.pk])
+        response = self.client.get(url)
+        self.assertContains(response, "Bolso archivado")
+        # Solo lectura: el POST no crea nada
+        response = self.client.post(url, {"registrar_pago": "1", "monto": "500"})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertEqual(PagoArchivado.objects.count(), 1)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_detalle_del_cliente(self):
+        self.client.force_login(self.cliente.user)
+        response = self.client.get(reverse("order_detail", args=[self.pedido.pk]))
+        self.assertContains(response, "Bolso archivado")
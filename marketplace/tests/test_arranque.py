@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 01:55:31 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_arranque.py
+# Precarga del master de gunicorn (arranque.py): compila los templates del
+# proyecto y no toca la BD.
+
+from django.test import SimpleTestCase
+
+from marketplace import arranque
+
+
+class PrecargarTests(SimpleTestCase):
+    def test_solo_templates_del_proyecto(self):
+        nombres = arranque._templates_del_proyecto()
+        self.assertIn("marketplace/home.html", nombres)
+        self.assertFalse(any(n.startswith("admin/") for n in nombres))
+
+    def test_precargar_sin_bd(self):
+        # SimpleTestCase falla ante cualquier consulta
+        with self.assertNoLogs("marketplace.arranque"):
+            tiempos = arranque.precargar()
+        self.assertEqual(set(tiempos), {"urls", "templates", "traducciones"})
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 03:04:26 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_calentamiento.py
+# Calentamiento post-deploy (calentamiento.py): qué se omite con cache local,
+# las páginas por el handler interno y los errores que no frenan al resto.
+
+from unittest import mock
+
+from django.test import TestCase
+
+from marketplace import calentamiento
+
+from .datos import ajustes_prueba
+
+
+@ajustes_prueba
+class CalentamientoTests(TestCase):
+    def test_cache_local_no_es_compartido(self):
+        # Los tests usan LocMemCache
+        compartido, motivo = calentamiento.cache_compartido()
+        self.assertFalse(compartido)
+        self.assertIn("memoria local", motivo)
+        lista, avisos = calentamiento.tareas()
+        self.assertFalse(any(nombre.startswith("página") for nombre, _ in lista))
+        self.assertEqual(len(avisos), 2)
+
+    def test_paginas_internas(self):
+        with mock.patch.object(calentamiento, "cache_compartido", return_value=(True, "")):
+            lista, avisos = calentamiento.tareas(n_shoppers=0)
+        self.assertEqual(avisos, [])
+        paginas = [(nombre, tarea) for nombre, tarea in lista if nombre.startswith("página")]
+        resultados, _ = calentamiento.calentar(paginas, hilos=1)
+        self.assertEqual([r["resultado"] for r in resultados], ["200", "200"])
+
+    def test_un_error_no_frena_a_las_demas(self):
+        def falla():
+            raise RuntimeError("sin red")
+
+        resultados, _ = calentamiento.calentar([("falla", falla), ("bien", lambda: "ok")], hilos=2)
+        self.assertEqual(resultados[0]["error"], "RuntimeError: sin red")
+        self.assertEqual(resultados[1]["resultado"], "ok")
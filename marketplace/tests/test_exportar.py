@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:34:05 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_exportar.py
+# Exportaciones en streaming (exportar.py): contenido de CSV y XLSX, la vista
+# de descarga y memoria que no crece con la cantidad de filas.
+
+import csv
+import io
+import tracemalloc
+import zipfile
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from marketplace import exportar
+from marketplace.models import Expense, Payment
+
+from .datos import ajustes_prueba, crear_cliente, crear_pago, crear_pedido, crear_shopper
+
+
+def _csv(shopper, libro):
+    _, contenido = exportar.exportar(shopper, libro, "csv")
+    return list(csv.reader(io.StringIO("".join(contenido).lstrip("﻿"))))
+
+
+class ExportarTests(TestCase):
+    def setUp(self):
+        self.shopper = crear_shopper()
+        self.cliente = crear_cliente()
+        self.pedido = crear_pedido(self.cliente, self.shopper, titulo="Tenis", precio=10000)
+
+    def test_pedidos_con_totales(self):
+        crear_pago(self.pedido, 4000)
+        crear_pago(self.pedido, 1000, aprobado=False, creado_por="CLIENTE")  # no cuenta
+        Expense.objects.create(shopper=self.shopper, pedido=self.pedido, categoria="ENVIO", monto=1500)
+        filas = _csv(self.shopper, "pedidos")
+        self.assertEqual(filas[0][-4:], ["Pagado", "Gastos", "Saldo", "Ganancia"])
+        self.assertEqual(len(filas), 2)
+        self.assertEqual(filas[1][2], "Tenis")
+        self.assertEqual(filas[1][-4:], ["4000", "1500", "6000", "2500"])
+
+    def test_consultas_no_dependen_de_las_filas(self):
+        for i in range(5):
+            crear_pago(crear_pedido(self.cliente, self.shopper), 100 + i)
+        # Una para el archivo y una para las tablas vivas
+        with self.assertNumQueries(2):
+            self.assertEqual(len(_csv(self.shopper, "pagos")), 6)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(_csv(self.shopper, "pedidos")), 7)
+
+    def test_csv_neutraliza_formulas(self):
+        crear_pago(self.pedido, 100, nota="=HYPERLINK(1)")
+        self.assertEqual(_csv(self.shopper, "pagos")[1][-1], "'=HYPERLINK(1)")
+
+    def test_xlsx_con_una_hoja_por_libro(self):
+        crear_pago(self.pedido, 100)
+        Expense.objects.create(shopper=self.shopper, categoria="VUELO", monto=50, descripcion="Vuelo <SJO>")
+        nombre, contenido = exportar.exportar(self.shopper, "todo", "xlsx")
+        self.assertTrue(nombre.startswith("todo_") and nombre.endswith(".xlsx"))
+        with zipfile.ZipFile(io.BytesIO(b"".join(contenido))) as zf:
+            self.assertIsNone(zf.testzip())
+            hojas = [n for n in zf.namelist() if n.startswith("xl/worksheets/")]
+            self.assertEqual(len(hojas), len(exportar.LIBROS))
+            self.assertIn(b"Tenis", zf.read("xl/worksheets/sheet1.xml"))
+            self.assertIn(b"Vuelo &lt;SJO&gt;", zf.read("xl/worksheets/sheet3.xml"))
+
+    def test_libro_o_formato_desconocido(self):
+        for que, formato in [("clientes", "csv"), ("pagos", "pdf"), ("todo", "csv")]:
+            with self.subTest(que=que, formato=formato), self.assertRaises(KeyError):
+                exportar.exportar(self.shopper, que, formato)
+
+
+@mock.patch.object(exportar, "CHUNK_SIZE", 200)
+class MemoriaTests(TestCase):
+    """
+    Con chunks de 200 filas (tracemalloc es lento), el pico de memoria con
+    4000 filas no supera 1.5 veces el de 1000.
+    """
+
+    TOLERANCIA = 1.5
+
+    def setUp(self):
+        self.shopper = crear_shopper()
+        self.pedido = crear_pedido(crear_cliente(), self.shopper)
+
+    def _llevar_a(self, n):
+        faltan = n - Payment.objects.filter(pedido=self.pedido).count()
+        Payment.objects.bulk_create(
+            Payment(pedido=self.pedido, monto=1000 + i, tipo_pago="PARCIAL", metodo="SINPE") for i in range(faltan)
+        )
+
+    def _pico(self, que, formato):
+        _, contenido = exportar.exportar(self.shopper, que, formato)
+        tracemalloc.start()
+        try:
+            for _ in contenido:
+                pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_pico_plano(self):
+        chico, grande = 1000, 4000
+        for formato in ("csv", "xlsx"):
+            with self.subTest(formato=formato):
+                self._llevar_a(chico)
+                pico_chico = self._pico("pagos", formato)
+                self._llevar_a(grande)
+                pico_grande = self._pico("pagos", formato)
+                Payment.objects.filter(pedido=self.pedido).delete()
+                self.assertLessEqual(pico_grande, pico_chico * self.TOLERANCIA)
+
+
+@ajustes_prueba
+class ExportarVistaTests(TestCase):
+    def setUp(self):
+        self.shopper = crear_shopper()
+        crear_pago(crear_pedido(crear_cliente(), self.shopper), 100)
+        self.client.force_login(self.shopper.user)
+
+    def _url(self, que, formato):
+        return reverse("shopper_exportar", args=[que, formato])
+
+    def test_descarga_en_streaming(self):
+        response = self.client.get(self._url("pagos", "csv"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        self.assertEqual(response["Cache-Control"], "private, no-store")
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 2)
+
+    def test_desconocido_da_404(self):
+        self.assertEqual(self.client.get(self._url("clientes", "csv")).status_code, 404)
+
+    def test_sin_perfil_de_shopper_da_404(self):
+        self.client.force_login(crear_cliente("otro").user)
+        self.assertEqual(self.client.get(self._url("pagos", "csv")).status_code, 404)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:31:52 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_http_cache.py
+# GET condicional de las páginas públicas (http_cache.py): 304 sin correr la
+# vista, y los cambios que tienen que mover el ETag (incluidos el nombre del
+# usuario y la foto, que no son campos del shopper) y la clave del HTML
+# compartido.
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from marketplace import http_cache
+from marketplace.models import ShopperPhoto
+
+from .datos import ajustes_prueba, crear_cliente, crear_pedido, crear_shopper
+
+
+@ajustes_prueba
+class CondicionalTests(TestCase):
+    def setUp(self):
+        self.shopper = crear_shopper()
+        self.detalle = reverse("shopper_detail", args=[self.shopper.pk])
+
+    def _etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_304_sin_ejecutar_la_vista(self):
+        for url in (reverse("home"), reverse("buscar_shoppers"), self.detalle, reverse("como_funciona")):
+            with self.subTest(url):
+                etag = self._etag(url)
+                with self.assertNumQueries(0 if url == reverse("como_funciona") else 1):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+
+    def test_politica_anonimo_y_con_sesion(self):
+        self.assertIn("public", self.client.get(self.detalle)["Cache-Control"])
+        self.client.force_login(crear_cliente().user)
+        control = self.client.get(self.detalle)["Cache-Control"]
+        self.assertIn("private", control)
+        self.assertIn("no-cache", control)
+
+    def test_nombre_del_usuario_cambia_el_etag(self):
+        antes = {url: self._etag(url) for url in (self.detalle, reverse("buscar_shoppers"))}
+        user = self.shopper.user
+        user.first_name = "Ana"
+        user.save()
+        for url, etag in antes.items():
+            with self.subTest(url):
+                self.assertNotEqual(self._etag(url), etag)
+
+    def test_login_no_cambia_el_etag(self):
+        etag = self._etag(self.detalle)
+        self.client.force_login(self.shopper.user)
+        self.client.logout()
+        self.assertEqual(self._etag(self.detalle), etag)
+
+    def test_foto_cambia_el_etag(self):
+        etag = self._etag(self.detalle)
+        foto = ShopperPhoto.objects.create(
+            shopper=self.shopper, image=SimpleUploadedFile("ana.jpg", b"x", content_type="image/jpeg")
+        )
+        con_foto = self._etag(self.detalle)
+        self.assertNotEqual(con_foto, etag)
+        foto.delete()
+        self.assertNotEqual(self._etag(self.detalle), con_foto)
+
+    def test_pedidos_atendidos_cambian_el_etag(self):
+        etag = self._etag(self.detalle)
+        crear_pedido(crear_cliente(), self.shopper)
+        self.assertNotEqual(self._etag(self.detalle), etag)
+
+
+class VersionDeployTests(TestCase):
+    def test_hash_del_codigo_es_estable(self):
+        self.assertEqual(http_cache._version_codigo(), http_cache._version_codigo())
+
+
+@ajustes_prueba
+@override_settings(PAGINA_CACHE_ACTIVA=True)
+class PaginaCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shopper = crear_shopper()
+
+    def test_html_compartido_se_renueva_con_el_nombre(self):
+        url = reverse("buscar_shoppers")
+        self.client.get(url)
+        self.assertNotContains(self.client.get(url), "Ana Mora")
+        user = self.shopper.user
+        user.first_name, user.last_name = "Ana", "Mora"
+        user.save()
+        self.assertContains(self.client.get(url), "Ana Mora")
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:42:05 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_indices.py
+# Las consultas críticas de las vistas se resuelven por índice (las mismas
+# que revisa manage.py verificar_indices). Corre en SQLite y en Postgres.
+
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from marketplace.loadtest import sembrar_datos
+from marketplace.management.commands.verificar_indices import consultas_criticas, tablas_con_seq_scan
+from marketplace.models import Order
+
+
+# sembrar_datos crea usuarios con contraseña: el hasher de producción es lento a propósito
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class IndicesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sembrar_datos(n_shoppers=20, n_clientes=40, pedidos_por_cliente=4, prefijo="explain")
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            # Con pocas filas el planner prefiere el seq scan aunque haya índice
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def test_consultas_criticas_sin_seq_scan(self):
+        for nombre, qs, tabla in consultas_criticas():
+            with self.subTest(nombre):
+                plan = qs.explain()
+                self.assertNotIn(tabla, tablas_con_seq_scan(plan, connection.vendor), plan)
+
+    def test_detecta_seq_scan(self):
+        # titulo no tiene índice: el detector tiene que verlo
+        plan = Order.objects.filter(titulo="x").explain()
+        self.assertIn(Order._meta.db_table, tablas_con_seq_scan(plan, connection.vendor), plan)
+
+    def test_plan_sqlite(self):
+        plan = "\n".join(
+            [
+                "2 0 0 SCAN marketplace_trip",
+                "5 0 0 SEARCH marketplace_order USING INDEX order_shopper_creado_idx (shopper_id=?)",
+                "9 0 0 SCAN marketplace_payment USING INDEX payment_pendiente_idx",
+            ]
+        )
+        self.assertEqual(tablas_con_seq_scan(plan, "sqlite"), {"marketplace_trip"})
+
+    def test_plan_postgres(self):
+        plan = "\n".join(
+            [
+                "Sort  (cost=1.05..1.06 rows=1 width=8)",
+                "  ->  Seq Scan on marketplace_trip  (cost=0.00..1.04 rows=1 width=8)",
+                "  ->  Index Scan using order_shopper_creado_idx on marketplace_order  (cost=0.14..8.16 rows=1)",
+            ]
+        )
+        self.assertEqual(tablas_con_seq_scan(plan, "postgresql"), {"marketplace_trip"})
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 01:21:09 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_limites.py
+# Límites (limites.py): 429 + Retry-After en una ráfaga de logins con los
+# baldes en la BD, la IP detrás del proxy y el conteo de requests en curso.
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from marketplace import limites
+from marketplace.middleware import LimiteConcurrenciaMiddleware
+from marketplace.models import BaldeLimite
+
+from .datos import ajustes_prueba
+
+
+@ajustes_prueba
+@override_settings(LIMITES_ACTIVOS=True, LIMITES_PROXIES=0, LIMITES_TASA={"login": "2/60"})
+class LoginTests(TestCase):
+    def _login(self, username="ana", **extra):
+        return self.client.post(reverse("login"), {"username": username, "password": "mala"}, **extra)
+
+    def test_rafaga_de_logins_da_429(self):
+        self.assertEqual(self._login().status_code, 200)
+        self.assertEqual(self._login().status_code, 200)
+        response = self._login()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        # Los GET no se limitan
+        self.assertEqual(self.client.get(reverse("login")).status_code, 200)
+
+    def test_balde_por_cuenta_entre_ips(self):
+        for ip in ("10.0.0.1", "10.0.0.2"):
+            self.assertEqual(self._login("Ana", REMOTE_ADDR=ip).status_code, 200)
+        # Otra IP, la misma cuenta: el balde de la cuenta ya está vacío
+        self.assertEqual(self._login(" ana ", REMOTE_ADDR="10.0.0.3").status_code, 429)
+        self.assertTrue(BaldeLimite.objects.filter(clave="limite:login:cuenta:ana").exists())
+
+
+class BaldeTests(TestCase):
+    def test_clave_larga_se_resume(self):
+        clave = "limite:login:cuenta:" + "x" * 300
+        self.assertEqual(limites.tomar_ficha(clave, 1, 1.0), (True, 0.0))
+        permitido, espera = limites.tomar_ficha(clave, 1, 1.0)
+        self.assertFalse(permitido)
+        self.assertGreater(espera, 0)
+        self.assertEqual(BaldeLimite.objects.count(), 1)
+
+    def test_regla_invalida(self):
+        for texto in ("0/60", "5/0", "cinco"):
+            with self.subTest(texto), self.assertRaises(ValueError):
+                limites.leer_regla(texto)
+
+
+class IpClienteTests(SimpleTestCase):
+    def _ip(self, proxies, xff=None):
+        extra = {"HTTP_X_FORWARDED_FOR": xff} if xff is not None else {}
+        request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.9", **extra)
+        with self.settings(LIMITES_PROXIES=proxies):
+            return limites.ip_cliente(request)
+
+    def test_cuenta_desde_la_derecha(self):
+        self.assertEqual(self._ip(0, "1.1.1.1"), "10.0.0.9")
+        # Lo de la izquierda lo escribe el cliente: no se le cree
+        self.assertEqual(self._ip(1, "6.6.6.6, 1.1.1.1"), "1.1.1.1")
+        self.assertEqual(self._ip(2, "6.6.6.6, 1.1.1.1, 2.2.2.2"), "1.1.1.1")
+        self.assertEqual(self._ip(2, "1.1.1.1"), "10.0.0.9")
+        self.assertEqual(self._ip(1, ""), "10.0.0.9")
+
+
+class ConcurrenciaTests(SimpleTestCase):
+    def test_conteo_local(self):
+        concurrencia = limites.Concurrencia(2)
+        self.assertFalse(concurrencia.compartida)
+        fichas = [concurrencia.entrar(), concurrencia.entrar()]
+        self.assertIsNone(concurrencia.entrar())
+        concurrencia.salir(fichas.pop())
+        self.assertIsNotNone(concurrencia.entrar())
+
+    @override_settings(CONCURRENCIA_MAXIMA=1, CONCURRENCIA_REINTENTAR_SEGUNDOS=3)
+    def test_middleware_descarta_con_503(self):
+        respuestas = []
+
+        def vista(request):
+            # Con un request en curso, el siguiente se descarta
+            respuestas.append(middleware(RequestFactory().get("/otro/")))
+            return HttpResponse("ok")
+
+        middleware = LimiteConcurrenciaMiddleware(vista)
+        self.assertEqual(middleware(RequestFactory().get("/")).status_code, 200)
+        self.assertEqual(respuestas[0].status_code, 503)
+        self.assertEqual(respuestas[0]["Retry-After"], "3")
+        # Terminado el primero, se libera el lugar
+        self.assertEqual(middleware.concurrencia._en_curso, 0)
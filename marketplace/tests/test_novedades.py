@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:31:40 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_novedades.py
+# Feed de pedidos abiertos (novedades.py): eventos que salen de cada vuelta
+# y la respuesta del endpoint bajo WSGI.
+
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from marketplace import novedades
+
+from .datos import ajustes_prueba, crear_cliente, crear_pedido, crear_shopper
+
+
+def _tipos(eventos):
+    return [(e.split("\n")[0].removeprefix("event: "), json.loads(e.split("\n")[1][6:])["id"]) for e in eventos]
+
+
+@ajustes_prueba
+@override_settings(NOVEDADES_RECONCILIAR=100)
+class EstadoTests(TestCase):
+    def setUp(self):
+        # Dentro de la transacción del test no se cierra la conexión (como
+        # hace el cliente de pruebas con la señal request_started)
+        self.enterContext(mock.patch("marketplace.novedades.close_old_connections", lambda: None))
+        self.cliente = crear_cliente()
+        self.estado = novedades.Estado()
+        self.assertEqual(self.estado.revisar(), [])  # primera vuelta: carga los abiertos
+
+    def _abierto(self):
+        return crear_pedido(self.cliente, estado="BUSCANDO_SHOPPER")
+
+    def test_nuevo_tomado_y_cancelado(self):
+        tomado, cancelado = self._abierto(), self._abierto()
+        eventos = self.estado.revisar()
+        self.assertEqual(_tipos(eventos), [("nuevo", tomado.pk), ("nuevo", cancelado.pk)])
+        self.assertIn(f'data-pedido="{tomado.pk}"', json.loads(eventos[0].split("\n")[1][6:])["html"])
+
+        tomado.shopper = crear_shopper()
+        tomado.estado = "EN_SELECCION"
+        tomado.save()
+        cancelado.estado = "CANCELADO"
+        cancelado.save()
+        self.assertEqual(_tipos(self.estado.revisar()), [("tomado", tomado.pk), ("cancelado", cancelado.pk)])
+        # Releer el margen no repite eventos
+        self.assertEqual(self.estado.revisar(), [])
+
+    def test_reconciliar_ve_los_borrados(self):
+        pedido = self._abierto()
+        pk = pedido.pk
+        self.estado.revisar()
+        pedido.delete()
+        self.assertEqual(self.estado.revisar(), [])
+        self.estado.vueltas = 0
+        self.assertEqual(_tipos(self.estado.revisar()), [("retirado", pk)])
+
+
+@ajustes_prueba
+class NovedadesVistaTests(TestCase):
+    def test_bajo_wsgi_responde_204(self):
+        shopper = crear_shopper()
+        self.client.force_login(shopper.user)
+        self.assertEqual(self.client.get(reverse("shopper_novedades")).status_code, 204)
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:58:40 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_pagos.py
+# Aprobación en lote y conciliación con el extracto del banco (pagos.py).
+
+from datetime import date, timedelta
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace import pagos
+from marketplace.models import Order, Payment
+
+from .datos import ajustes_prueba, crear_cliente, crear_pago, crear_pedido, crear_shopper
+
+
+class ParsearTests(TestCase):
+    def test_parsear_monto(self):
+        casos = {
+            "₡12.500,00": 12500,
+            "12,500.00": 12500,
+            "12500": 12500,
+            "1.234.567": 1234567,
+            "1,234,567": 1234567,
+            "12.500": 12500,
+            "99,75": 100,
+            " 7 000 ": 7000,
+            "": None,
+            "-": None,
+            "sin monto": None,
+        }
+        for valor, esperado in casos.items():
+            with self.subTest(valor=valor):
+                self.assertEqual(pagos.parsear_monto(valor), esperado)
+
+    def test_parsear_fecha(self):
+        for valor in ("19/10/2026", "2026-10-19", "19-10-2026", "19/10/26", "2026/10/19", "2026-10-19 08:15"):
+            with self.subTest(valor=valor):
+                self.assertEqual(pagos.parsear_fecha(valor), date(2026, 10, 19))
+        self.assertIsNone(pagos.parsear_fecha("ayer"))
+
+    def test_leer_extracto(self):
+        crudo = (
+            "﻿Fecha;Descripción;Débito;Crédito\n"
+            "19/10/2026;SINPE MOVIL ANA PEDIDO 12;;12.500,00\n"
+            "19/10/2026;COMISION;1.000,00;\n"
+            "\n"
+            "20/10/2026;TRANSFERENCIA;;-3.000,00\n"
+            "sin fecha;RARO;;500\n"
+            "21/10/2026;DEPOSITO;;7.000\n"
+        ).encode("utf-8")
+        lineas = pagos.leer_extracto(BytesIO(crudo))
+        self.assertEqual(
+            [(l["linea"], l["fecha"], l["monto"], l["descripcion"]) for l in lineas],
+            [
+                (2, date(2026, 10, 19), 12500, "SINPE MOVIL ANA PEDIDO 12"),
+                (7, date(2026, 10, 21), 7000, "DEPOSITO"),
+            ],
+        )
+
+    def test_leer_extracto_latin1_con_comas(self):
+        crudo = "fecha,concepto,monto\n2026-10-19,Depósito,2500\n".encode("latin-1")
+        lineas = pagos.leer_extracto(BytesIO(crudo))
+        self.assertEqual([(l["monto"], l["descripcion"]) for l in lineas], [(2500, "Depósito")])
+
+    def test_leer_extracto_sin_columnas(self):
+        with self.assertRaises(ValueError):
+            pagos.leer_extracto(BytesIO(b"descripcion;referencia\nx;y\n"))
+
+
+class AprobarRechazarTests(TestCase):
+    def setUp(self):
+        self.shopper = crear_shopper()
+        self.otro = crear_shopper("otro_shopper")
+        cliente = crear_cliente()
+        self.pedido = crear_pedido(cliente, self.shopper, precio=50000)
+        self.ajeno = crear_pedido(cliente, self.otro)
+        self.pendientes = [
+            crear_pago(self.pedido, 1000 * (i + 1), aprobado=False, creado_por="CLIENTE") for i in range(4)
+        ]
+        self.aprobado = crear_pago(self.pedido, 500)
+        self.de_otro = crear_pago(self.ajeno, 700, aprobado=False, creado_por="CLIENTE")
+
+    def test_aprobar_solo_pendientes_propios(self):
+        antes = timezone.now()
+        ids = [p.pk for p in self.pendientes[:2]] + [self.aprobado.pk, self.de_otro.pk, 999999]
+        self.assertEqual(pagos.aprobar_pagos(self.shopper, ids), 2)
+
+        aprobados = set(Payment.objects.filter(aprobado=True).values_list("pk", flat=True))
+        self.assertEqual(aprobados, {self.pendientes[0].pk, self.pendientes[1].pk, self.aprobado.pk})
+        self.pedido.refresh_from_db()
+        self.assertGreaterEqual(self.pedido.actualizado, antes)
+        self.assertEqual(self.pedido.total_pagos, 500 + 1000 + 2000)
+
+    def test_aprobar_en_lote_no_depende_de_la_cantidad(self):
+        with CaptureQueriesContext(connection) as uno:
+            pagos.aprobar_pagos(self.shopper, [self.pendientes[0].pk])
+        with CaptureQueriesContext(connection) as tres:
+            pagos.aprobar_pagos(self.shopper, [p.pk for p in self.pendientes[1:]])
+        self.assertEqual(len(uno), len(tres))
+
+    def test_aprobar_nada(self):
+        actualizado = Order.objects.get(pk=self.pedido.pk).actualizado
+        self.assertEqual(pagos.aprobar_pagos(self.shopper, [self.de_otro.pk]), 0)
+        self.assertEqual(Order.objects.get(pk=self.pedido.pk).actualizado, actualizado)
+
+    def test_rechazar_borra_solo_pendientes_propios(self):
+        ids = [self.pendientes[0].pk, self.aprobado.pk, self.de_otro.pk]
+        self.assertEqual(pagos.rechazar_pagos(self.shopper, ids), 1)
+        self.assertFalse(Payment.objects.filter(pk=self.pendientes[0].pk).exists())
+        self.assertEqual(Payment.objects.filter(pk__in=[self.aprobado.pk, self.de_otro.pk]).count(), 2)
+
+
+class ConciliarTests(TestCase):
+    def setUp(self):
+        self.shopper = crear_shopper()
+        self.cliente = crear_cliente()
+        self.hoy = timezone.localdate()
+
+    def _pago(self, monto, nota="", dias=0, pedido=None):
+        pedido = pedido or crear_pedido(self.cliente, self.shopper)
+        creado = timezone.now() - timedelta(days=dias)
+        return crear_pago(pedido, monto, aprobado=False, creado_por="CLIENTE", nota=nota, creado=creado)
+
+    def _linea(self, monto, descripcion="", dias=0, numero=2):
+        return {"linea": numero, "fecha": self.hoy - timedelta(days=dias), "monto": monto, "descripcion": descripcion}
+
+    def test_gana_la_nota_entre_montos_iguales(self):
+        ana = self._pago(12500, nota="Ana Rojas zapatos")
+        luis = self._pago(12500, nota="Luis Mora")
+        coincidencias, sin_pago, sin_linea = pagos.conciliar(
+            self.shopper, [self._linea(12500, "SINPE MOVIL LUIS MORA"), self._linea(12500, "SINPE ANA", numero=3)]
+        )
+        self.assertEqual([(c["linea"]["linea"], c["pago"].pk) for c in coincidencias], [(2, luis.pk), (3, ana.pk)])
+        self.assertTrue(all(c["coincide_nota"] for c in coincidencias))
+        self.assertEqual((sin_pago, sin_linea), ([], []))
+
+    def test_numero_de_pedido_en_la_descripcion(self):
+        pedido = crear_pedido(self.cliente, self.shopper)
+        self._pago(9000)
+        del_pedido = self._pago(9000, pedido=pedido)
+        coincidencias, _, _ = pagos.conciliar(self.shopper, [self._linea(9000, f"deposito pedido {pedido.pk}")])
+        self.assertEqual(coincidencias[0]["pago"].pk, del_pedido.pk)
+
+    def test_fecha_mas_cercana_a_igual_nota(self):
+        self._pago(5000, dias=2)
+        cercano = self._pago(5000, dias=0)
+        coincidencias, _, sin_linea = pagos.conciliar(self.shopper, [self._linea(5000)])
+        self.assertEqual(coincidencias[0]["pago"].pk, cercano.pk)
+        self.assertFalse(coincidencias[0]["coincide_nota"])
+        self.assertEqual(len(sin_linea), 1)
+
+    def test_fuera_de_tolerancia_o_monto_distinto(self):
+        viejo = self._pago(3000, dias=pagos.TOLERANCIA_DIAS + 2)
+        otro_monto = self._pago(3100)
+        lineas = [self._linea(3000), self._linea(3200, numero=3)]
+        coincidencias, sin_pago, sin_linea = pagos.conciliar(self.shopper, lineas)
+        self.assertEqual(coincidencias, [])
+        self.assertEqual([l["linea"] for l in sin_pago], [2, 3])
+        self.assertEqual({p.pk for p in sin_linea}, {viejo.pk, otro_monto.pk})
+
+    def test_cada_pago_se_usa_una_vez(self):
+        pago = self._pago(4000)
+        coincidencias, sin_pago, _ = pagos.conciliar(self.shopper, [self._linea(4000), self._linea(4000, numero=3)])
+        self.assertEqual([c["pago"].pk for c in coincidencias], [pago.pk])
+        self.assertEqual([l["linea"] for l in sin_pago], [3])
+
+    def test_no_mira_pagos_de_otros_shoppers(self):
+        otro = crear_shopper("otro_shopper")
+        self._pago(6000, pedido=crear_pedido(self.cliente, otro))
+        coincidencias, sin_pago, sin_linea = pagos.conciliar(self.shopper, [self._linea(6000)])
+        self.assertEqual((coincidencias, len(sin_pago), sin_linea), ([], 1, []))
+
+
+@ajustes_prueba
+class PagosPendientesVistaTests(TestCase):
+    def setUp(self):
+        self.shopper = crear_shopper()
+        self.pedido = crear_pedido(crear_cliente(), self.shopper)
+        self.pago = crear_pago(self.pedido, 12500, aprobado=False, creado_por="CLIENTE")
+        self.client.force_login(self.shopper.user)
+        self.url = reverse("shopper_pagos_pendientes")
+
+    def test_conciliar_extracto(self):
+        fecha = timezone.localdate().strftime("%d/%m/%Y")
+        extracto = SimpleUploadedFile("extracto.csv", f"fecha;monto\n{fecha};12.500,00\n".encode())
+        response = self.client.post(self.url, {"accion": "conciliar", "extracto": extracto})
+        self.assertEqual(response.status_code, 200)
+        conciliacion = response.context["conciliacion"]
+        self.assertEqual([c["pago"].pk for c in conciliacion["coincidencias"]], [self.pago.pk])
+        self.assertEqual(response.context["filas"][0]["marcado"], True)
+
+    def test_conciliar_sin_archivo(self):
+        response = self.client.post(self.url, {"accion": "conciliar"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["error_extracto"])
+
+    def test_aprobar(self):
+        response = self.client.post(self.url, {"accion": "aprobar", "pago_ids": [str(self.pago.pk)]})
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.pago.refresh_from_db()
+        self.assertTrue(self.pago.aprobado)
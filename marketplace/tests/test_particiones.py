@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 22:52:17 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_particiones.py
+# Particionado mensual de pagos y gastos (solo Postgres): la conversión de la
+# migración 0022 reparte lo existente por mes, y el mantenimiento crea meses
+# nuevos (rescatando lo que cayó en DEFAULT) y desprende los viejos.
+
+import importlib
+import unittest
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import connection
+from django.test import TestCase
+
+from marketplace import particiones
+from marketplace.models import Payment
+
+from .datos import crear_cliente, crear_pago, crear_pedido
+
+migracion = importlib.import_module("marketplace.migrations.0022_particionar_pagos_gastos")
+
+TABLA = "prueba_particiones"
+
+
+def _fecha(anio, mes, dia=1):
+    return datetime(anio, mes, dia, 12, tzinfo=dt_timezone.utc)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "Particiones solo en Postgres")
+class ParticionesTests(TestCase):
+    def _ubicacion(self, tabla):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT tableoid::regclass::text, count(*) FROM {tabla} GROUP BY 1")
+            return dict(cursor.fetchall())
+
+    def test_conversion_reparte_por_mes(self):
+        hoy = date.today().replace(day=1)
+        en_curso = _fecha(hoy.year, hoy.month)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE {TABLA} (id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY, "
+                "creado timestamptz NOT NULL, monto integer NOT NULL CHECK (monto >= 0))"
+            )
+            cursor.execute(f"CREATE INDEX {TABLA}_creado ON {TABLA} (creado)")
+            cursor.executemany(
+                f"INSERT INTO {TABLA} (creado, monto) VALUES (%s, 1)",
+                [(_fecha(2024, 11, 3),), (_fecha(2025, 1, 20),), (_fecha(2025, 1, 31),), (en_curso,)],
+            )
+            migracion._particionar_tabla(cursor, connection.ops.quote_name, TABLA)
+            nombres = {nombre for nombre, _, _ in particiones.listar(TABLA, cursor)}
+            cursor.execute(f"INSERT INTO {TABLA} (creado, monto) VALUES (now(), 2) RETURNING id")
+            nuevo_id = cursor.fetchone()[0]
+
+        actual = f"{TABLA}_p{hoy:%Y%m}"
+        self.assertEqual(
+            self._ubicacion(TABLA),
+            {f"{TABLA}_p202411": 1, f"{TABLA}_p202501": 2, actual: 2},
+        )
+        # Un mes por partición desde el primero con datos, sin "legado"
+        self.assertIn(f"{TABLA}_p202412", nombres)
+        self.assertIn(f"{TABLA}_default", nombres)
+        self.assertFalse(any("legado" in nombre for nombre in nombres))
+        self.assertEqual(nuevo_id, 5)
+
+    def test_crear_rescata_lo_que_cayo_en_default(self):
+        pedido = crear_pedido(crear_cliente())
+        lejano = _fecha(date.today().year + 5, 3, 10)
+        pago = crear_pago(pedido, 100)
+        Payment.objects.filter(pk=pago.pk).update(creado=lejano)
+        tabla = Payment._meta.db_table
+        self.assertEqual(self._ubicacion(tabla), {f"{tabla}_default": 1})
+
+        creadas = particiones.crear_particiones(tabla, 0, desde=lejano.date())
+        self.assertEqual(creadas, [f"{tabla}_p{lejano:%Y%m}"])
+        self.assertEqual(self._ubicacion(tabla), {creadas[0]: 1})
+        self.assertEqual(particiones.crear_particiones(tabla, 0, desde=lejano.date()), [])
+
+    def test_desprender_anteriores(self):
+        tabla = Payment._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE {tabla}_p200001 PARTITION OF {tabla} FOR VALUES FROM ('2000-01-01') TO ('2000-02-01')"
+            )
+        self.assertEqual(particiones.desprender_anteriores(tabla, date(2000, 2, 1)), [f"{tabla}_p200001"])
+        nombres = {nombre for nombre, _, _ in particiones.listar(tabla)}
+        self.assertNotIn(f"{tabla}_p200001", nombres)
+        self.assertIn(f"{tabla}_default", nombres)
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:40:18 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_reportes.py
+# P&L mensual (reportes.py): montos por mes y moneda, mes de entrega estable
+# e invalidación del cache compartido.
+
+import shutil
+import tempfile
+from datetime import date, datetime
+
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace import pagos, reportes
+from marketplace.admin import _accion_cambiar_estado
+from marketplace.models import Expense, Order
+
+from .datos import ajustes_prueba, crear_cliente, crear_pago, crear_pedido, crear_shopper
+
+
+def _fecha(anio, mes, dia):
+    return timezone.make_aware(datetime(anio, mes, dia, 12))
+
+
+class PnlTestCase(TestCase):
+    def setUp(self):
+        self.shopper = crear_shopper()
+        self.cliente = crear_cliente()
+
+    def _entregar(self, pedido, cuando):
+        pedido.estado = "ENTREGADO"
+        pedido.save()
+        Order.objects.filter(pk=pedido.pk).update(entregado_en=cuando)
+        pedido.refresh_from_db()
+
+    def _meses(self, **kw):
+        return {(m["mes"], m["moneda"]): m for m in reportes.pnl_mensual(self.shopper.pk, **kw)}
+
+
+class PnlMensualTests(PnlTestCase):
+    def test_montos_por_mes_y_moneda(self):
+        agosto, setiembre = _fecha(2026, 8, 15), _fecha(2026, 9, 10)
+        crc = crear_pedido(self.cliente, self.shopper, precio=30000)
+        usd = crear_pedido(self.cliente, self.shopper, moneda="USD", precio=200)
+        crear_pago(crc, 20000, creado=agosto)
+        crear_pago(crc, 10000, creado=setiembre)
+        crear_pago(crc, 5000, creado=setiembre, aprobado=False, creado_por="CLIENTE")  # no cuenta
+        crear_pago(usd, 150, creado=setiembre)
+        Expense.objects.create(shopper=self.shopper, pedido=crc, categoria="ENVIO", monto=3000, creado=agosto)
+        Expense.objects.create(shopper=self.shopper, pedido=crc, categoria="PRODUCTO", monto=4000, creado=agosto)
+        Expense.objects.create(shopper=self.shopper, categoria="VUELO", monto=6000, creado=setiembre)
+        Expense.objects.create(shopper=self.shopper, pedido=usd, categoria="ENVIO", monto=30, moneda="USD", creado=setiembre)
+        self._entregar(crc, agosto)
+
+        meses = self._meses()
+        # Del mes más reciente al más viejo
+        self.assertEqual(list(meses), [(date(2026, 9, 1), "USD"), (date(2026, 9, 1), "CRC"), (date(2026, 8, 1), "CRC")])
+
+        ago = meses[(date(2026, 8, 1), "CRC")]
+        self.assertEqual(ago["ingresos"], 20000)
+        self.assertEqual(ago["gastos_pedido"], {"ENVIO": 3000, "PRODUCTO": 4000})
+        self.assertEqual((ago["gastos_pedidos"], ago["gastos_generales"], ago["neto"]), (7000, 0, 13000))
+        self.assertEqual((ago["entregados"], ago["margen_por_pedido"], ago["margen_pct"]), (1, 13000, 65.0))
+
+        sep = meses[(date(2026, 9, 1), "CRC")]
+        self.assertEqual((sep["ingresos"], sep["gastos_generales"], sep["neto"]), (10000, 6000, 4000))
+        self.assertEqual((sep["entregados"], sep["margen_por_pedido"]), (0, None))
+
+        sep_usd = meses[(date(2026, 9, 1), "USD")]
+        self.assertEqual((sep_usd["ingresos"], sep_usd["gastos_pedidos"], sep_usd["neto"]), (150, 30, 120))
+
+        self.assertEqual({m["moneda"] for m in reportes.pnl_mensual(self.shopper.pk, moneda="USD")}, {"USD"})
+
+    def test_solo_del_shopper(self):
+        otro = crear_shopper("otro_shopper")
+        crear_pago(crear_pedido(self.cliente, otro), 9999)
+        Expense.objects.create(shopper=otro, categoria="VUELO", monto=1)
+        self.assertEqual(reportes.pnl_mensual(self.shopper.pk), [])
+
+
+class EntregadoEnTests(PnlTestCase):
+    def test_se_fija_al_entregar_y_no_se_mueve(self):
+        pedido = crear_pedido(self.cliente, self.shopper)
+        self.assertIsNone(pedido.entregado_en)
+        pedido.estado = "ENTREGADO"
+        pedido.save()
+        entregado_en = pedido.entregado_en
+        self.assertIsNotNone(entregado_en)
+
+        pedido.titulo = "Editado después"
+        pedido.save()
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.entregado_en, entregado_en)
+
+    def test_se_borra_si_deja_de_estar_entregado(self):
+        pedido = crear_pedido(self.cliente, self.shopper, estado="ENTREGADO")
+        self.assertIsNotNone(pedido.entregado_en)
+        pedido.estado = "EN_TRANSITO"
+        pedido.save()
+        self.assertIsNone(pedido.entregado_en)
+
+    def test_ediciones_posteriores_no_cambian_el_mes(self):
+        pedido = crear_pedido(self.cliente, self.shopper)
+        self._entregar(pedido, _fecha(2026, 7, 20))
+        pago = crear_pago(pedido, 1000, aprobado=False, creado_por="CLIENTE", creado=_fecha(2026, 7, 21))
+        pagos.aprobar_pagos(self.shopper, [pago.pk])  # toca actualizado del pedido
+        meses = self._meses()
+        self.assertEqual(meses[(date(2026, 7, 1), "CRC")]["entregados"], 1)
+
+    def test_accion_del_admin(self):
+        entregado = crear_pedido(self.cliente, self.shopper)
+        self._entregar(entregado, _fecha(2026, 6, 5))
+        nuevo = crear_pedido(self.cliente, self.shopper)
+        accion = _accion_cambiar_estado("ENTREGADO", "Entregado")
+        request = RequestFactory().post("/")
+        request._messages = _SinMensajes()
+        accion(site._registry[Order], request, Order.objects.filter(pk__in=[entregado.pk, nuevo.pk]))
+
+        entregado.refresh_from_db()
+        nuevo.refresh_from_db()
+        self.assertEqual(entregado.entregado_en, _fecha(2026, 6, 5))
+        self.assertIsNotNone(nuevo.entregado_en)
+
+        accion = _accion_cambiar_estado("CANCELADO", "Cancelado")
+        accion(site._registry[Order], request, Order.objects.filter(pk=nuevo.pk))
+        nuevo.refresh_from_db()
+        self.assertIsNone(nuevo.entregado_en)
+
+
+class _SinMensajes:
+    def add(self, *args, **kwargs):
+        pass
+
+
+class CacheLocalTests(PnlTestCase):
+    def test_sin_cache_compartido_se_calcula_en_vivo(self):
+        # LocMem (el cache de los tests): cada request ve lo último
+        pedido = crear_pedido(self.cliente, self.shopper)
+        crear_pago(pedido, 1000, creado=_fecha(2026, 5, 10))
+        self.assertEqual(reportes.pnl_mensual(self.shopper.pk)[0]["ingresos"], 1000)
+        pedido.pagos.update(monto=2500)  # sin señales de por medio
+        self.assertEqual(reportes.pnl_mensual(self.shopper.pk)[0]["ingresos"], 2500)
+
+
+class CacheCompartidoTests(PnlTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.carpeta = tempfile.mkdtemp()
+        cls.enterClassContext(
+            override_settings(
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                        "LOCATION": cls.carpeta,
+                    }
+                }
+            )
+        )
+        cls.addClassCleanup(shutil.rmtree, cls.carpeta, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        self.pedido = crear_pedido(self.cliente, self.shopper)
+        self.pago = crear_pago(self.pedido, 1000, creado=_fecha(2026, 5, 10))
+
+    def _ingresos(self):
+        return reportes.pnl_mensual(self.shopper.pk)[0]["ingresos"]
+
+    def test_queda_en_cache(self):
+        self.assertEqual(self._ingresos(), 1000)
+        self.pedido.pagos.update(monto=2500)  # update() no invalida
+        self.assertEqual(self._ingresos(), 1000)
+        reportes.invalidar_pnl(self.shopper.pk)
+        self.assertEqual(self._ingresos(), 2500)
+
+    def test_senales_invalidan(self):
+        self.assertEqual(self._ingresos(), 1000)
+        crear_pago(self.pedido, 500, creado=_fecha(2026, 5, 11))
+        self.assertEqual(self._ingresos(), 1500)
+        self.pago.delete()
+        self.assertEqual(self._ingresos(), 500)
+        Expense.objects.create(shopper=self.shopper, categoria="VUELO", monto=200, creado=_fecha(2026, 5, 12))
+        self.assertEqual(reportes.pnl_mensual(self.shopper.pk)[0]["neto"], 300)
+
+    def test_aprobar_en_lote_invalida_al_confirmar(self):
+        pendiente = crear_pago(self.pedido, 700, aprobado=False, creado_por="CLIENTE", creado=_fecha(2026, 5, 12))
+        self.assertEqual(self._ingresos(), 1000)
+        with self.captureOnCommitCallbacks(execute=True):
+            pagos.aprobar_pagos(self.shopper, [pendiente.pk])
+        self.assertEqual(self._ingresos(), 1700)
+
+
+@ajustes_prueba
+class ReportePnlVistaTests(PnlTestCase):
+    def test_csv(self):
+        pedido = crear_pedido(self.cliente, self.shopper)
+        crear_pago(pedido, 1000, creado=_fecha(2026, 5, 10))
+        Expense.objects.create(shopper=self.shopper, pedido=pedido, categoria="ENVIO", monto=250, creado=_fecha(2026, 5, 10))
+        self.client.force_login(self.shopper.user)
+        response = self.client.get(reverse("shopper_reporte_pnl"), {"formato": "csv"})
+        self.assertEqual(response.status_code, 200)
+        filas = response.content.decode().splitlines()
+        self.assertEqual(filas[0].split(",")[:4], ["mes", "moneda", "ingresos", "gasto_envio"])
+        self.assertEqual(filas[1].split(",")[:4], ["2026-05", "CRC", "1000", "250"])
+
+    def test_html(self):
+        self.client.force_login(self.shopper.user)
+        self.assertEqual(self.client.get(reverse("shopper_reporte_pnl")).status_code, 200)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:58:12 2026
+
+@author: jvz16
+"""
+
+# marketplace/tests/test_sincronizacion.py
+# Sincronización incremental (sincronizacion.py): cursores, páginas, lápidas
+# de borrados y los códigos de la API.
+
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace import sincronizacion
+from marketplace.models import Borrado, Expense
+
+from .datos import ajustes_prueba, crear_cliente, crear_pago, crear_pedido, crear_shopper
+
+
+def _ids(pagina, clave):
+    return [fila["id"] for fila in pagina["cambios"][clave]]
+
+
+@override_settings(SYNC_MARGEN_SEGUNDOS=0)
+class SincronizarTests(TestCase):
+    def setUp(self):
+        self.shopper = crear_shopper()
+        self.cliente = crear_cliente()
+        self.pedido = crear_pedido(self.cliente, self.shopper)
+
+    def _sync(self, cursor=None, rol="shopper", perfil=None, **kw):
+        return sincronizacion.sincronizar(rol, perfil or self.shopper, cursor, **kw)
+
+    def test_completa_y_despues_solo_lo_cambiado(self):
+        pago = crear_pago(self.pedido, 1000)
+        primera = self._sync()
+        self.assertEqual(_ids(primera, "pedidos"), [self.pedido.pk])
+        self.assertEqual(_ids(primera, "pagos"), [pago.pk])
+        self.assertFalse(primera["mas"])
+
+        self.assertEqual(self._sync(primera["cursor"])["cambios"]["pagos"], [])
+        pago.monto = 1500
+        pago.save()
+        segunda = self._sync(primera["cursor"])
+        self.assertEqual(segunda["cambios"]["pagos"][0]["monto"], 1500)
+        self.assertEqual(segunda["cambios"]["pedidos"], [])
+
+    def test_colecciones_por_rol(self):
+        self.assertNotIn("viajes", self._sync(rol="cliente", perfil=self.cliente)["cambios"])
+        self.assertIn("viajes", self._sync()["cambios"])
+
+    def test_paginas(self):
+        pagos = [crear_pago(self.pedido, 100 + i).pk for i in range(5)]
+        vistos, cursor = [], None
+        for _ in range(3):
+            pagina = self._sync(cursor, limite=2)
+            vistos += _ids(pagina, "pagos")
+            cursor = pagina["cursor"]
+        self.assertFalse(pagina["mas"])
+        self.assertEqual(vistos, pagos)
+
+    def test_margen_retiene_lo_reciente(self):
+        with self.settings(SYNC_MARGEN_SEGUNDOS=60):
+            self.assertEqual(self._sync()["cambios"]["pedidos"], [])
+
+    def test_lapidas_de_borrados(self):
+        pago = crear_pago(self.pedido, 100)
+        gasto = Expense.objects.create(shopper=self.shopper, categoria="OTRO", monto=5)
+        cursor = self._sync()["cursor"]
+        cursor_cliente = self._sync(rol="cliente", perfil=self.cliente)["cursor"]
+        pago_id, gasto_id = pago.pk, gasto.pk
+        pago.delete()
+        gasto.delete()
+        self.assertEqual(self._sync(cursor)["borrados"], {"pagos": [pago_id], "gastos": [gasto_id]})
+        # El cliente dueño del pedido se entera del pago; el gasto general no es suyo
+        pagina = self._sync(cursor_cliente, rol="cliente", perfil=self.cliente)
+        self.assertEqual(pagina["borrados"], {"pagos": [pago_id]})
+        # Sin cursor no hay nada local que borrar
+        self.assertEqual(self._sync()["borrados"], {})
+
+    def test_reasignar_pedido(self):
+        nuevo = crear_shopper("nuevo")
+        pago = crear_pago(self.pedido, 100)
+        cursor_viejo = self._sync()["cursor"]
+        cursor_nuevo = self._sync(perfil=nuevo)["cursor"]
+        self.pedido.shopper = nuevo
+        self.pedido.save()
+        self.assertEqual(self._sync(cursor_viejo)["borrados"], {"pedidos": [self.pedido.pk]})
+        # Al nuevo le llegan el pedido y sus hijos, aunque fueran viejos
+        pagina = self._sync(cursor_nuevo, perfil=nuevo)
+        self.assertEqual(_ids(pagina, "pedidos"), [self.pedido.pk])
+        self.assertEqual(_ids(pagina, "pagos"), [pago.pk])
+
+    def test_cursor_vencido(self):
+        cursor = self._sync()["cursor"]
+        Borrado.objects.create(modelo="pagos", objeto_id=1, shopper=self.shopper)
+        with self.settings(SYNC_BORRADOS_DIAS=0), self.assertRaises(sincronizacion.CursorVencido):
+            self._sync(cursor)
+
+    def test_purgar_borrados(self):
+        viejo = Borrado.objects.create(modelo="pagos", objeto_id=1, shopper=self.shopper)
+        Borrado.objects.filter(pk=viejo.pk).update(actualizado=timezone.now() - timedelta(days=100))
+        Borrado.objects.create(modelo="pagos", objeto_id=2, shopper=self.shopper)
+        self.assertEqual(sincronizacion.purgar_borrados(90), 1)
+        self.assertEqual(list(Borrado.objects.values_list("objeto_id", flat=True)), [2])
+
+
+class CursorTests(TestCase):
+    def _crudo(self, datos):
+        return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode()
+
+    def test_ida_y_vuelta(self):
+        marcas = {"pagos": (timezone.now(), 7)}
+        cursor = sincronizacion.codificar_cursor("shopper", marcas)
+        self.assertEqual(sincronizacion.decodificar_cursor(cursor, "shopper"), marcas)
+
+    def test_invalidos(self):
+        naive = sincronizacion.codificar_cursor("shopper", {"pagos": (datetime(2026, 1, 1), 1)})
+        casos = {
+            "basura": "no-es-un-cursor",
+            "naive": naive,
+            "nulo": self._crudo({"v": 1, "rol": "shopper", "m": {"pagos": None}}),
+            "sin_marcas": self._crudo({"v": 1, "rol": "shopper"}),
+            "otra_version": self._crudo({"v": 99, "rol": "shopper", "m": {}}),
+            "otro_rol": sincronizacion.codificar_cursor("cliente", {}),
+        }
+        for nombre, cursor in casos.items():
+            with self.subTest(nombre), self.assertRaises(sincronizacion.CursorInvalido):
+                sincronizacion.decodificar_cursor(cursor, "shopper")
+
+
+@ajustes_prueba
+@override_settings(SYNC_MARGEN_SEGUNDOS=0)
+class ApiSyncTests(TestCase):
+    def setUp(self):
+        self.shopper = crear_shopper()
+        self.url = reverse("api_sync")
+
+    def test_sin_sesion_401(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_respuestas(self):
+        self.client.force_login(self.shopper.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "private, no-store")
+        self.assertEqual(response.json()["rol"], "shopper")
+        self.assertEqual(self.client.get(self.url, {"rol": "cliente"}).status_code, 403)
+        self.assertEqual(self.client.get(self.url, {"rol": "admin"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"cursor": "basura"}).status_code, 400)
+
+    def test_cursor_vencido_410(self):
+        self.client.force_login(self.shopper.user)
+        viejo = timezone.now() - timedelta(days=365)
+        cursor = sincronizacion.codificar_cursor("shopper", {"borrados": (viejo, 0)})
+        response = self.client.get(self.url, {"cursor": cursor})
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.json()["reiniciar"])
+
+    def test_post_405(self):
+        self.client.force_login(self.shopper.user)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
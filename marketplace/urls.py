@@ -10,6 +10,7 @@ Created on Sun Dec  7 13:27:25 2025
 from django.urls import path
 from django.contrib.auth import views as auth_views
 
+from marketplace import api
 from marketplace import views as marketplace_views
 
 urlpatterns = [
@@ -69,6 +70,13 @@ urlpatterns = [
         name="shopper_update_order_status",
     ),
 
+    # Pagos reportados por clientes: aprobación en lote / conciliación
+    path(
+        "dashboard/shopper/pagos-pendientes/",
+        marketplace_views.shopper_pagos_pendientes,
+        name="shopper_pagos_pendientes",
+    ),
+
     # Gastos shopper
     path(
         "dashboard/shopper/gastos-generales/",
@@ -76,6 +84,37 @@ urlpatterns = [
         name="shopper_gastos_generales",
     ),
 
+    # Feed en vivo de pedidos abiertos (Server-Sent Events, ASGI)
+    path(
+        "dashboard/shopper/novedades/",
+        marketplace_views.shopper_novedades,
+        name="shopper_novedades",
+    ),
+
+    # Estado de resultados mensual (shopper)
+    path(
+        "dashboard/shopper/reporte/",
+        marketplace_views.shopper_reporte_pnl,
+        name="shopper_reporte_pnl",
+    ),
+
+    # Exportar libros del shopper (CSV / XLSX en streaming)
+    path(
+        "dashboard/shopper/exportar/<slug:que>.<slug:formato>",
+        marketplace_views.shopper_exportar,
+        name="shopper_exportar",
+    ),
+
     # Mi perfil
     path("mi-perfil/", marketplace_views.mi_perfil, name="mi_perfil"),
+
+    # API: sincronización incremental (app móvil)
+    path("api/v1/sync/", marketplace_views.api_sync, name="api_sync"),
+
+    # API JSON de solo lectura (ver marketplace/api.py)
+    path("api/v1/<slug:recurso>/", api.lista, name="api_lista"),
+    path("api/v1/<slug:recurso>/<int:pk>/", api.detalle, name="api_detalle"),
+
+    # Métricas (Prometheus)
+    path("metrics", marketplace_views.metrics, name="metrics"),
 ]
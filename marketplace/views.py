@@ -5,13 +5,21 @@ Created on Sun Dec  7 13:27:58 2025
 @author: jvz16
 """
 
-from datetime import timedelta
+import csv
+from datetime import date, datetime, time, timedelta
 
+from asgiref.sync import sync_to_async
+from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Sum, Count, Avg, Q
-from django.shortcuts import get_object_or_404, redirect, render
+from django.db.models.functions import TruncMonth
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 
@@ -27,19 +35,26 @@ from .models import (
     Trip,
     CarouselSlide,
     HeroBackground,
-    CURRENCY_CHOICES,
+    PedidoArchivado,
 )
+from . import archivo, exportar, limites, metricas, novedades, pagos, ranking, reportes, sincronizacion
+from .http_cache import pagina_publica
+from .huecos import olvidar_datos_usuario
+from .tarjetas import datos_tarjeta
 from .forms import (
     OrderForm,
     PaymentForm,
     ExpenseProductoForm,
     ExpenseGeneralForm,
+    ExpenseGeneralFormSet,
     CustomerSignUpForm,
     ShopperSignUpForm,
     ShopperProfileForm,
+    TripForm,
 )
 
 
+@limites.limitar("login", por_cuenta="username")
 class RoleBasedLoginView(LoginView):
     template_name = "marketplace/auth_login.html"
     redirect_authenticated_user = True
@@ -70,9 +85,7 @@ def get_top_shoppers_for_customer(customer_profile, limit=5):
     if distrito:
         qs = qs.filter(distrito=distrito)
 
-    qs = qs.annotate(
-        pedidos_completados_count=Count("pedidos")
-    ).order_by("-calificacion", "-pedidos_completados_count")
+    qs = qs.order_by("-puntaje_ranking", "-creado")
 
     return qs[:limit]
 
@@ -82,31 +95,36 @@ def _chunk_list(items, size=2):
     return [items[i : i + size] for i in range(0, len(items), size)]
 
 
-def home(request):
-    es_cliente = False
-    es_shopper = False
-    if request.user.is_authenticated:
-        es_cliente = CustomerProfile.objects.filter(user=request.user).exists()
-        es_shopper = ShopperProfile.objects.filter(user=request.user).exists()
+# =========================
+# Helpers async (ORM async + render en hilo)
+# =========================
+async def _alist(qs):
+    """
+    Evalúa un queryset con iteración async (no bloquea el event loop).
+    """
+    return [obj async for obj in qs]
 
-    shoppers_qs = ShopperProfile.objects.all()
 
-    shoppers = []
-    if not es_shopper:
-        shoppers = shoppers_qs.order_by("-calificacion", "-creado")[:6]
+async def _arender(request, template_name, context=None):
+    """
+    Los templates todavía resuelven relaciones de forma perezosa
+    (shopper.user, pedido.total_pagos, user.shopperprofile en base.html…),
+    así que el render se hace en un hilo sync para no chocar con
+    SynchronousOnlyOperation.
+    """
+    return await sync_to_async(render)(request, template_name, context)
 
-    en_usa_qs = ShopperProfile.objects.filter(
-        actualmente_en_el_extranjero=True
-    ).filter(
-        Q(pais_extranjero__icontains="usa")
-        | Q(pais_extranjero__icontains="estados unidos")
-        | Q(pais_extranjero__icontains="united states")
-        | Q(pais_extranjero__icontains="eeuu")
-    ).order_by("-calificacion", "-actualizado", "-creado")
 
-    en_usa_ahora = list(en_usa_qs)
-    en_usa_slides = _chunk_list(en_usa_ahora, size=2)
+def _filtro_usa(campo):
+    return (
+        Q(**{f"{campo}__icontains": "usa"})
+        | Q(**{f"{campo}__icontains": "estados unidos"})
+        | Q(**{f"{campo}__icontains": "united states"})
+        | Q(**{f"{campo}__icontains": "eeuu"})
+    )
+
 
+async def _home_viajan_pronto():
     hoy = timezone.now().date()
     limite = hoy + timedelta(days=7)
 
@@ -114,55 +132,93 @@ def home(request):
         fecha_inicio__gte=hoy,
         fecha_inicio__lte=limite,
     ).filter(
-        Q(pais_destino__icontains="usa")
-        | Q(pais_destino__icontains="estados unidos")
-        | Q(pais_destino__icontains="united states")
-        | Q(pais_destino__icontains="eeuu")
-    ).select_related("shopper").order_by("fecha_inicio", "-shopper__calificacion")
+        _filtro_usa("pais_destino")
+    ).select_related("shopper", "shopper__user", "shopper__photo").order_by("fecha_inicio", "-shopper__puntaje_ranking")
 
     seen = set()
     viajan_pronto_items = []
-    for t in trips_qs:
+    async for t in trips_qs:
         if t.shopper_id in seen:
             continue
         seen.add(t.shopper_id)
-        viajan_pronto_items.append({"shopper": t.shopper, "trip": t})
+        destino = t.ciudad_destino
+        if t.pais_destino:
+            destino += f", {t.pais_destino}"
+        viajan_pronto_items.append(
+            datos_tarjeta(
+                t.shopper,
+                chip=f"VIAJA {t.fecha_inicio:%d/%m}",
+                chip_clase="ps-chip-soon",
+                destino=destino,
+            )
+        )
+    return viajan_pronto_items
 
-    viajan_pronto_slides = _chunk_list(viajan_pronto_items, size=2)
 
-    stats_shoppers = shoppers_qs.count()
-    stats_orders = Order.objects.filter(estado="ENTREGADO").count()
-    avg_rating_raw = Review.objects.aggregate(avg=Avg("rating"))["avg"] or 0
-    stats_rating = round(float(avg_rating_raw), 1) if avg_rating_raw else 0.0
+async def _home_stats_orders():
+    # Los entregados viejos viven en el archivo (ver archivo.py)
+    vivos = await Order.objects.filter(estado="ENTREGADO").acount()
+    return vivos + await PedidoArchivado.objects.filter(estado="ENTREGADO").acount()
 
-    carousel_slides = CarouselSlide.objects.filter(activo=True).order_by("orden", "-creado")
 
+async def _home_stats_rating():
+    agg = await Review.objects.aaggregate(avg=Avg("rating"))
+    avg_rating_raw = agg["avg"] or 0
+    return round(float(avg_rating_raw), 1) if avg_rating_raw else 0.0
 
-    # NUEVO: fondo del hero (último activo)
-    hero_bg = HeroBackground.objects.filter(activo=True).order_by("-creado").first()
 
+@pagina_publica(
+    "home",
+    surrogate_keys=lambda kw: ["home", "shoppers", "trips", "reviews", "slides"],
+    por_dia=True,
+    cache_pagina=True,
+)
+async def home(request):
+    # Lo que depende del usuario (navbar, botones del hero, vitrina) va en
+    # huecos: esta vista renderiza lo mismo para todos (ver huecos.py).
+    shoppers_qs = ShopperProfile.objects.select_related("user", "photo")
+
+    en_usa_qs = shoppers_qs.filter(
+        actualmente_en_el_extranjero=True
+    ).filter(
+        _filtro_usa("pais_extranjero")
+    ).order_by("-puntaje_ranking", "-actualizado", "-creado")
+
+    # El ORM async manda cada consulta al hilo de la conexión, una detrás de
+    # otra (sync_to_async thread_sensitive): se esperan en secuencia.
+    shoppers = await _alist(shoppers_qs.order_by("-puntaje_ranking", "-creado")[:6])
+    en_usa_ahora = await _alist(en_usa_qs)
+    viajan_pronto_items = await _home_viajan_pronto()
+    stats_shoppers = await ShopperProfile.objects.acount()
+    stats_orders = await _home_stats_orders()
+    stats_rating = await _home_stats_rating()
+    carousel_slides = await _alist(CarouselSlide.objects.filter(activo=True).order_by("orden", "-creado"))
+    # NUEVO: fondo del hero (último activo)
+    hero_bg = await HeroBackground.objects.filter(activo=True).order_by("-creado").afirst()
 
     context = {
-        "shoppers": shoppers,
-        "es_cliente": es_cliente,
-        "es_shopper": es_shopper,
+        "shoppers": [datos_tarjeta(s) for s in shoppers],
         "stats_shoppers": stats_shoppers,
         "stats_orders": stats_orders,
         "stats_rating": stats_rating,
         "en_usa_ahora": en_usa_ahora,
-        "en_usa_slides": en_usa_slides,
+        "en_usa_slides": _chunk_list(
+            [datos_tarjeta(s, chip="EN EE. UU.", chip_clase="ps-chip-usa") for s in en_usa_ahora],
+            size=2,
+        ),
         "viajan_pronto_items": viajan_pronto_items,
-        "viajan_pronto_slides": viajan_pronto_slides,
+        "viajan_pronto_slides": _chunk_list(viajan_pronto_items, size=2),
         "carousel_slides": carousel_slides,
         "hero_bg": hero_bg,
     }
-    return render(request, "marketplace/home.html", context)
+    return await _arender(request, "marketplace/home.html", context)
 
 
-def shopper_detail(request, pk):
-    shopper = get_object_or_404(ShopperProfile, pk=pk)
-    pedidos_atendidos = shopper.pedidos.count()
-    return render(
+@pagina_publica("shopper", surrogate_keys=lambda kw: ["shoppers", f"shopper-{kw['pk']}"])
+async def shopper_detail(request, pk):
+    shopper = await aget_object_or_404(ShopperProfile.objects.select_related("user"), pk=pk)
+    pedidos_atendidos = await shopper.pedidos.acount() + await shopper.pedidos_archivados.acount()
+    return await _arender(
         request,
         "marketplace/shopper_detail.html",
         {"shopper": shopper, "pedidos_atendidos": pedidos_atendidos},
@@ -185,6 +241,7 @@ def register_customer(request):
     return render(request, "marketplace/auth_register_customer.html", {"form": form})
 
 
+@limites.limitar("registro")
 def register_shopper(request):
     if request.user.is_authenticated:
         return redirect("home")
@@ -235,8 +292,6 @@ def mi_perfil(request):
         shopper_profile = None
 
     if shopper_profile:
-        from .forms import TripForm
-
         profile_form = ShopperProfileForm(instance=shopper_profile)
         trip_form = TripForm()
 
@@ -250,6 +305,7 @@ def mi_perfil(request):
                 profile_form = ShopperProfileForm(request.POST, request.FILES, instance=shopper_profile)
                 if profile_form.is_valid():
                     profile_form.save()
+                    olvidar_datos_usuario(request)
 
                     foto_file = request.FILES.get("foto_archivo")
                     if foto_file:
@@ -303,50 +359,64 @@ def mi_perfil(request):
 
 
 @login_required
-def shopper_dashboard(request):
-    shopper_profile = get_object_or_404(ShopperProfile, user=request.user)
+async def shopper_dashboard(request):
+    user = await request.auser()
+    shopper_profile = await aget_object_or_404(ShopperProfile, user=user)
 
-    pedidos = (
-        shopper_profile.pedidos.select_related("customer")
+    pedidos_qs = (
+        shopper_profile.pedidos.select_related("customer", "customer__user")
         .prefetch_related("pagos", "gastos", "articulos")
         .order_by("-creado")
     )
 
-    total_ingresos = (
-        Payment.objects.filter(pedido__shopper=shopper_profile, aprobado=True)
-        .aggregate(total=Sum("monto"))["total"]
-        or 0
-    )
-
-    gastos_generales = (
-        Expense.objects.filter(shopper=shopper_profile, pedido__isnull=True)
-        .aggregate(total=Sum("monto"))["total"]
-        or 0
-    )
+    pedidos_abiertos_qs = Order.objects.filter(
+        shopper__isnull=True, estado="BUSCANDO_SHOPPER"
+    ).select_related("customer", "customer__user").prefetch_related("articulos").order_by("-creado")
 
-    gastos_por_pedido = (
-        Expense.objects.filter(shopper=shopper_profile, pedido__isnull=False)
-        .aggregate(total=Sum("monto"))["total"]
-        or 0
-    )
+    # En secuencia: el ORM async no corre consultas en paralelo (ver home).
+    # Totales históricos: salen del P&L mensual (incluye pedidos archivados)
+    pedidos = await _alist(pedidos_qs)
+    pnl = await sync_to_async(reportes.pnl_mensual)(shopper_profile.pk)
+    pedidos_abiertos = await _alist(pedidos_abiertos_qs)
 
+    total_ingresos = sum(m["ingresos"] for m in pnl)
+    gastos_generales = sum(m["gastos_generales"] for m in pnl)
+    gastos_por_pedido = sum(m["gastos_pedidos"] for m in pnl)
     ganancia_neta = total_ingresos - gastos_generales - gastos_por_pedido
-
-    pedidos_abiertos = Order.objects.filter(
-        shopper__isnull=True, estado="BUSCANDO_SHOPPER"
-    ).select_related("customer").prefetch_related("articulos").order_by("-creado")
+    # Los pagos ya vienen en el prefetch: contar pendientes no cuesta consultas
+    pagos_pendientes_count = sum(1 for p in pedidos for pago in p.pagos.all() if not pago.aprobado)
 
     context = {
         "shopper": shopper_profile,
         "pedidos": pedidos,
+        "pagos_pendientes_count": pagos_pendientes_count,
         "total_ingresos": total_ingresos,
         "gastos_generales": gastos_generales,
         "gastos_por_pedido": gastos_por_pedido,
         "ganancia_neta": ganancia_neta,
         "pedidos_abiertos": pedidos_abiertos,
-        "pedidos_abiertos_count": pedidos_abiertos.count(),
+        "pedidos_abiertos_count": len(pedidos_abiertos),
     }
-    return render(request, "marketplace/shopper_dashboard.html", context)
+    return await _arender(request, "marketplace/shopper_dashboard.html", context)
+
+
+@login_required
+async def shopper_novedades(request):
+    """
+    Server-Sent Events con los pedidos abiertos que aparecen / se toman /
+    se cancelan (ver marketplace/novedades.py).
+    """
+    user = await request.auser()
+    await aget_object_or_404(ShopperProfile, user=user)
+    if not isinstance(request, ASGIRequest):
+        # Bajo WSGI cada conexión abierta ocuparía un worker: 204 le dice al
+        # EventSource que no reintente y el panel queda como antes (recargar).
+        # El feed necesita el arranque ASGI (gunicorn_asgi.conf.py).
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(novedades.transmitir(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-store"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @login_required
@@ -416,11 +486,15 @@ def shopper_tomar_pedido(request, pk):
 @login_required
 def shopper_order_detail(request, pk):
     shopper_profile = get_object_or_404(ShopperProfile, user=request.user)
-    pedido = get_object_or_404(Order, pk=pk, shopper=shopper_profile)
+    pedido, archivado = archivo.obtener_pedido(pk, shopper=shopper_profile)
 
     pago_form = PaymentForm()
     gasto_form = ExpenseProductoForm()
 
+    if request.method == "POST" and archivado:
+        # Archivado = cerrado: solo lectura
+        return redirect("shopper_order_detail", pk=pedido.pk)
+
     if request.method == "POST":
         # Cambiar estado desde dropdown (en el detalle)
         if "guardar_estado" in request.POST:
@@ -514,68 +588,274 @@ def shopper_order_detail(request, pk):
         "gasto_form": gasto_form,
         "whatsapp_cliente": whatsapp_cliente,  # shopper -> cliente
         "pagos_pendientes": pagos_pendientes,
+        "archivado": archivado,
     }
     return render(request, "marketplace/shopper_order_detail.html", context)
 
 
 
 @login_required
-def shopper_gastos_generales(request):
+def shopper_pagos_pendientes(request):
+    """
+    Cola de pagos reportados por clientes (todos los pedidos del shopper):
+    aprobar / rechazar varios de una vez y conciliar contra el extracto del banco.
+    """
     shopper_profile = get_object_or_404(ShopperProfile, user=request.user)
+    conciliacion = None
+    error_extracto = None
+
+    if request.method == "POST":
+        accion = request.POST.get("accion")
+        ids = [i for i in request.POST.getlist("pago_ids") if i.isdigit()]
+
+        if accion == "aprobar":
+            n = pagos.aprobar_pagos(shopper_profile, ids)
+            messages.success(request, f"{n} pago(s) aprobados.")
+            return redirect("shopper_pagos_pendientes")
+
+        if accion == "rechazar":
+            n = pagos.rechazar_pagos(shopper_profile, ids)
+            messages.success(request, f"{n} pago(s) rechazados.")
+            return redirect("shopper_pagos_pendientes")
+
+        if accion == "conciliar":
+            extracto = request.FILES.get("extracto")
+            if not extracto:
+                error_extracto = "Subí el extracto del banco en CSV."
+            else:
+                try:
+                    lineas = pagos.leer_extracto(extracto)
+                except (ValueError, csv.Error) as e:
+                    error_extracto = str(e)
+                else:
+                    coincidencias, sin_pago, sin_linea = pagos.conciliar(shopper_profile, lineas)
+                    conciliacion = {
+                        "coincidencias": coincidencias,
+                        "lineas_sin_pago": sin_pago,
+                        "pagos_sin_linea": sin_linea,
+                        "total_lineas": len(lineas),
+                    }
+
+    if conciliacion is not None:
+        filas = [{"pago": c["pago"], "linea": c["linea"], "marcado": True} for c in conciliacion["coincidencias"]]
+        filas += [{"pago": p, "linea": None, "marcado": False} for p in conciliacion["pagos_sin_linea"]]
+    else:
+        pendientes = (
+            Payment.objects.filter(pedido__shopper=shopper_profile, aprobado=False)
+            .select_related("pedido", "pedido__customer__user")
+            .order_by("-creado")
+        )
+        filas = [{"pago": p, "linea": None, "marcado": False} for p in pendientes]
+
+    return render(
+        request,
+        "marketplace/shopper_pagos_pendientes.html",
+        {
+            "shopper": shopper_profile,
+            "filas": filas,
+            "conciliacion": conciliacion,
+            "error_extracto": error_extracto,
+        },
+    )
+
+
+def _mes_desde_param(valor):
+    """
+    "2026-03" -> date(2026, 3, 1). None si falta o no es válido.
+    """
+    try:
+        anio, mes = (int(x) for x in (valor or "").split("-"))
+        return date(anio, mes, 1)
+    except ValueError:
+        return None
+
 
-    gastos = Expense.objects.filter(
-        shopper=shopper_profile, pedido__isnull=True
-    ).order_by("-creado")
+def _rango_mes(mes):
+    """
+    [inicio, fin) del mes en la zona horaria local (para filtrar `creado`).
+    """
+    siguiente = date(mes.year + (mes.month == 12), mes.month % 12 + 1, 1)
+    tz = timezone.get_current_timezone()
+    return (
+        datetime.combine(mes, time.min, tzinfo=tz),
+        datetime.combine(siguiente, time.min, tzinfo=tz),
+    )
+
+
+@login_required
+def shopper_gastos_generales(request):
+    """
+    Gastos generales de a un mes por página. Los subtotales (por mes y por
+    categoría) salen de GROUP BY en SQL y la edición es un formset que se
+    guarda con un solo bulk_update.
+    """
+    shopper_profile = get_object_or_404(ShopperProfile, user=request.user)
+    gastos_qs = Expense.objects.filter(shopper=shopper_profile, pedido__isnull=True)
+
+    # Meses con gastos y su total por moneda (una consulta)
+    meses = []
+    for fila in (
+        gastos_qs.annotate(mes=TruncMonth("creado"))
+        .values("mes", "moneda")
+        .annotate(total=Sum("monto"), cantidad=Count("id"))
+        .order_by("-mes", "moneda")
+    ):
+        mes_fila = timezone.localtime(fila["mes"]).date()
+        if not meses or meses[-1]["mes"] != mes_fila:
+            meses.append({"mes": mes_fila, "totales": [], "cantidad": 0})
+        meses[-1]["totales"].append((fila["moneda"], fila["total"]))
+        meses[-1]["cantidad"] += fila["cantidad"]
+
+    mes = _mes_desde_param(request.GET.get("mes"))
+    if mes is None:
+        mes = meses[0]["mes"] if meses else timezone.localdate().replace(day=1)
+    inicio, fin = _rango_mes(mes)
+    gastos_mes = gastos_qs.filter(creado__gte=inicio, creado__lt=fin).order_by("-creado")
+    url_mes = f"{reverse('shopper_gastos_generales')}?mes={mes:%Y-%m}"
 
-    # Form de creación (mantiene tu comportamiento actual)
     form = ExpenseGeneralForm()
+    formset = None
 
     if request.method == "POST":
-        # EDITAR inline (misma fila)
-        if "edit_gasto" in request.POST:
-            gasto_id = request.POST.get("gasto_id")
-            gasto = get_object_or_404(
-                Expense,
-                pk=gasto_id,
-                shopper=shopper_profile,
-                pedido__isnull=True,
-            )
-            edit_form = ExpenseGeneralForm(request.POST, instance=gasto)
-            if edit_form.is_valid():
-                g = edit_form.save(commit=False)
-                g.shopper = shopper_profile
-                g.pedido = None
-                g.save()
-            return redirect("shopper_gastos_generales")
-
-        # CREAR nuevo gasto general
-        form = ExpenseGeneralForm(request.POST)
-        if form.is_valid():
-            gasto = form.save(commit=False)
-            gasto.shopper = shopper_profile
-            gasto.pedido = None
-            gasto.save()
-            return redirect("shopper_gastos_generales")
+        # EDITAR varias filas del mes de una vez
+        if "guardar_cambios" in request.POST:
+            formset = ExpenseGeneralFormSet(request.POST, queryset=gastos_mes)
+            if formset.is_valid():
+                # Solo filas existentes: un form extra colado en el POST no tiene pk
+                cambiados = [g for g in formset.save(commit=False) if g.pk]
+                ahora = timezone.now()
+                for gasto in cambiados:
+                    # bulk_update no dispara auto_now
+                    gasto.actualizado = ahora
+                with transaction.atomic():
+                    Expense.objects.bulk_update(
+                        cambiados, ["categoria", "monto", "descripcion", "moneda", "actualizado"]
+                    )
+                reportes.invalidar_pnl(shopper_profile.pk)
+                messages.success(request, f"{len(cambiados)} gasto(s) actualizados.")
+                return redirect(url_mes)
+        else:
+            # CREAR nuevo gasto general
+            form = ExpenseGeneralForm(request.POST)
+            if form.is_valid():
+                gasto = form.save(commit=False)
+                gasto.shopper = shopper_profile
+                gasto.pedido = None
+                gasto.save()
+                return redirect("shopper_gastos_generales")
+
+    if formset is None:
+        formset = ExpenseGeneralFormSet(queryset=gastos_mes)
+
+    etiquetas = dict(Expense.CATEGORIA_CHOICES)
+    por_categoria = [
+        {**fila, "etiqueta": etiquetas.get(fila["categoria"], fila["categoria"])}
+        for fila in gastos_mes.order_by()
+        .values("categoria", "moneda")
+        .annotate(total=Sum("monto"), cantidad=Count("id"))
+        .order_by("categoria", "moneda")
+    ]
+
+    posicion = next((i for i, m in enumerate(meses) if m["mes"] == mes), None)
+    mes_anterior = meses[posicion + 1]["mes"] if posicion is not None and posicion + 1 < len(meses) else None
+    mes_siguiente = meses[posicion - 1]["mes"] if posicion else None
 
     return render(
         request,
         "marketplace/shopper_gastos_generales.html",
         {
             "shopper": shopper_profile,
-            "gastos": gastos,
             "form": form,
-            "currency_choices": CURRENCY_CHOICES,
-            "categoria_choices": Expense.CATEGORIA_CHOICES,
+            "formset": formset,
+            "mes": mes,
+            "meses": meses,
+            "mes_anterior": mes_anterior,
+            "mes_siguiente": mes_siguiente,
+            "por_categoria": por_categoria,
+            "total_mes": next((m["totales"] for m in meses if m["mes"] == mes), []),
         },
     )
 
 
 @login_required
-def customer_dashboard(request):
-    customer_profile = get_object_or_404(CustomerProfile, user=request.user)
+def shopper_reporte_pnl(request):
+    """
+    Estado de resultados por mes (y moneda): ingresos aprobados, gastos de
+    pedidos por categoría, gastos generales, neto y margen por pedido
+    entregado. ?moneda=CRC filtra, ?formato=csv descarga.
+    """
+    shopper_profile = get_object_or_404(ShopperProfile, user=request.user)
+    todos = reportes.pnl_mensual(shopper_profile.pk)
+    moneda = request.GET.get("moneda") or None
+    meses = [m for m in todos if m["moneda"] == moneda] if moneda else todos
+
+    # Solo las categorías que aparecen, en el orden de CATEGORIA_CHOICES
+    usadas = {cat for m in meses for cat in m["gastos_pedido"]}
+    categorias = [(cat, etiqueta) for cat, etiqueta in Expense.CATEGORIA_CHOICES if cat in usadas]
+    filas = [{**m, "por_categoria": [m["gastos_pedido"].get(cat, 0) for cat, _ in categorias]} for m in meses]
+
+    if request.GET.get("formato") == "csv":
+        response = HttpResponse(content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="pnl_{shopper_profile.pk}.csv"'
+        writer = csv.writer(response)
+        writer.writerow(
+            ["mes", "moneda", "ingresos"]
+            + [f"gasto_{cat.lower()}" for cat, _ in categorias]
+            + ["gastos_pedidos", "gastos_generales", "neto", "entregados", "margen_por_pedido", "margen_pct"]
+        )
+        for f in filas:
+            writer.writerow(
+                [f"{f['mes']:%Y-%m}", f["moneda"], f["ingresos"]]
+                + f["por_categoria"]
+                + [
+                    f["gastos_pedidos"],
+                    f["gastos_generales"],
+                    f["neto"],
+                    f["entregados"],
+                    "" if f["margen_por_pedido"] is None else f["margen_por_pedido"],
+                    "" if f["margen_pct"] is None else f["margen_pct"],
+                ]
+            )
+        return response
 
-    pedidos = (
-        customer_profile.pedidos.select_related("shopper")
+    return render(
+        request,
+        "marketplace/shopper_reporte_pnl.html",
+        {
+            "shopper": shopper_profile,
+            "filas": filas,
+            "categorias": categorias,
+            "moneda": moneda,
+            "monedas": sorted({m["moneda"] for m in todos}),
+        },
+    )
+
+
+@login_required
+def shopper_exportar(request, que, formato):
+    """
+    Descarga de pedidos / pagos / gastos (o "todo" en XLSX) en streaming.
+    """
+    shopper_profile = get_object_or_404(ShopperProfile, user=request.user)
+    try:
+        nombre, contenido = exportar.exportar(shopper_profile, que, formato)
+    except KeyError:
+        raise Http404("Exportación no disponible")
+    if isinstance(request, ASGIRequest):
+        contenido = exportar.como_asincrono(contenido)
+    response = StreamingHttpResponse(contenido, content_type=exportar.FORMATOS[formato])
+    response["Content-Disposition"] = f'attachment; filename="{nombre}"'
+    response["Cache-Control"] = "private, no-store"
+    return response
+
+
+@login_required
+async def customer_dashboard(request):
+    user = await request.auser()
+    customer_profile = await aget_object_or_404(CustomerProfile, user=user)
+
+    pedidos_qs = (
+        customer_profile.pedidos.select_related("shopper", "shopper__user")
         .prefetch_related("pagos", "gastos", "articulos")
         .order_by("-creado")
     )
@@ -591,14 +871,14 @@ def customer_dashboard(request):
             rating = None
 
         if order_id and rating in [1, 2, 3, 4, 5]:
-            pedido = get_object_or_404(
-                Order,
+            pedido = await aget_object_or_404(
+                Order.objects.select_related("shopper"),
                 pk=order_id,
                 customer=customer_profile,
                 estado="ENTREGADO",
             )
-            if not Review.objects.filter(order=pedido).exists():
-                Review.objects.create(
+            if not await Review.objects.filter(order=pedido).aexists():
+                await Review.objects.acreate(
                     order=pedido,
                     shopper=pedido.shopper,
                     customer=customer_profile,
@@ -606,18 +886,19 @@ def customer_dashboard(request):
                     comment=comment,
                 )
                 if pedido.shopper:
-                    agg = Review.objects.filter(shopper=pedido.shopper).aggregate(avg=Avg("rating"))
-                    pedido.shopper.calificacion = agg["avg"] or 0
-                    pedido.shopper.save()
+                    await sync_to_async(ranking.actualizar_shopper)(pedido.shopper)
 
             return redirect("customer_dashboard")
 
-    pedidos_pendientes_resena = pedidos.filter(
-        estado="ENTREGADO",
-        review__isnull=True,
+    pedidos = await _alist(pedidos_qs)
+    pedidos_pendientes_resena = await _alist(
+        pedidos_qs.filter(
+            estado="ENTREGADO",
+            review__isnull=True,
+        )
     )
 
-    return render(
+    return await _arender(
         request,
         "marketplace/customer_dashboard.html",
         {
@@ -628,16 +909,17 @@ def customer_dashboard(request):
     )
 
 
+@limites.limitar("reportar_pago")
 @login_required
 def order_detail(request, pk):
     customer_profile = get_object_or_404(CustomerProfile, user=request.user)
-    pedido = get_object_or_404(Order, pk=pk, customer=customer_profile)
+    pedido, archivado = archivo.obtener_pedido(pk, customer=customer_profile)
 
     whatsapp_shopper = None
     if pedido.shopper:
         whatsapp_shopper = pedido.shopper.whatsapp_link
 
-    if request.method == "POST" and "reportar_pago" in request.POST:
+    if request.method == "POST" and "reportar_pago" in request.POST and not archivado:
         monto_raw = (request.POST.get("monto") or "").strip()
         tipo_pago = request.POST.get("tipo_pago") or "PARCIAL"
         metodo = request.POST.get("metodo") or "OTRO"
@@ -661,10 +943,12 @@ def order_detail(request, pk):
         {
             "pedido": pedido,
             "whatsapp_shopper": whatsapp_shopper,
+            "archivado": archivado,
         },
     )
 
 
+@limites.limitar("crear_pedido")
 @login_required
 def create_order(request):
     customer_profile = get_object_or_404(CustomerProfile, user=request.user)
@@ -740,21 +1024,73 @@ def logout_view(request):
     return redirect("home")
 
 
-def buscar_shoppers(request):
-    shoppers = ShopperProfile.objects.filter(
-        acepta_nuevos_pedidos=True
-    ).order_by("-calificacion", "-creado")
+@pagina_publica("shoppers", surrogate_keys=lambda kw: ["shoppers"], cache_pagina=True)
+async def buscar_shoppers(request):
+    shoppers = await _alist(
+        ShopperProfile.objects.filter(
+            acepta_nuevos_pedidos=True
+        ).select_related("user", "photo").order_by("-puntaje_ranking", "-creado")
+    )
 
-    return render(
+    return await _arender(
         request,
         "marketplace/buscar_shoppers.html",
-        {"shoppers": shoppers},
+        {"shoppers": [datos_tarjeta(s) for s in shoppers]},
     )
 
 
+@pagina_publica("estatico", surrogate_keys=lambda kw: ["estatico"])
 def como_funciona(request):
     return render(request, "marketplace/como_funciona.html")
 
 
+@pagina_publica("estatico", surrogate_keys=lambda kw: ["estatico"])
 def faqs(request):
     return render(request, "marketplace/faqs.html")
+
+
+def metrics(request):
+    """
+    Métricas en formato de exposición de Prometheus (text/plain 0.0.4).
+    """
+    if not settings.METRICAS_ACTIVAS:
+        raise Http404
+    token = settings.METRICAS_TOKEN
+    if token and request.headers.get("Authorization", "") != f"Bearer {token}":
+        return HttpResponse("No autorizado\n", status=401, content_type="text/plain")
+    return HttpResponse(
+        metricas.exposicion_texto(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+def api_sync(request):
+    """
+    Sincronización incremental para la app móvil (ver sincronizacion.py).
+    GET ?cursor=…&rol=cliente|shopper&limite=N
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Solo GET."}, status=405)
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "No autenticado."}, status=401)
+
+    rol = request.GET.get("rol") or None
+    if rol is not None and rol not in sincronizacion.ROLES:
+        return JsonResponse({"error": f"rol debe ser uno de {', '.join(sincronizacion.ROLES)}."}, status=400)
+    rol, perfil = sincronizacion.rol_de(request.user, rol)
+    if perfil is None:
+        return JsonResponse({"error": "El usuario no tiene ese perfil."}, status=403)
+
+    limite = settings.SYNC_LIMITE
+    if request.GET.get("limite", "").isdigit():
+        limite = min(max(int(request.GET["limite"]), 1), settings.SYNC_LIMITE)
+
+    try:
+        datos = sincronizacion.sincronizar(rol, perfil, request.GET.get("cursor") or None, limite)
+    except sincronizacion.CursorInvalido as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except sincronizacion.CursorVencido:
+        return JsonResponse({"error": "Cursor vencido: sincronizar desde cero.", "reiniciar": True}, status=410)
+    response = JsonResponse(datos)
+    response["Cache-Control"] = "private, no-store"
+    return response
@@ -13,12 +13,14 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # =========================
 # (Opcional) Cargar .env en LOCAL sin romper si no tenés librería instalada
 # =========================
-try:
-    from dotenv import load_dotenv  # pip install python-dotenv
-    load_dotenv(BASE_DIR / ".env")
-except Exception:
-    # Si no existe python-dotenv, no pasa nada.
-    pass
+# (En Render no hay .env: ni se importa la librería)
+if (BASE_DIR / ".env").exists():
+    try:
+        from dotenv import load_dotenv  # pip install python-dotenv
+        load_dotenv(BASE_DIR / ".env")
+    except Exception:
+        # Si no existe python-dotenv, no pasa nada.
+        pass
 
 
 # =========================
@@ -51,23 +53,40 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
 
-    # Cloudinary (MEDIA)
-    # Importante: después de staticfiles para no interferir con static
-    "cloudinary_storage",
-    "cloudinary",
-
     "marketplace",
 ]
 
+# Cloudinary (MEDIA) entra solo como backend de STORAGES: el SDK (con urllib3
+# y certifi) se importa recién al guardar o pedir la URL de la primera
+# imagen, no al arrancar cada worker. La app "cloudinary" (template tags y
+# CloudinaryField, que no usamos) ya no se instala, y "cloudinary_storage"
+# solo aporta comandos (deleteorphanedmedia…): se instala solo con
+# CLOUDINARY_COMANDOS=1, igual para manage.py, django-admin y gunicorn.
+# Importante: después de staticfiles para no interferir con collectstatic.
+if os.environ.get("CLOUDINARY_COMANDOS", "False").strip().lower() in ("1", "true", "yes", "on"):
+    INSTALLED_APPS.insert(INSTALLED_APPS.index("django.contrib.staticfiles") + 1, "cloudinary_storage")
+
 MIDDLEWARE = [
+    # Primero para medir el request completo (solo activo con INSTRUMENTACION_ACTIVA)
+    "marketplace.middleware.InstrumentacionMiddleware",
+    # Métricas para /metrics (solo activo con METRICAS_ACTIVAS)
+    "marketplace.middleware.MetricasMiddleware",
+    # 503 + Retry-After con demasiados requests en curso (CONCURRENCIA_MAXIMA)
+    "marketplace.middleware.LimiteConcurrenciaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
+    # 429 en vistas con @limitar, antes de que CSRF parsee el cuerpo
+    "marketplace.middleware.LimiteTasaMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Solo activo con LOADTEST_QUERY_HEADER (ver manage.py loadtest)
+    "marketplace.middleware.ConteoConsultasMiddleware",
+    # Solo activo si hay DATABASE_REPLICA_URL
+    "marketplace.middleware.ReplicaMiddleware",
 ]
 
 ROOT_URLCONF = "personal_shoppers.urls"
@@ -83,11 +102,26 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "marketplace.huecos.contexto_usuario",
             ],
         },
     },
 ]
 
+# En producción los templates se compilan una vez por proceso (cached loader
+# explícito; con DEBUG se usa el loader normal para ver cambios al instante).
+if not DEBUG:
+    TEMPLATES[0]["APP_DIRS"] = False
+    TEMPLATES[0]["OPTIONS"]["loaders"] = [
+        (
+            "django.template.loaders.cached.Loader",
+            [
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+            ],
+        )
+    ]
+
 WSGI_APPLICATION = "personal_shoppers.wsgi.application"
 
 
@@ -95,13 +129,53 @@ WSGI_APPLICATION = "personal_shoppers.wsgi.application"
 # Database
 # - Local: sqlite (default)
 # - Render: Postgres por DATABASE_URL
+# - Opcional: réplica de lectura por DATABASE_REPLICA_URL
+# - Opcional: pool de conexiones (psycopg 3) con DB_POOL=1
 # =========================
 DATABASE_URL = os.environ.get("DATABASE_URL", "").strip()
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL", "").strip()
+
+DB_POOL = os.environ.get("DB_POOL", "False").strip().lower() in ("1", "true", "yes", "on")
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+# Segundos que un request espera por una conexión libre antes de fallar
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+# Reciclar conexiones ociosas / viejas (segundos)
+DB_POOL_MAX_IDLE = float(os.environ.get("DB_POOL_MAX_IDLE", "300"))
+DB_POOL_MAX_LIFETIME = float(os.environ.get("DB_POOL_MAX_LIFETIME", "1800"))
+
+
+# SQLite (modo concurrente, ver marketplace/sqlite.py). Aplica a la base
+# local por defecto y a cualquier DATABASE_URL sqlite:///.
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", "20"))
+SQLITE_OPTIONS = {
+    # BEGIN IMMEDIATE en transaction.atomic()
+    "transaction_mode": "IMMEDIATE",
+    # Segundos esperando el lock antes de "database is locked"
+    "timeout": SQLITE_BUSY_TIMEOUT,
+}
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negativo = KiB (64 MB por conexión)
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", "-65536")),
+    "temp_store": "MEMORY",
+}
 
-if DATABASE_URL:
+
+def _db_desde_url(url):
     import dj_database_url
 
-    db = dj_database_url.parse(DATABASE_URL, conn_max_age=600)
+    # Con pool, las conexiones las administra el pool: CONN_MAX_AGE debe ser 0.
+    db = dj_database_url.parse(
+        url,
+        conn_max_age=0 if DB_POOL else 600,
+        conn_health_checks=True,
+    )
+
+    if db.get("ENGINE") == "django.db.backends.sqlite3":
+        db.setdefault("OPTIONS", {}).update(SQLITE_OPTIONS)
 
     # SOLO Postgres necesita sslmode
     if db.get("ENGINE") in (
@@ -111,15 +185,51 @@ if DATABASE_URL:
         db.setdefault("OPTIONS", {})
         db["OPTIONS"]["sslmode"] = "require"
 
-    DATABASES = {"default": db}
+        if DB_POOL:
+            try:
+                import psycopg  # noqa: F401
+                import psycopg_pool  # noqa: F401
+            except ImportError as exc:
+                from django.core.exceptions import ImproperlyConfigured
+
+                raise ImproperlyConfigured(
+                    "DB_POOL=1 necesita psycopg 3 con pool: pip install 'psycopg[binary,pool]'"
+                ) from exc
+            # Pool nativo de Django 5.1+ (psycopg_pool). CONN_HEALTH_CHECKS=True
+            # hace que el pool verifique cada conexión antes de entregarla.
+            db["OPTIONS"]["pool"] = {
+                "min_size": DB_POOL_MIN,
+                "max_size": DB_POOL_MAX,
+                "timeout": DB_POOL_TIMEOUT,
+                "max_idle": DB_POOL_MAX_IDLE,
+                "max_lifetime": DB_POOL_MAX_LIFETIME,
+            }
+    return db
+
+
+if DATABASE_URL:
+    DATABASES = {"default": _db_desde_url(DATABASE_URL)}
 else:
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            "OPTIONS": dict(SQLITE_OPTIONS),
         }
     }
 
+if DATABASE_REPLICA_URL:
+    DATABASES["replica"] = _db_desde_url(DATABASE_REPLICA_URL)
+    # En tests la réplica es la misma base que default
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["marketplace.db_router.ReplicaRouter"]
+
+# Vistas de solo lectura cuyas consultas pueden ir a la réplica
+REPLICA_VISTAS = ["home", "buscar_shoppers", "shopper_detail"]
+# Tras un POST, esa sesión lee del primario durante estos segundos
+REPLICA_READ_YOUR_WRITES_SEGUNDOS = int(os.environ.get("REPLICA_READ_YOUR_WRITES_SEGUNDOS", "10"))
+
 
 # =========================
 # Password validators
@@ -170,6 +280,154 @@ LOGIN_REDIRECT_URL = "home"
 LOGOUT_REDIRECT_URL = "home"
 
 
+# =========================
+# Pruebas de carga (manage.py loadtest)
+# =========================
+# Expone X-DB-Queries en cada respuesta. No activarlo en producción.
+LOADTEST_QUERY_HEADER = os.environ.get("LOADTEST_QUERY_HEADER", "False").strip().lower() in ("1", "true", "yes", "on")
+
+
+# =========================
+# Instrumentación de performance (SQL + tiempos por request)
+# =========================
+def _env_bool(nombre, default="False"):
+    return os.environ.get(nombre, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+INSTRUMENTACION_ACTIVA = _env_bool("INSTRUMENTACION_ACTIVA")
+# Fracción de requests medidos (0.0 a 1.0)
+INSTRUMENTACION_MUESTREO = float(os.environ.get("INSTRUMENTACION_MUESTREO", "1.0"))
+# Solo se loguean requests medidos que tarden al menos esto (0 = todos)
+INSTRUMENTACION_UMBRAL_REQUEST_MS = float(os.environ.get("INSTRUMENTACION_UMBRAL_REQUEST_MS", "0"))
+# Consultas individuales sobre este umbral van al slow-query log
+INSTRUMENTACION_UMBRAL_SQL_MS = float(os.environ.get("INSTRUMENTACION_UMBRAL_SQL_MS", "100"))
+INSTRUMENTACION_TOP_SQL = int(os.environ.get("INSTRUMENTACION_TOP_SQL", "5"))
+# Header Server-Timing (visible en el navegador, opt-in)
+INSTRUMENTACION_SERVER_TIMING = _env_bool("INSTRUMENTACION_SERVER_TIMING")
+
+# =========================
+# Métricas (/metrics, formato Prometheus)
+# =========================
+METRICAS_ACTIVAS = _env_bool("METRICAS_ACTIVAS")
+# Carpeta compartida por todos los workers (un archivo por proceso)
+METRICAS_DIR = os.environ.get("METRICAS_DIR", "")
+# Cada cuánto se recalculan los gauges de negocio (COUNTs)
+METRICAS_SNAPSHOT_SEGUNDOS = int(os.environ.get("METRICAS_SNAPSHOT_SEGUNDOS", "60"))
+# Si se define, /metrics exige "Authorization: Bearer <token>"
+METRICAS_TOKEN = os.environ.get("METRICAS_TOKEN", "")
+
+# =========================
+# Cache HTTP de páginas públicas (ETag / Cache-Control)
+# =========================
+# Navegador (max-age) y CDN/proxy compartido (s-maxage), solo para anónimos
+HTTP_CACHE_MAX_AGE = int(os.environ.get("HTTP_CACHE_MAX_AGE", "60"))
+HTTP_CACHE_S_MAXAGE = int(os.environ.get("HTTP_CACHE_S_MAXAGE", "300"))
+HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.environ.get("HTTP_CACHE_STALE_WHILE_REVALIDATE", "60"))
+# Headers con las claves para purga selectiva (Fastly / Cloudflare)
+HTTP_CACHE_SURROGATE_HEADERS = ["Surrogate-Key", "Cache-Tag"]
+
+# =========================
+# Cache (Django) y cache de página completa
+# =========================
+# Con REDIS_URL el cache es compartido entre workers; si no, memoria local
+REDIS_URL = os.environ.get("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "personal_shoppers",
+        }
+    }
+
+# home / buscar_shoppers: un render compartido, huecos por usuario
+PAGINA_CACHE_ACTIVA = _env_bool("PAGINA_CACHE_ACTIVA", "True")
+PAGINA_CACHE_SEGUNDOS = int(os.environ.get("PAGINA_CACHE_SEGUNDOS", "600"))
+
+# Ranking de shoppers (ver marketplace/ranking.py): reseñas "virtuales" con la
+# nota media de la plataforma y vida media del peso de una reseña.
+RANKING_PESO_PRIOR = float(os.environ.get("RANKING_PESO_PRIOR", "5"))
+RANKING_VIDA_MEDIA_DIAS = float(os.environ.get("RANKING_VIDA_MEDIA_DIAS", "365"))
+
+# Pedidos ENTREGADO/CANCELADO sin cambios hace más de esto pasan al archivo
+# (manage.py archivar_pedidos)
+ARCHIVO_PEDIDOS_DIAS = int(os.environ.get("ARCHIVO_PEDIDOS_DIAS", "180"))
+
+# Postgres: particiones mensuales de pagos/gastos creadas por adelantado
+# (manage.py particiones --crear, en un cron mensual)
+PARTICIONES_MESES_ADELANTE = int(os.environ.get("PARTICIONES_MESES_ADELANTE", "3"))
+
+# Feed en vivo de pedidos abiertos (SSE): una consulta por intervalo por
+# proceso, sin importar cuántos shoppers estén conectados. Solo bajo ASGI
+# (gunicorn -c gunicorn_asgi.conf.py personal_shoppers.asgi:application): con
+# los workers sync de gunicorn el endpoint responde 204 y no hay feed.
+NOVEDADES_INTERVALO_SEGUNDOS = float(os.environ.get("NOVEDADES_INTERVALO_SEGUNDOS", "2"))
+NOVEDADES_LATIDO_SEGUNDOS = float(os.environ.get("NOVEDADES_LATIDO_SEGUNDOS", "20"))
+# Cada cuántas vueltas se recarga el conjunto de abiertos (detecta borrados)
+NOVEDADES_RECONCILIAR = int(os.environ.get("NOVEDADES_RECONCILIAR", "30"))
+
+# API de sincronización incremental (/api/v1/sync/)
+SYNC_LIMITE = int(os.environ.get("SYNC_LIMITE", "500"))  # filas por colección por página
+SYNC_MARGEN_SEGUNDOS = int(os.environ.get("SYNC_MARGEN_SEGUNDOS", "2"))
+# Lápidas de borrados (manage.py purgar_borrados); cursores más viejos -> 410
+SYNC_BORRADOS_DIAS = int(os.environ.get("SYNC_BORRADOS_DIAS", "90"))
+
+# API JSON de solo lectura (/api/v1/<recurso>/): filas por página
+API_LIMITE = int(os.environ.get("API_LIMITE", "50"))
+API_LIMITE_MAXIMO = int(os.environ.get("API_LIMITE_MAXIMO", "200"))
+
+# Límites de tasa (balde de fichas) de las vistas caras, por IP, usuario y
+# cuenta: "capacidad/segundos" = ráfaga permitida y tiempo en llenarse de nuevo
+LIMITES_ACTIVOS = _env_bool("LIMITES_ACTIVOS", "True")
+LIMITES_TASA = {
+    "login": os.environ.get("LIMITE_LOGIN", "10/300"),
+    "registro": os.environ.get("LIMITE_REGISTRO", "5/3600"),
+    "crear_pedido": os.environ.get("LIMITE_CREAR_PEDIDO", "30/600"),
+    "reportar_pago": os.environ.get("LIMITE_REPORTAR_PAGO", "30/600"),
+}
+# Cache con el estado de los límites si es Redis; si no, los baldes van en la
+# BD y el conteo de concurrencia en cada proceso
+LIMITES_CACHE = os.environ.get("LIMITES_CACHE", "default")
+# Proxies de confianza delante de la app para leer X-Forwarded-For. En Render
+# (RENDER=true) hay uno: sin esto todos comparten la IP del proxy y un balde
+LIMITES_PROXIES = int(os.environ.get("LIMITES_PROXIES", "1" if os.environ.get("RENDER") else "0"))
+# Requests en curso antes de responder 503 (0 = sin límite): en total con
+# Redis, por proceso (worker) sin Redis
+CONCURRENCIA_MAXIMA = int(os.environ.get("CONCURRENCIA_MAXIMA", "0"))
+CONCURRENCIA_REINTENTAR_SEGUNDOS = int(os.environ.get("CONCURRENCIA_REINTENTAR_SEGUNDOS", "2"))
+
+# P&L mensual del shopper (se invalida al cambiar pagos/gastos/pedidos).
+# Solo con REDIS_URL: con el cache local de cada worker se calcula en vivo
+REPORTES_CACHE_SEGUNDOS = int(os.environ.get("REPORTES_CACHE_SEGUNDOS", "3600"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "solo_mensaje": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "perf": {
+            "class": "logging.StreamHandler",
+            "formatter": "solo_mensaje",
+        },
+    },
+    "loggers": {
+        "marketplace.perf": {
+            "handlers": ["perf"],
+            "level": os.environ.get("INSTRUMENTACION_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+
 # =========================
 # Seguridad mínima en producción
 # =========================
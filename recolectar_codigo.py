@@ -10,10 +10,21 @@ Created on Tue Nov 11 20:57:40 2025
 # & "C:\Users\jvz16\anaconda3\python.exe" -m venv .venv
 # .\.venv\Scripts\Activate.ps1
 # python recolectar_codigo.py
+#
+# Modo incremental (lectura en paralelo, respeta .gitignore, salta lo que no
+# cambió y la salida es determinista):
+# python recolectar_codigo.py --incremental
 
 
 
+import argparse
+import hashlib
+import io
+import json
 import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 # CONFIGURACIÓN: tú solo cambias ESTA línea con la ruta de tu proyecto
 PROJECT_ROOT = r"C:\Users\jvz16\Proyectos"  # <-- pon aquí la raíz de tu proyecto
@@ -82,5 +93,373 @@ def main():
 
     print(f"Listo. Se guardó todo en: {output_path}")
 
+# =========================
+# Modo incremental
+# =========================
+# - Recorre la raíz en orden (rutas con "/", ordenadas), así que dos corridas
+#   sobre los mismos archivos dan exactamente la misma salida y los diffs
+#   entre snapshots muestran solo lo que cambió.
+# - Respeta los .gitignore de cada carpeta (además de IGNORED_DIRS).
+# - Un manifiesto junto a la salida guarda por archivo mtime, tamaño, hash y
+#   en qué parte de la salida quedó. Lo que no cambió se copia tal cual de la
+#   salida anterior sin volver a leer ni decodificar la fuente; si no cambió
+#   nada, la salida ni se toca.
+# - Lo que cambió se lee en paralelo (pool acotado), en bloques, a un archivo
+#   temporal por archivo (en memoria si es chico): ningún archivo se carga
+#   entero y hay como mucho VENTANA_POR_HILO * hilos en vuelo.
+# - Archivos más grandes que --max-kb se listan sin contenido.
+
+MANIFEST_SUFFIX = ".manifiesto.json"
+MANIFEST_VERSION = 1
+CHUNK_BYTES = 256 * 1024
+SPOOL_BYTES = 1024 * 1024
+VENTANA_POR_HILO = 4
+SEPARADOR = "=" * 80
+
+
+class Gitignore:
+    """
+    Reglas de los .gitignore encontrados al recorrer (subconjunto práctico de
+    la sintaxis de git: comentarios, !negación, / final para carpetas,
+    patrones anclados, *, ?, [..] y **). Gana la última regla que coincide;
+    las de carpetas más profundas van después.
+    """
+
+    def __init__(self):
+        self.reglas = []  # (carpeta_base, regex, negada, solo_carpetas)
+
+    @staticmethod
+    def _a_regex(patron: str) -> str:
+        partes, i = [], 0
+        while i < len(patron):
+            c = patron[i]
+            if patron.startswith("**/", i):
+                partes.append("(?:.*/)?")
+                i += 3
+                continue
+            if patron.startswith("**", i):
+                partes.append(".*")
+                i += 2
+                continue
+            if c == "*":
+                partes.append("[^/]*")
+            elif c == "?":
+                partes.append("[^/]")
+            elif c == "[":
+                fin = patron.find("]", i + 1)
+                if fin == -1:
+                    partes.append(re.escape(c))
+                else:
+                    clase = patron[i + 1:fin]
+                    if clase.startswith("!"):
+                        clase = "^" + clase[1:]
+                    partes.append(f"[{clase}]")
+                    i = fin
+            elif c == "\\" and i + 1 < len(patron):
+                i += 1
+                partes.append(re.escape(patron[i]))
+            else:
+                partes.append(re.escape(c))
+            i += 1
+        return "".join(partes)
+
+    def cargar(self, carpeta_rel: str, ruta: str):
+        try:
+            with open(ruta, "r", encoding="utf-8", errors="replace") as f:
+                lineas = f.read().splitlines()
+        except OSError:
+            return
+        for linea in lineas:
+            if not linea.endswith("\\ "):
+                linea = linea.rstrip()
+            if not linea or linea.startswith("#"):
+                continue
+            negada = linea.startswith("!")
+            if negada:
+                linea = linea[1:]
+            elif linea.startswith(("\\!", "\\#")):
+                linea = linea[1:]
+            solo_carpetas = linea.endswith("/")
+            linea = linea.rstrip("/")
+            if not linea:
+                continue
+            anclado = "/" in linea
+            cuerpo = self._a_regex(linea.lstrip("/"))
+            regex = re.compile(f"^{cuerpo}$" if anclado else f"^(?:.*/)?{cuerpo}$")
+            self.reglas.append((carpeta_rel, regex, negada, solo_carpetas))
+
+    def ignorado(self, rel: str, es_carpeta: bool) -> bool:
+        resultado = False
+        for base, regex, negada, solo_carpetas in self.reglas:
+            if solo_carpetas and not es_carpeta:
+                continue
+            if base:
+                if not rel.startswith(base + "/"):
+                    continue
+                relativo = rel[len(base) + 1:]
+            else:
+                relativo = rel
+            if regex.match(relativo):
+                resultado = not negada
+        return resultado
+
+
+def listar_archivos(raiz: str, usar_gitignore: bool = True, excluir=()):
+    """
+    [(rel_posix, ruta, mtime_ns, size)] ordenado, sin carpetas ignoradas.
+    """
+    reglas = Gitignore()
+    excluir = {os.path.abspath(e) for e in excluir}
+    archivos = []
+
+    def recorrer(carpeta: str, carpeta_rel: str):
+        if usar_gitignore:
+            gitignore = os.path.join(carpeta, ".gitignore")
+            if os.path.isfile(gitignore):
+                reglas.cargar(carpeta_rel, gitignore)
+        try:
+            with os.scandir(carpeta) as it:
+                entradas = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return
+        for entrada in entradas:
+            rel = f"{carpeta_rel}/{entrada.name}" if carpeta_rel else entrada.name
+            if entrada.is_dir(follow_symlinks=False):
+                if should_skip_dir(entrada.name) or (usar_gitignore and reglas.ignorado(rel, True)):
+                    continue
+                recorrer(entrada.path, rel)
+            elif entrada.is_file() and should_include_file(entrada.name):
+                if os.path.abspath(entrada.path) in excluir:
+                    continue
+                if usar_gitignore and reglas.ignorado(rel, False):
+                    continue
+                st = entrada.stat()
+                archivos.append((rel, entrada.path, st.st_mtime_ns, st.st_size))
+
+    recorrer(raiz, "")
+    return archivos
+
+
+def leer_bloque(ruta: str):
+    """
+    Contenido del archivo como utf-8 (o latin-1 si no es utf-8), con saltos
+    de línea normalizados a "\n", en un temporal. Devuelve (temporal, hash).
+    """
+    for encoding in ("utf-8", "latin-1"):
+        destino = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        h = hashlib.blake2b(digest_size=16)
+        try:
+            with open(ruta, "rb") as crudo:
+                texto = io.TextIOWrapper(_Hasheado(crudo, h), encoding=encoding, newline=None)
+                while True:
+                    trozo = texto.read(CHUNK_BYTES)
+                    if not trozo:
+                        break
+                    destino.write(trozo.encode("utf-8"))
+            return destino, h.hexdigest()
+        except UnicodeDecodeError:
+            destino.close()
+    raise AssertionError("latin-1 decodifica cualquier byte")
+
+
+class _Hasheado(io.RawIOBase):
+    """
+    Lector que va alimentando el hash con lo que lee (un solo paso por el archivo).
+    """
+
+    def __init__(self, crudo, h):
+        self.crudo, self.h = crudo, h
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self.crudo.readinto(buffer)
+        if n:
+            self.h.update(memoryview(buffer)[:n])
+        return n
+
+
+def _copiar_rango(origen, destino, offset: int, largo: int):
+    origen.seek(offset)
+    while largo > 0:
+        trozo = origen.read(min(CHUNK_BYTES, largo))
+        if not trozo:
+            raise OSError("la salida anterior es más corta que lo que dice el manifiesto")
+        destino.write(trozo)
+        largo -= len(trozo)
+
+
+def _cargar_manifiesto(ruta: str, config: dict, salida: str):
+    """
+    Entradas del manifiesto anterior, o {} si no sirve (otra configuración o
+    la salida cambió desde entonces y los offsets ya no valen).
+    """
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            datos = json.load(f)
+        st = os.stat(salida)
+    except (OSError, ValueError):
+        return {}
+    if datos.get("version") != MANIFEST_VERSION or datos.get("config") != config:
+        return {}
+    if datos.get("salida") != [st.st_mtime_ns, st.st_size]:
+        return {}
+    return datos.get("archivos", {})
+
+
+def recolectar_incremental(project_root: str, output_path: str, hilos: int, max_bytes: int, usar_gitignore: bool):
+    manifest_path = output_path + MANIFEST_SUFFIX
+    config = {
+        "extensiones": sorted(ALLOWED_EXTENSIONS),
+        "ignoradas": sorted(IGNORED_DIRS),
+        "max_bytes": max_bytes,
+        "gitignore": usar_gitignore,
+    }
+    anterior = _cargar_manifiesto(manifest_path, config, output_path)
+    archivos = listar_archivos(project_root, usar_gitignore, excluir=(output_path, manifest_path))
+
+    # Qué hay que leer: nuevo o con otro tamaño / mtime. `mismo` dice si el
+    # bloque queda idéntico al de la salida anterior (None = se sabrá al leer)
+    plan = []
+    for rel, ruta, mtime_ns, size in archivos:
+        previo = anterior.get(rel)
+        if size > max_bytes:
+            mismo = bool(previo and previo.get("grande") and previo["size"] == size)
+            plan.append((rel, ruta, mtime_ns, size, "grande", mismo))
+        elif previo and not previo.get("grande") and previo["size"] == size and previo["mtime_ns"] == mtime_ns:
+            plan.append((rel, ruta, mtime_ns, size, "igual", True))
+        else:
+            plan.append((rel, ruta, mtime_ns, size, "leer", None))
+
+    mismos_archivos = bool(anterior) and set(anterior) == {p[0] for p in plan}
+    leidos = sum(1 for p in plan if p[4] == "leer")
+    if mismos_archivos and all(p[5] for p in plan):
+        print(f"Sin cambios ({len(plan)} archivos). Salida: {output_path}")
+        return
+
+    encabezado = f"RECOLECCIÓN DE ARCHIVOS DEL PROYECTO: {project_root}\n" + SEPARADOR + "\n\n"
+    nuevo_manifiesto = {}
+    reusados = 0
+    carpeta_salida = os.path.dirname(output_path) or "."
+    fd, tmp = tempfile.mkstemp(prefix=".recolectar.", dir=carpeta_salida)
+    try:
+        with os.fdopen(fd, "wb") as out, ThreadPoolExecutor(max_workers=hilos) as pool:
+            viejo = open(output_path, "rb") if anterior and os.path.exists(output_path) else None
+            try:
+                out.write(encabezado.encode("utf-8"))
+                # Ventana acotada de lecturas en vuelo, consumidas en orden
+                ventana = max(1, hilos) * VENTANA_POR_HILO
+                pendientes = {}
+                siguiente = 0
+
+                def lanzar_hasta(i):
+                    nonlocal siguiente
+                    while siguiente < len(plan) and siguiente < i + ventana:
+                        if plan[siguiente][4] == "leer":
+                            pendientes[siguiente] = pool.submit(leer_bloque, plan[siguiente][1])
+                        siguiente += 1
+
+                identica = mismos_archivos
+                for i, (rel, ruta, mtime_ns, size, accion, mismo) in enumerate(plan):
+                    lanzar_hasta(i)
+                    cabecera = f"\n>>> ARCHIVO: {rel}\n" + "-" * 80 + "\n"
+                    pie = "\n" + SEPARADOR + "\n"
+                    offset = out.tell()
+                    entrada = {"mtime_ns": mtime_ns, "size": size}
+
+                    if accion == "igual" and viejo is not None:
+                        previo = anterior[rel]
+                        _copiar_rango(viejo, out, previo["offset"], previo["largo"])
+                        entrada["hash"] = previo["hash"]
+                        reusados += 1
+                    else:
+                        out.write(cabecera.encode("utf-8"))
+                        if accion == "grande":
+                            out.write(f"[OMITIDO: {size} bytes, más que el límite de {max_bytes} bytes]\n".encode("utf-8"))
+                            entrada["grande"] = True
+                        else:
+                            futuro = pendientes.pop(i, None)
+                            try:
+                                spool, entrada["hash"] = futuro.result() if futuro else leer_bloque(ruta)
+                            except OSError as e:
+                                out.write(f"[ERROR LEYENDO ARCHIVO: {e}]\n".encode("utf-8"))
+                                entrada["hash"] = ""
+                            else:
+                                with spool:
+                                    spool.seek(0)
+                                    for trozo in iter(lambda: spool.read(CHUNK_BYTES), b""):
+                                        out.write(trozo)
+                            previo = anterior.get(rel)
+                            mismo = bool(previo and previo.get("hash") == entrada["hash"] and entrada["hash"])
+                        out.write(pie.encode("utf-8"))
+                    entrada["offset"] = offset
+                    entrada["largo"] = out.tell() - offset
+                    nuevo_manifiesto[rel] = entrada
+                    identica = identica and mismo
+            finally:
+                if viejo is not None:
+                    viejo.close()
+        if identica:
+            # Solo cambiaron mtimes (checkout, touch): la salida queda como
+            # estaba y el manifiesto se actualiza para no volver a leerlos
+            os.unlink(tmp)
+        else:
+            # mkstemp crea con 0600: mismos permisos que un open() normal
+            mascara = os.umask(0)
+            os.umask(mascara)
+            os.chmod(tmp, 0o666 & ~mascara)
+            os.replace(tmp, output_path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+    st = os.stat(output_path)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": MANIFEST_VERSION,
+                "config": config,
+                "salida": [st.st_mtime_ns, st.st_size],
+                "archivos": nuevo_manifiesto,
+            },
+            f,
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+    os.replace(manifest_path + ".tmp", manifest_path)
+    print(
+        f"{'Sin cambios en el contenido' if identica else 'Listo'}: {len(plan)} archivos "
+        f"({leidos} leídos, {reusados} copiados de la salida anterior, "
+        f"{sum(1 for p in plan if p[4] == 'grande')} omitidos por tamaño). Salida: {output_path}"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Junta el código del proyecto en un solo .txt")
+    parser.add_argument("--raiz", default=PROJECT_ROOT, help="Raíz del proyecto (por defecto PROJECT_ROOT).")
+    parser.add_argument("--salida", default=OUTPUT_FILENAME, help="Archivo de salida, relativo a la raíz.")
+    parser.add_argument("--incremental", action="store_true", help="Modo paralelo, incremental y determinista.")
+    parser.add_argument("--hilos", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument("--max-kb", type=int, default=1024, help="Archivos más grandes se listan sin contenido.")
+    parser.add_argument("--sin-gitignore", action="store_true", help="No aplicar los .gitignore.")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.incremental:
+        raiz = os.path.abspath(args.raiz)
+        recolectar_incremental(
+            raiz,
+            os.path.join(raiz, args.salida),
+            hilos=max(1, args.hilos),
+            max_bytes=args.max_kb * 1024,
+            usar_gitignore=not args.sin_gitignore,
+        )
+    else:
+        PROJECT_ROOT, OUTPUT_FILENAME = args.raiz, args.salida
+        main()